@@ -5,6 +5,14 @@ import locus_hunter
 __VERSION__ = '1.1.3-beta'
 
 
+def formats_type(value: str) -> str:
+    try:
+        locus_hunter.parse_formats(value)
+    except AssertionError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
 PROG = 'python locus_hunter'
 DESCRIPTION = f'Locus Hunter (version {__VERSION__}) by Yu-Cheng Lin (ylin@nycu.edu.tw)'
 REQUIRED = [
@@ -12,8 +20,9 @@ REQUIRED = [
         'keys': ['-q', '--query-faa'],
         'properties': {
             'type': str,
-            'required': True,
-            'help': 'path to the query fasta file',
+            'required': False,
+            'default': None,
+            'help': 'path to the query fasta file, required unless --manifest or --serve',
         }
     },
     {
@@ -62,6 +71,32 @@ OPTIONAL = [
             'help': 'identity (between 0 and 1) of orthologous genes (default: %(default)s)',
         }
     },
+    {
+        'keys': ['--clustering-engine'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'choices': ['cd-hit', 'native'],
+            'default': 'cd-hit',
+            'help': 'engine to cluster CDS into orthologs, "native": in-process greedy clustering following cd-hit (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--ortholog-catalogue'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'default': None,
+            'help': 'folder of ortholog representatives kept across runs, for ortholog ids stable across runs,\nonly new CDS are clustered (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--seed-orthologs-from-hits'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'CDS hit by blastp are orthologs of their best query (by bitscore),\nonly the other CDS are clustered,\nwith --ortholog-catalogue the longest hit of each query is kept as a representative',
+        }
+    },
     {
         'keys': ['--dereplicate-loci'],
         'properties': {
@@ -69,6 +104,29 @@ OPTIONAL = [
             'help': 'dereplicate loci with identical sequence of orthologous genes',
         }
     },
+    {
+        'keys': ['--pooled-search'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'run one blastp search against CDS pooled from all genbank files,\ninstead of one search per chromosome, e-values being rescaled to each chromosome,\nan approximation that may differ for hits near the e-value cutoff',
+        }
+    },
+    {
+        'keys': ['--blast-db-cache'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'default': None,
+            'help': 'folder to keep blastp databases of the genbank files across runs,\nimplies pooled search, one cache folder per genbank folder (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--parallel-extraction'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'parse genbank files and extract loci with a pool of THREADS processes',
+        }
+    },
     {
         'keys': ['--include-locus-names'],
         'properties': {
@@ -78,6 +136,40 @@ OPTIONAL = [
             'help': 'comma-separated locus names to be included during dereplication (default: %(default)s)',
         }
     },
+    {
+        'keys': ['--alignment-engine'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'choices': ['python', 'numpy', 'numba'],
+            'default': 'numpy',
+            'help': 'engine to align ortholog orders between loci, numba falls back to numpy if not installed (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--sort-method'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'choices': ['linkage', 'sketch'],
+            'default': 'linkage',
+            'help': 'method to sort loci, "linkage": hierarchical clustering of all pairwise alignments,\n"sketch": approximate, linear in the number of loci, for very many loci (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--optimal-leaf-ordering'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'reorder the tree of loci such that adjacent loci are most similar,\nonly for the linkage sort method, slow for many loci',
+        }
+    },
+    {
+        'keys': ['--newick'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'write the tree of loci in Newick format to OUTPUT.nwk, only for the linkage sort method',
+        }
+    },
     {
         'keys': ['--label-attributes'],
         'properties': {
@@ -96,6 +188,64 @@ OPTIONAL = [
             'help': 'number of loci to be plotted in each output image (default: %(default)s)',
         }
     },
+    {
+        'keys': ['--formats'],
+        'properties': {
+            'type': formats_type,
+            'required': False,
+            'default': 'pdf,png',
+            'help': 'comma-separated formats of output images, among pdf, png and svg,\n"none" for no image (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--no-plot'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'no output image, without importing any plotting library',
+        }
+    },
+    {
+        'keys': ['--profile'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'write wall time, CPU time and peak memory of each stage, processor and subprocess\nto OUTPUT.profile.json and OUTPUT.profile.tsv',
+        }
+    },
+    {
+        'keys': ['--resume'],
+        'properties': {
+            'action': 'store_true',
+            'help': 'checkpoint finished stages in OUTPUT.checkpoint, and resume from the checkpoint of a crashed run\n(also run with --resume), skipping stages finished with the same parameters',
+        }
+    },
+    {
+        'keys': ['--manifest'],
+        'properties': {
+            'type': str,
+            'required': False,
+            'default': None,
+            'help': 'tsv file of batch jobs instead of --query-faa, all searched at once against the genbank folder,\ncolumns query_faa, output and any option (e.g. evalue, sort_method) overriding the default (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--serve'],
+        'properties': {
+            'type': int,
+            'required': False,
+            'default': None,
+            'metavar': 'PORT',
+            'help': 'serve jobs over HTTP on localhost:PORT instead of --query-faa, the genbank folder being indexed once,\nPOST /jobs?PARAMETER=VALUE with a query fasta, GET /jobs/JOB_ID and /jobs/JOB_ID/FILE (default: %(default)s)',
+        }
+    },
+    {
+        'keys': ['--workers'],
+        'properties': {
+            'type': int,
+            'required': False,
+            'default': 2,
+            'help': 'number of jobs run concurrently by --serve, each with THREADS (default: %(default)s)',
+        }
+    },
     {
         'keys': ['--dpi'],
         'properties': {
@@ -177,6 +327,8 @@ class EntryPoint:
 
     def run(self):
         args = self.parser.parse_args()
+        if [args.query_faa, args.manifest, args.serve].count(None) != 2:
+            self.parser.error('one of -q/--query-faa, --manifest and --serve is required')
         print(f'Start running Locus Hunter version {__VERSION__}\n', flush=True)
         locus_hunter.main(
             query_faa=args.query_faa,
@@ -192,7 +344,24 @@ class EntryPoint:
             dpi=args.dpi,
             output=args.output,
             threads=args.threads,
-            debug=args.debug)
+            debug=args.debug,
+            pooled_search=args.pooled_search,
+            blast_db_cache=args.blast_db_cache,
+            parallel_extraction=args.parallel_extraction,
+            alignment_engine=args.alignment_engine,
+            sort_method=args.sort_method,
+            optimal_leaf_ordering=args.optimal_leaf_ordering,
+            newick=args.newick,
+            clustering_engine=args.clustering_engine,
+            ortholog_catalogue=args.ortholog_catalogue,
+            seed_orthologs_from_hits=args.seed_orthologs_from_hits,
+            formats=args.formats,
+            no_plot=args.no_plot,
+            profile=args.profile,
+            resume=args.resume,
+            manifest=args.manifest,
+            serve=args.serve,
+            workers=args.workers)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,55 @@
+"""
+Benchmark of hit interval merging on synthetic chromosomes
+
+Usage:
+    python -m benchmark.merge_intervals
+"""
+import random
+from time import perf_counter
+from typing import List
+from locus_hunter.interval import Interval, merge_intervals, merge_circular_intervals
+
+
+N_INTERVALS = 10 ** 5
+CHROMOSOME_SIZES = [10 ** 7, 10 ** 9]  # dense and sparse hits
+EXTENSION = 5000
+SEED = 1
+
+
+def get_cds_intervals(n: int, size: int, extension: int) -> List[Interval]:
+    ret = []
+    for i in range(n):
+        start = random.randint(1, size)
+        end = start + random.randint(300, 3000)
+        ret.append(Interval(start=start - extension, end=end + extension, names=[f'cds_{i}']))
+    return ret
+
+
+def is_disjoint(intervals: List[Interval]) -> bool:
+    return all(a.end < b.start for a, b in zip(intervals[:-1], intervals[1:]))
+
+
+def main():
+    random.seed(SEED)
+    print(f'{N_INTERVALS:,d} hit intervals in random order')
+    print('chromosome_size\tmethod\tseconds\tmerged\tdisjoint')
+
+    for size in CHROMOSOME_SIZES:
+        intervals = get_cds_intervals(n=N_INTERVALS, size=size, extension=EXTENSION)
+
+        for name, func in [
+            ('linear', lambda: merge_intervals(intervals)),
+            ('circular', lambda: merge_circular_intervals(intervals, size=size)),
+        ]:
+            t = perf_counter()
+            merged = func()
+            seconds = perf_counter() - t
+
+            names = sum(len(i.names) for i in merged)
+            assert names == N_INTERVALS, f'{names} names after merging {N_INTERVALS} intervals'
+
+            print(f'{size}\t{name}\t{seconds:.3f}\t{len(merged):,d}\t{is_disjoint(merged)}')
+
+
+if __name__ == '__main__':
+    main()
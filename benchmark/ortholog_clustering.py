@@ -0,0 +1,101 @@
+"""
+Benchmark of ortholog clustering engines on synthetic protein families: native vs cd-hit
+
+Agreement is the adjusted Rand index between two clusterings, 1 being identical partitions.
+cd-hit is skipped if not installed.
+
+Usage:
+    python -m benchmark.ortholog_clustering
+"""
+import random
+import shutil
+import tempfile
+import numpy as np
+from time import perf_counter
+from typing import List, Dict, Tuple
+from ngslite import FastaWriter
+from locus_hunter.template import Settings
+from locus_hunter.cd_hit import CdHit
+from locus_hunter.kmer_cluster import KmerCluster
+
+
+N_PROTEINS = [1000, 5000]
+PROTEINS_PER_FAMILY = 20
+PROTEIN_LENGTHS = (100, 600)
+SUBSTITUTION_RATES = [0.02, 0.05, 0.15]  # within and across the 0.9 identity threshold
+SEQUENCE_IDENTITY = 0.9
+THREADS = 4
+SEED = 1
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def get_proteins(n: int) -> List[Tuple[str, str]]:
+    records = []
+    n_families = max(1, n // PROTEINS_PER_FAMILY)
+    for family in range(n_families):
+        root = ''.join(random.choice(AMINO_ACIDS) for _ in range(random.randint(*PROTEIN_LENGTHS)))
+        rate = random.choice(SUBSTITUTION_RATES)
+        for i in range(PROTEINS_PER_FAMILY):
+            seq = ''.join(random.choice(AMINO_ACIDS) if random.random() < rate else a for a in root)
+            seq = seq[random.randint(0, 5):]  # ragged N-terminus
+            name = f'family_{family}_protein_{i}'
+            records.append((name, seq))
+    random.shuffle(records)
+    return records
+
+
+def adjusted_rand_index(a: Dict[str, int], b: Dict[str, int]) -> float:
+    keys = sorted(set(a) & set(b))
+    _, x = np.unique([a[k] for k in keys], return_inverse=True)
+    _, y = np.unique([b[k] for k in keys], return_inverse=True)
+    table = np.zeros((x.max() + 1, y.max() + 1), dtype=np.int64)
+    np.add.at(table, (x, y), 1)
+
+    def pairs(counts):
+        return (counts * (counts - 1) // 2).sum()
+
+    index = pairs(table)
+    row, col, total = pairs(table.sum(axis=1)), pairs(table.sum(axis=0)), pairs(np.array([len(keys)]))
+    expected = row * col / total
+    maximum = (row + col) / 2
+    return 1. if maximum == expected else (index - expected) / (maximum - expected)
+
+
+def main():
+    random.seed(SEED)
+    workdir = tempfile.mkdtemp(prefix='benchmark_ortholog_clustering_')
+    settings = Settings(workdir=workdir, outdir=workdir, threads=THREADS, debug=False)
+
+    engines = {'native': KmerCluster}
+    if shutil.which('cd-hit') is not None:
+        engines['cd-hit'] = CdHit
+    else:
+        print('cd-hit not found, skipped')
+
+    print(f'{PROTEINS_PER_FAMILY} proteins per family, substitution rates {SUBSTITUTION_RATES}, identity {SEQUENCE_IDENTITY}')
+    print('n_proteins\tengine\tseconds\tclusters\tari_vs_cd_hit')
+    try:
+        for n in N_PROTEINS:
+            records = get_proteins(n=n)
+            faa = f'{workdir}/proteins_{n}.faa'
+            with FastaWriter(faa) as writer:
+                for head, seq in records:
+                    writer.write(header=head, sequence=seq)
+
+            results = {}
+            for name, engine in engines.items():
+                t = perf_counter()
+                results[name] = engine(settings).main(faa=faa, sequence_identity=SEQUENCE_IDENTITY)
+                results[name + '_seconds'] = perf_counter() - t
+
+            for name in engines:
+                clusters = len(set(results[name].values()))
+                ari = adjusted_rand_index(results[name], results['cd-hit']) if 'cd-hit' in results else float('nan')
+                print(f'{n}\t{name}\t{results[name + "_seconds"]:.3f}\t{clusters}\t{ari:.4f}', flush=True)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark of each stage of Locus Hunter on synthetic genbank folders of 10, 100 and 1000 genomes
+
+Stages are timed by the profiler of a LocusHunter run, the same as --profile.
+Results are saved to a json file, which can be compared with the results of a previous version,
+    stages slower than REGRESSION_RATIO being flagged.
+
+With --stubs, blast+ and cd-hit are replaced by the stub scripts in benchmark/stubs,
+    so that the benchmark runs offline, but their timing is then meaningless.
+
+Usage:
+    python -m benchmark.pipeline [--scales 10,100,1000] [--stubs] [--output FILE] [--compare FILE]
+"""
+import os
+import json
+import shutil
+import argparse
+import tempfile
+from time import perf_counter
+from contextlib import redirect_stdout
+from typing import List, Dict, Any, Optional
+from locus_hunter.template import Settings
+from locus_hunter.profiler import Profiler
+from locus_hunter.locus_hunter import LocusHunter
+from .synthetic_genbank import write_synthetic_genbank_dir
+
+
+SCALES = [10, 100, 1000]
+STAGES = [  # name and kind of profiler records
+    ('ExtractLoci', Profiler.PROCESSOR),
+    ('AssignOrthologId', Profiler.PROCESSOR),
+    ('SortLociByComparison', Profiler.PROCESSOR),
+    ('AddColor', Profiler.PROCESSOR),
+    ('ViewLoci', Profiler.PROCESSOR),
+    ('save_genbank', Profiler.STAGE),  # write_genbank
+]
+STUB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stubs')
+REGRESSION_RATIO = 1.2
+THREADS = 4
+SEED = 1
+
+
+def run_locus_hunter(query_faa: str, gbk_dir: str, workdir: str) -> List[Dict[str, Any]]:
+    """
+    Returns the profiler records
+    """
+    os.makedirs(f'{workdir}/temp')
+    settings = Settings(workdir=f'{workdir}/temp', outdir=workdir, threads=THREADS, debug=False)
+    with open(f'{workdir}/locus_hunter.log', 'w') as log, redirect_stdout(log):
+        run(settings=settings, query_faa=query_faa, gbk_dir=gbk_dir, output=f'{workdir}/output')
+
+    with open(f'{workdir}/output.profile.json') as fh:
+        return json.load(fh)['records']
+
+
+def run(settings: Settings, query_faa: str, gbk_dir: str, output: str):
+    LocusHunter(settings).main(
+        query_faa=query_faa,
+        gbk_dir=gbk_dir,
+        evalue=1e-20,
+        extension=5000,
+        min_hits_per_locus=1,
+        ortholog_identity=0.9,
+        dereplicate_loci=False,
+        include_locus_names=[],
+        label_attributes=['gene', 'locus_tag'],
+        loci_per_plot=100,
+        dpi=300,
+        output=output,
+        pooled_search=False,
+        blast_db_cache=None,
+        parallel_extraction=False,
+        alignment_engine='numpy',
+        sort_method='linkage',
+        optimal_leaf_ordering=False,
+        newick=False,
+        clustering_engine='native',
+        ortholog_catalogue=None,
+        seed_orthologs_from_hits=False,
+        formats=['png'],
+        no_plot=False,
+        profile=True,
+        resume=False)
+
+
+def get_stage_results(genomes: int, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    ret = []
+    for name, kind in STAGES:
+        matched = [r for r in records if r['name'] == name and r['kind'] == kind]
+        ret.append({
+            'genomes': genomes,
+            'stage': name,
+            'wall_seconds': sum(r['wall_seconds'] for r in matched),
+            'cpu_seconds': sum(r['cpu_seconds'] for r in matched),
+            'peak_rss_mb': max((r['peak_rss_mb'] for r in matched), default=0.),
+        })
+    return ret
+
+
+def benchmark_scale(genomes: int) -> List[Dict[str, Any]]:
+    workdir = tempfile.mkdtemp(prefix='benchmark_pipeline_')
+    try:
+        t = perf_counter()
+        query_faa, gbk_dir = write_synthetic_genbank_dir(outdir=workdir, genomes=genomes, seed=SEED)
+        print(f'# {genomes} genomes generated in {perf_counter() - t:.1f} seconds', flush=True)
+        records = run_locus_hunter(query_faa=query_faa, gbk_dir=gbk_dir, workdir=workdir)
+    finally:
+        shutil.rmtree(workdir)
+    return get_stage_results(genomes=genomes, records=records)
+
+
+def read_baseline(file: Optional[str]) -> Dict[tuple, Dict[str, Any]]:
+    if file is None:
+        return {}
+    with open(file) as fh:
+        return {(r['genomes'], r['stage']): r for r in json.load(fh)['results']}
+
+
+def print_result(result: Dict[str, Any], baseline: Dict[tuple, Dict[str, Any]]):
+    line = f'{result["genomes"]}\t{result["stage"]}\t{result["wall_seconds"]:.3f}\t' \
+           f'{result["cpu_seconds"]:.3f}\t{result["peak_rss_mb"]:.1f}'
+    base = baseline.get((result['genomes'], result['stage']))
+    if base is not None and base['wall_seconds'] > 0:
+        ratio = result['wall_seconds'] / base['wall_seconds']
+        flag = 'REGRESSION' if ratio > REGRESSION_RATIO else ''
+        line += f'\t{base["wall_seconds"]:.3f}\t{ratio:.2f}\t{flag}'
+    print(line, flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of each stage of Locus Hunter')
+    parser.add_argument('--scales', default=','.join(map(str, SCALES)), help='comma-separated numbers of genomes')
+    parser.add_argument('--stubs', action='store_true', help='use stub binaries in benchmark/stubs')
+    parser.add_argument('--output', default='benchmark_pipeline.json', help='json file of results')
+    parser.add_argument('--compare', default=None, help='json file of previous results')
+    args = parser.parse_args()
+
+    if args.stubs:
+        os.environ['PATH'] = STUB_DIR + os.pathsep + os.environ['PATH']
+
+    baseline = read_baseline(args.compare)
+    scales = [int(s) for s in args.scales.split(',')]
+
+    print('genomes\tstage\twall_seconds\tcpu_seconds\tpeak_rss_mb' + ('\tbaseline_wall_seconds\tratio\tflag' if baseline else ''))
+    results = []
+    for genomes in scales:
+        for result in benchmark_scale(genomes=genomes):
+            print_result(result=result, baseline=baseline)
+            results.append(result)
+
+    with open(args.output, 'w') as fh:
+        json.dump({'scales': scales, 'stubs': args.stubs, 'results': results}, fh, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark of locus ordering on synthetic loci: exact linkage vs approximate sketch
+
+Ordering quality is the mean alignment score between adjacent loci in the sorted order,
+    the higher the better, with random order as the baseline
+
+Usage:
+    python -m benchmark.sort_loci
+"""
+import random
+import shutil
+import tempfile
+from time import perf_counter
+from typing import List, Dict, Callable
+from ngslite import Chromosome, GenericFeature, FeatureArray
+from locus_hunter.template import Settings
+from locus_hunter.constant import ORTHOLOG_ID_KEY
+from locus_hunter.sort_loci import SortLociByComparison, SmithWatermanAligner
+from locus_hunter.sketch import SortLociBySketch
+from locus_hunter.feature_table import FeatureTable
+
+
+N_LOCI_EXACT = [500, 2000]
+N_LOCI_SKETCH = [500, 2000, 20000, 100000]
+LOCI_PER_FAMILY = 50
+GENES_PER_LOCUS = (5, 20)
+MUTATION_RATE = 0.1
+THREADS = 4
+SEED = 1
+
+
+def get_locus(seqname: str, ortholog_ids: List[int]) -> Chromosome:
+    features = [
+        GenericFeature(
+            seqname=seqname,
+            type_='CDS',
+            start=i * 1000 + 1,
+            end=i * 1000 + 900,
+            strand='+',
+            attributes=[(ORTHOLOG_ID_KEY, ortholog_id)])
+        for i, ortholog_id in enumerate(ortholog_ids)
+    ]
+    size = len(ortholog_ids) * 1000
+    return Chromosome(
+        seqname=seqname,
+        sequence='',
+        features=FeatureArray(seqname=seqname, chromosome_size=size, features=features))
+
+
+def mutate(ortholog_ids: List[int], max_id: int) -> List[int]:
+    ret = []
+    for o in ortholog_ids:
+        r = random.random()
+        if r < MUTATION_RATE / 3:  # deletion
+            continue
+        elif r < MUTATION_RATE * 2 / 3:  # substitution
+            ret.append(random.randint(1, max_id))
+        elif r < MUTATION_RATE:  # insertion
+            ret += [o, random.randint(1, max_id)]
+        else:
+            ret.append(o)
+    return ret
+
+
+def get_feature_table(n: int) -> FeatureTable:
+    n_families = max(1, n // LOCI_PER_FAMILY)
+    max_id = n_families * GENES_PER_LOCUS[1]
+    families = [
+        [random.randint(1, max_id) for _ in range(random.randint(*GENES_PER_LOCUS))]
+        for _ in range(n_families)
+    ]
+    loci = [
+        get_locus(seqname=f'locus_{i}', ortholog_ids=mutate(random.choice(families), max_id=max_id))
+        for i in range(n)
+    ]
+    random.shuffle(loci)
+    return FeatureTable(loci=loci, label_attributes=[])
+
+
+def mean_adjacent_score(feature_table: FeatureTable) -> float:
+    aligner = SmithWatermanAligner(engine='numpy')
+    ortholog_ids = [feature_table.get_ortholog_ids(i).tolist() for i in range(len(feature_table))]
+    scores = [
+        aligner.run(list1=a, list2=b)
+        for a, b in zip(ortholog_ids[:-1], ortholog_ids[1:])
+    ]
+    return sum(scores) / len(scores)
+
+
+def main():
+    random.seed(SEED)
+    workdir = tempfile.mkdtemp(prefix='benchmark_sort_loci_')
+    settings = Settings(workdir=workdir, outdir=workdir, threads=THREADS, debug=False)
+
+    methods: Dict[str, Callable] = {
+        'linkage': lambda t: SortLociByComparison(settings).main(
+            feature_table=t, alignment_engine='numba', optimal_leaf_ordering=False, newick=None),
+        'sketch': lambda t: SortLociBySketch(settings).main(feature_table=t),
+        'random': lambda t: t.take_loci(random.sample(range(len(t)), len(t))),
+    }
+
+    print(f'{LOCI_PER_FAMILY} loci per family, {MUTATION_RATE} mutation rate per gene, {THREADS} threads')
+    print('n_loci\tmethod\tseconds\tmean_adjacent_score')
+    try:
+        for n in sorted(set(N_LOCI_EXACT + N_LOCI_SKETCH)):
+            feature_table = get_feature_table(n=n)
+            for name, method in methods.items():
+                if name == 'linkage' and n not in N_LOCI_EXACT:
+                    continue
+                t = perf_counter()
+                sorted_table = method(feature_table)
+                seconds = perf_counter() - t
+                assert len(sorted_table) == n
+                print(f'{n}\t{name}\t{seconds:.3f}\t{mean_adjacent_score(sorted_table):.1f}', flush=True)
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Shared helpers of the stub binaries, which mimic the input and output files of blast+ and cd-hit
+    well enough for Locus Hunter to run offline, without their sensitivity or speed
+"""
+from typing import List, Tuple, Dict
+
+
+WORD_LENGTH = 5
+MIN_SHARED_WORDS = 20
+
+
+def parse_args(args: List[str]) -> Dict[str, str]:
+    return dict(zip(args[::2], args[1::2]))
+
+
+def read_fasta(file: str) -> List[Tuple[str, str]]:
+    ret = []
+    with open(file) as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith('>'):
+                ret.append((line[1:].split()[0], []))
+            elif line:
+                ret[-1][1].append(line)
+    return [(head, ''.join(seq)) for head, seq in ret]
+
+
+def get_words(seq: str) -> set:
+    return {seq[i:i + WORD_LENGTH] for i in range(len(seq) - WORD_LENGTH + 1)}
+
+
+def write_clstr(clusters: List[List[Tuple[str, str]]], file: str):
+    """
+    clusters of (protein_id, seq), the first being the representative
+    """
+    with open(file, 'w') as fh:
+        for i, cluster in enumerate(clusters):
+            fh.write(f'>Cluster {i}\n')
+            for j, (protein_id, seq) in enumerate(cluster):
+                tail = '*' if j == 0 else 'at 100.00%'
+                fh.write(f'{j}\t{len(seq)}aa, >{protein_id}... {tail}\n')
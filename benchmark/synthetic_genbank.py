@@ -0,0 +1,135 @@
+"""
+Synthetic genbank folders for benchmarks, with planted copies of a locus
+
+Each genome file has contigs of random CDS, and copies of the locus are planted in random contigs.
+Proteins of the planted copies are substitutions of the locus proteins, which are written as the query faa.
+The DNA sequence is random and does not encode the translations, as Locus Hunter only reads /translation.
+
+Usage:
+    python -m benchmark.synthetic_genbank OUTDIR [GENOMES]
+"""
+import os
+import sys
+import numpy as np
+from typing import List, Tuple, Optional
+from ngslite import Chromosome, FeatureArray, GenericFeature, write_genbank, write_fasta
+
+
+AMINO_ACIDS = np.frombuffer(b'ACDEFGHIKLMNPQRSTVWY', dtype=np.uint8)
+NUCLEOTIDES = np.frombuffer(b'ACGT', dtype=np.uint8)
+PROTEIN_LENGTHS = (100, 500)
+GENES_PER_LOCUS = 5
+SUBSTITUTION_RATE = 0.05  # planted copies stay within the default 0.9 ortholog identity
+
+
+class SyntheticGenbank:
+
+    rng: np.random.Generator
+    cds_density: float
+    locus_proteins: List[str]
+
+    def __init__(self, seed: int, cds_density: float):
+        """
+        cds_density: fraction of a contig covered by CDS, about 0.88 for bacterial genomes
+        """
+        self.rng = np.random.default_rng(seed)
+        self.cds_density = cds_density
+        self.locus_proteins = [self.random_protein() for _ in range(GENES_PER_LOCUS)]
+
+    def random_protein(self) -> str:
+        length = int(self.rng.integers(*PROTEIN_LENGTHS))
+        return 'M' + self.rng.choice(AMINO_ACIDS, size=length - 1).tobytes().decode()
+
+    def substitute(self, protein: str) -> str:
+        residues = np.frombuffer(protein.encode(), dtype=np.uint8).copy()
+        mask = self.rng.random(len(residues)) < SUBSTITUTION_RATE
+        mask[0] = False
+        residues[mask] = self.rng.choice(AMINO_ACIDS, size=int(mask.sum()))
+        return residues.tobytes().decode()
+
+    def get_contig(self, seqname: str, n_cds: int, locus_copies: int) -> Chromosome:
+        proteins = [(self.random_protein(), f'random_{i}') for i in range(n_cds)]
+        for _ in range(locus_copies):
+            i = int(self.rng.integers(0, len(proteins) + 1))
+            locus = [(self.substitute(p), f'locus_{j}') for j, p in enumerate(self.locus_proteins)]
+            proteins[i:i] = locus
+
+        features, pos = [], 1
+        for i, (protein, gene) in enumerate(proteins):
+            length = 3 * len(protein) + 3
+            pos += int(self.rng.integers(0, 2 * length * (1 - self.cds_density) / self.cds_density + 1))
+            strand = '+' if self.rng.random() < 0.5 else '-'
+            features.append(GenericFeature(
+                seqname=seqname, type_='CDS', start=pos, end=pos + length - 1, strand=strand,
+                attributes=[('gene', gene), ('locus_tag', f'{seqname}_{i + 1:05d}'), ('translation', protein)]))
+            pos += length
+        size = pos + 100
+
+        sequence = self.rng.choice(NUCLEOTIDES, size=size).tobytes().decode()
+        return Chromosome(
+            seqname=seqname,
+            sequence=sequence,
+            features=FeatureArray(seqname=seqname, chromosome_size=size, features=features))
+
+    def write_dir(
+            self,
+            outdir: str,
+            genomes: int,
+            contigs_per_file: int,
+            cds_per_contig: int,
+            locus_copies: int) -> Tuple[str, str]:
+        """
+        Returns query_faa and gbk_dir
+        """
+        gbk_dir = f'{outdir}/gbk_dir'
+        os.makedirs(gbk_dir, exist_ok=True)
+
+        contigs = genomes * contigs_per_file
+        copies_per_contig = np.bincount(self.rng.integers(0, contigs, size=locus_copies), minlength=contigs)
+
+        for g in range(genomes):
+            data = [
+                self.get_contig(
+                    seqname=f'contig_{c + 1}',
+                    n_cds=cds_per_contig,
+                    locus_copies=int(copies_per_contig[g * contigs_per_file + c]))
+                for c in range(contigs_per_file)
+            ]
+            write_genbank(data=data, file=f'{gbk_dir}/genome_{g + 1:05d}.gbk')
+
+        query_faa = f'{outdir}/query.faa'
+        write_fasta(data=[(f'locus_{j}', p) for j, p in enumerate(self.locus_proteins)], file=query_faa)
+
+        return query_faa, gbk_dir
+
+
+def write_synthetic_genbank_dir(
+        outdir: str,
+        genomes: int,
+        contigs_per_file: int = 2,
+        cds_per_contig: int = 50,
+        cds_density: float = 0.88,
+        locus_copies: Optional[int] = None,
+        seed: int = 1) -> Tuple[str, str]:
+    """
+    Returns query_faa and gbk_dir, locus copies being half the number of genomes by default
+    """
+    if locus_copies is None:
+        locus_copies = max(1, genomes // 2)
+    return SyntheticGenbank(seed=seed, cds_density=cds_density).write_dir(
+        outdir=outdir,
+        genomes=genomes,
+        contigs_per_file=contigs_per_file,
+        cds_per_contig=cds_per_contig,
+        locus_copies=locus_copies)
+
+
+def main():
+    outdir = sys.argv[1]
+    genomes = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    query_faa, gbk_dir = write_synthetic_genbank_dir(outdir=outdir, genomes=genomes)
+    print(f'{query_faa}\n{gbk_dir}')
+
+
+if __name__ == '__main__':
+    main()
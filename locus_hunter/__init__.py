@@ -1,8 +1,10 @@
 import os
 import shutil
+from typing import Optional
 from .locus_hunter import LocusHunter
+from .batch import LocusHunterBatch
 from .template import Settings
-from .tools import get_temp_path
+from .tools import get_temp_path, parse_formats
 
 
 def main(
@@ -19,7 +21,24 @@ def main(
         dpi: int,
         output: str,
         threads: int,
-        debug: bool):
+        debug: bool,
+        pooled_search: bool,
+        blast_db_cache: Optional[str],
+        parallel_extraction: bool,
+        alignment_engine: str,
+        sort_method: str,
+        optimal_leaf_ordering: bool,
+        newick: bool,
+        clustering_engine: str,
+        ortholog_catalogue: Optional[str],
+        seed_orthologs_from_hits: bool,
+        formats: str,
+        no_plot: bool,
+        profile: bool,
+        resume: bool,
+        manifest: Optional[str],
+        serve: Optional[int],
+        workers: int):
 
     workdir = get_temp_path(prefix='locus_hunter')
 
@@ -31,7 +50,7 @@ def main(
 
     os.makedirs(workdir)
 
-    LocusHunter(settings).main(
+    kwargs = dict(
         query_faa=query_faa,
         gbk_dir=gbk_dir,
         evalue=evalue,
@@ -43,7 +62,29 @@ def main(
         label_attributes=label_attributes.split(','),
         loci_per_plot=loci_per_plot,
         dpi=dpi,
-        output=output)
+        output=output,
+        pooled_search=pooled_search,
+        blast_db_cache=blast_db_cache,
+        parallel_extraction=parallel_extraction,
+        alignment_engine=alignment_engine,
+        sort_method=sort_method,
+        optimal_leaf_ordering=optimal_leaf_ordering,
+        newick=newick,
+        clustering_engine=clustering_engine,
+        ortholog_catalogue=ortholog_catalogue,
+        seed_orthologs_from_hits=seed_orthologs_from_hits,
+        formats=parse_formats(formats),
+        no_plot=no_plot,
+        profile=profile,
+        resume=resume)
+
+    if serve is not None:
+        from .service import LocusHunterService  # http.server only for the service
+        LocusHunterService(settings).main(port=serve, workers=workers, defaults=kwargs)
+    elif manifest is not None:
+        LocusHunterBatch(settings).main(manifest=manifest, defaults=kwargs)
+    else:
+        LocusHunter(settings).main(**kwargs)
 
     if not settings.debug:
         shutil.rmtree(workdir)
@@ -1,48 +1,37 @@
 import random
 import pandas as pd
-from ngslite import Chromosome
 from typing import Dict, Any, List
 from .template import Processor
-from .constant import COLOR_KEY, ORTHOLOG_ID_KEY
+from .feature_table import FeatureTable, to_object_array
 
 
 class AddColor(Processor):
 
-    loci: List[Chromosome]
+    feature_table: FeatureTable
 
     def main(
             self,
-            loci: List[Chromosome]) -> List[Chromosome]:
+            feature_table: FeatureTable) -> FeatureTable:
 
-        self.loci = loci
+        self.feature_table = feature_table
 
         ortholog_ids = self.get_ortholog_ids()
         color_dict = self.get_color_dict(ortholog_ids=ortholog_ids)
         self.add_color(color_dict=color_dict)
 
-        return self.loci
+        return self.feature_table
 
-    def get_ortholog_ids(self) -> List[str]:
-        ret = []
-        for locus in self.loci:
-            for feature in locus.features:
-                ortholog_id = feature.get_attribute(key=ORTHOLOG_ID_KEY)
-                if ortholog_id is not None:
-                    ret.append(ortholog_id)
-        return ret
+    def get_ortholog_ids(self) -> List[int]:
+        ortholog_id = self.feature_table.ortholog_id
+        return ortholog_id[ortholog_id != FeatureTable.NO_ORTHOLOG_ID].tolist()
 
-    def get_color_dict(self, ortholog_ids: List[str]) -> Dict[str, str]:
+    def get_color_dict(self, ortholog_ids: List[int]) -> Dict[int, str]:
         return ColorDictGenerator().main(keys=ortholog_ids)
 
-    def add_color(self, color_dict: Dict[str, str]):
-        for locus in self.loci:
-            for feature in locus.features:
-                ortholog_id = feature.get_attribute(key=ORTHOLOG_ID_KEY)
-                color = color_dict.get(ortholog_id, None)
-                if color is not None:
-                    feature.add_attribute(
-                        key=COLOR_KEY,
-                        val=color)
+    def add_color(self, color_dict: Dict[int, str]):
+        # NO_ORTHOLOG_ID is not in color_dict, so no color
+        self.feature_table.color = to_object_array(
+            [color_dict.get(o) for o in self.feature_table.ortholog_id.tolist()])
 
 
 class ColorDictGenerator:
@@ -0,0 +1,159 @@
+import csv
+from typing import List, Dict, Any, Optional
+from ngslite import Chromosome
+from .template import Processor
+from .profiler import PROFILER, Profiler
+from .locus_hunter import LocusHunter
+from .tools import parse_formats, list_gbks, get_fingerprint
+
+
+class LocusHunterBatch(Processor):
+    """
+    Many jobs against the same genbank folder, each job being a query faa with its own output and parameters
+
+    The genbank files are scanned and indexed into a pooled (or cached) blastp database once,
+        queries of all jobs are searched at once, and files with hits are parsed once for the loci of all jobs.
+    Stages after extract_loci then run for each job, the same as LocusHunter
+
+    The manifest is a tsv file with a header line and one job per line:
+        query_faa and output are required columns,
+        any other column is a parameter of LocusHunter.main() overriding the default, e.g. evalue or sort_method,
+        list values being comma-separated, bool values true or false, and an empty cell for the default
+
+    With profile, the shared extraction is profiled in f'{output}.shared.profile.*', and each job in its own output
+    """
+
+    REQUIRED_COLUMNS = ['query_faa', 'output']
+    SHARED_PARAMETERS = ['gbk_dir', 'pooled_search', 'blast_db_cache', 'parallel_extraction']
+    SHARED_PROFILE_SUFFIX = '.shared'  # not to collide with the profile of a job of the default output
+
+    manifest: str
+    defaults: Dict[str, Any]
+
+    jobs: List[Dict[str, Any]]
+    job_loci: List[List[Chromosome]]
+    gbk_fingerprint: Dict[str, Optional[Dict[str, int]]]
+
+    def main(self, manifest: str, defaults: Dict[str, Any]):
+        """
+        defaults: keyword arguments of LocusHunter.main(), output being the prefix of the shared profile
+        """
+        self.manifest = manifest
+        self.defaults = defaults
+
+        self.set_jobs()
+
+        PROFILER.reset(enabled=self.defaults['profile'])
+        try:
+            with PROFILER.measure(kind=Profiler.STAGE, name='extract_loci'):
+                self.extract_loci()
+        finally:
+            if self.defaults['profile']:
+                PROFILER.write_report(prefix=f'{self.defaults["output"]}{self.SHARED_PROFILE_SUFFIX}')
+            PROFILER.reset(enabled=False)
+
+        self.run_jobs()
+
+    def set_jobs(self):
+        self.jobs = read_manifest(
+            manifest=self.manifest,
+            defaults=self.defaults,
+            required_columns=self.REQUIRED_COLUMNS,
+            shared_parameters=self.SHARED_PARAMETERS)
+        self.logger.info(f'{len(self.jobs)} jobs in {self.manifest}')
+
+    def extract_loci(self):
+        from .extract_loci import ExtractBatchLoci
+        self.job_loci = ExtractBatchLoci(self.settings).main(
+            query_faas=[job['query_faa'] for job in self.jobs],
+            gbk_dir=self.defaults['gbk_dir'],
+            evalues=[job['evalue'] for job in self.jobs],
+            extensions=[job['extension'] for job in self.jobs],
+            min_hits_per_locus=[job['min_hits_per_locus'] for job in self.jobs],
+            blast_db_cache=self.defaults['blast_db_cache'],
+            parallel_extraction=self.defaults['parallel_extraction'])
+
+    def run_jobs(self):
+        # for the checkpoint of each job, genbank files being scanned only once
+        self.gbk_fingerprint = get_fingerprint(files=list_gbks(gbk_dir=self.defaults['gbk_dir']))
+        for i, (job, loci) in enumerate(zip(self.jobs, self.job_loci)):
+            self.logger.info(f'Job {i + 1}/{len(self.jobs)}: {job["query_faa"]} -> {job["output"]}')
+            BatchJob(self.settings).main(extracted_loci=loci, gbk_fingerprint=self.gbk_fingerprint, **job)
+
+
+class BatchJob(LocusHunter):
+    """
+    LocusHunter of one job of LocusHunterBatch, the loci being extracted by the shared search
+    """
+
+    extracted_loci: List[Chromosome]
+    gbk_fingerprint: Dict[str, Optional[Dict[str, int]]]
+
+    def main(
+            self,
+            extracted_loci: List[Chromosome],
+            gbk_fingerprint: Dict[str, Optional[Dict[str, int]]],
+            **kwargs):
+        """
+        gbk_fingerprint: of the shared genbank files, by get_fingerprint()
+        """
+        self.extracted_loci = extracted_loci
+        self.gbk_fingerprint = gbk_fingerprint
+        super().main(**kwargs)
+
+    def get_input_fingerprint(self) -> Dict[str, Any]:
+        return {**get_fingerprint(files=[self.query_faa]), **self.gbk_fingerprint}
+
+    def extract_loci(self):
+        self.loci = self.extracted_loci
+        if not self.checkpoint.is_finished(self.checkpoint.EXTRACT_LOCI):
+            self.checkpoint.save_loci(loci=self.loci)
+
+
+def read_manifest(
+        manifest: str,
+        defaults: Dict[str, Any],
+        required_columns: List[str],
+        shared_parameters: List[str]) -> List[Dict[str, Any]]:
+    """
+    Returns keyword arguments of LocusHunter.main() of each job
+    """
+    with open(manifest, newline='') as fh:
+        reader = csv.DictReader(fh, delimiter='\t')
+        columns = reader.fieldnames or []
+        rows = list(reader)
+
+    for c in required_columns:
+        assert c in columns, f'Column "{c}" not found in manifest "{manifest}"'
+    for c in columns:
+        assert c in defaults, f'Unknown column "{c}" in manifest "{manifest}"'
+        assert c not in shared_parameters, f'"{c}" is shared by all jobs, and cannot be a column of manifest "{manifest}"'
+
+    ret = []
+    for row in rows:
+        job = dict(defaults)
+        for key, value in row.items():
+            if value is not None and value.strip() != '':
+                job[key] = parse_value(key=key, value=value.strip(), default=defaults[key])
+        ret.append(job)
+
+    outputs = [job['output'] for job in ret]
+    assert len(set(outputs)) == len(outputs), f'Outputs of jobs in manifest "{manifest}" are not unique'
+
+    return ret
+
+
+def parse_value(key: str, value: str, default: Any) -> Any:
+    """
+    Parse a manifest value to the type of the default value
+    """
+    if type(default) is bool:
+        assert value.lower() in ['true', 'false'], f'{key} must be true or false, not "{value}"'
+        return value.lower() == 'true'
+    if key == 'formats':
+        return parse_formats(value)
+    if type(default) is list:
+        return value.split(',')
+    if type(default) in [int, float]:
+        return type(default)(value)
+    return None if value == 'None' else value  # str or Optional[str]
@@ -1,3 +1,4 @@
+import os
 import pandas as pd
 from ngslite import write_fasta
 from typing import List, Tuple, Union
@@ -10,9 +11,12 @@ FAA_DATA_TYPE = List[Tuple[str, str]]
 
 class Blastp(Processor):
 
+    DEFAULT_MAX_TARGET_SEQS = 500  # of blastp
+
     query: Union[str, FAA_DATA_TYPE]
     library: Union[str, FAA_DATA_TYPE]
     evalue: float
+    max_target_seqs: int
 
     query_faa: str
     library_faa: str
@@ -45,6 +49,7 @@ class Blastp(Processor):
         self.query = query
         self.library = library
         self.evalue = evalue
+        self.max_target_seqs = self.DEFAULT_MAX_TARGET_SEQS
 
         self.set_query_faa()
         self.set_library_faa()
@@ -70,17 +75,8 @@ class Blastp(Processor):
             self.library_faa = faa
 
     def set_db(self):
-        logfile = get_temp_path(prefix=f'{self.workdir}/makeblastdb_log')
         self.db = get_temp_path(prefix=f'{self.workdir}/blastp_db')
-        lines = [
-            'makeblastdb',
-            f'-in {self.library_faa}',
-            '-dbtype prot',
-            f'-logfile {logfile}',
-            f'-out {self.db}',
-        ]
-        cmd = self.CMD_LINEBREAK.join(lines)
-        self.call(cmd)
+        MakeBlastDb(self.settings).main(faa=self.library_faa, db=self.db)
 
     def run_blastp(self) -> pd.DataFrame:
         blastp_output = get_temp_path(f'{self.workdir}/blastp', '.tsv')
@@ -90,6 +86,7 @@ class Blastp(Processor):
             f'-query {self.query_faa}',
             f'-db {self.db}',
             f'-evalue {self.evalue}',
+            f'-max_target_seqs {self.max_target_seqs}',
             f'-outfmt 6',
             f'-num_threads {self.threads}',
             f'-out {blastp_output}',
@@ -101,3 +98,72 @@ class Blastp(Processor):
             blastp_output, sep='\t', names=self.output_columns)
 
         return df
+
+
+class BlastpOnDb(Blastp):
+
+    def main(
+            self,
+            query: Union[str, FAA_DATA_TYPE],
+            db: str,
+            evalue: float,
+            max_target_seqs: int) -> pd.DataFrame:
+        """
+        max_target_seqs: e.g. the number of sequences in db, for all hits of each query
+        """
+
+        self.query = query
+        self.db = db
+        self.evalue = evalue
+        self.max_target_seqs = max_target_seqs
+
+        self.set_query_faa()
+        df = self.run_blastp()
+
+        return df
+
+
+class MakeBlastDb(Processor):
+
+    faa: str
+    db: str
+
+    def main(self, faa: str, db: str):
+        self.faa = faa
+        self.db = db
+
+        logfile = get_temp_path(prefix=f'{self.workdir}/makeblastdb_log')
+        lines = [
+            'makeblastdb',
+            f'-in {self.faa}',
+            '-dbtype prot',
+            f'-logfile {logfile}',
+            f'-out {self.db}',
+        ]
+        cmd = self.CMD_LINEBREAK.join(lines)
+        self.call(cmd)
+
+
+class MakeBlastDbAlias(Processor):
+
+    dbs: List[str]
+    alias: str
+
+    def main(self, dbs: List[str], alias: str):
+        self.dbs = dbs
+        self.alias = alias
+
+        dblist = get_temp_path(prefix=f'{self.workdir}/dblist', suffix='.txt')
+        with open(dblist, 'w') as fh:
+            for db in self.dbs:
+                fh.write(os.path.abspath(db) + '\n')
+
+        lines = [
+            'blastdb_aliastool',
+            f'-dblist_file {dblist}',
+            '-dbtype prot',
+            f'-title {os.path.basename(self.alias)}',
+            f'-out {self.alias}',
+        ]
+        cmd = self.CMD_LINEBREAK.join(lines)
+        self.call(cmd)
@@ -0,0 +1,172 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+from typing import List, Dict, Set, Optional
+from .blast import MakeBlastDb
+from .template import Processor
+from .scan_genbank import ScanGenbank
+
+
+class CachedGenbank:
+
+    def __init__(self, db: Optional[str], seqname_to_residues: Dict[str, int], sequences: int):
+        self.db = db
+        self.seqname_to_residues = seqname_to_residues
+        self.sequences = sequences
+
+    def __repr__(self) -> str:
+        return f'CachedGenbank(db={self.db}, seqname_to_residues={self.seqname_to_residues}, sequences={self.sequences})'
+
+
+class BlastDbCache(Processor):
+    """
+    On-disk cache of CDS protein fasta and blastp database for each genbank file
+
+    cache_dir/
+        index.json          genbank file name -> mtime, size and content digest
+        <digest>/
+            library.faa     CDS translations headed by cds_id
+            library.faa.tsv cds_id, start, end and strand of each CDS in library.faa
+            db.*            makeblastdb output, absent if no CDS translation
+            entry.json      db path, residue count of each chromosome and number of sequences in db
+
+    Only entries of the cache are evicted, other folders in cache_dir are left untouched
+    """
+
+    INDEX_JSON = 'index.json'
+    ENTRY_JSON = 'entry.json'
+    LIBRARY_FAA = 'library.faa'
+    CHUNK_SIZE = 2 ** 20
+    DIGEST_PATTERN = re.compile(r'^[0-9a-f]{40}$')  # sha1 hex
+
+    gbks: List[str]
+    cache_dir: str
+    processes: int
+
+    index: Dict[str, Dict[str, str]]
+    previous_digests: Set[str]
+    gbk_to_cached: Dict[str, CachedGenbank]
+
+    def main(
+            self,
+            gbks: List[str],
+            cache_dir: str,
+            processes: int) -> Dict[str, CachedGenbank]:
+
+        self.gbks = gbks
+        self.cache_dir = cache_dir
+        self.processes = processes
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.load_index()
+        self.set_gbk_to_cached()
+        self.save_index()
+        self.evict_unused_entries()
+
+        return self.gbk_to_cached
+
+    def load_index(self):
+        file = f'{self.cache_dir}/{self.INDEX_JSON}'
+        if os.path.exists(file):
+            with open(file) as fh:
+                self.index = json.load(fh)
+        else:
+            self.index = {}
+        self.previous_digests = set(item['digest'] for item in self.index.values())
+
+    def set_gbk_to_cached(self):
+        index = {}
+        gbk_to_entry_dir = {}
+        for gbk in self.gbks:
+            fname = os.path.basename(gbk)
+            stat = os.stat(gbk)
+            item = self.index.get(fname, {})
+            if item.get('mtime_ns') == stat.st_mtime_ns and item.get('size') == stat.st_size:
+                digest = item['digest']
+            else:
+                digest = self.get_digest(gbk)
+            gbk_to_entry_dir[gbk] = f'{self.cache_dir}/{digest}'
+            index[fname] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'digest': digest}
+
+        kwargs_list = [
+            {'gbk': gbk, 'entry_dir': entry_dir}
+            for gbk, entry_dir in gbk_to_entry_dir.items()
+            if not os.path.exists(f'{entry_dir}/{self.ENTRY_JSON}')
+        ]
+        for _ in self.imap_processor(
+                processor_class=BuildCacheEntry,
+                kwargs_list=kwargs_list,
+                processes=self.processes):
+            pass
+
+        self.gbk_to_cached = {
+            gbk: self.read_entry(entry_dir=entry_dir)
+            for gbk, entry_dir in gbk_to_entry_dir.items()
+        }
+        self.index = index
+
+        built = len(kwargs_list)
+        self.logger.info(f'Blastp database cache: {len(self.gbks) - built} reused, {built} built')
+
+    def get_digest(self, gbk: str) -> str:
+        # file name is part of the key because it is embedded in every cds_id
+        h = hashlib.sha1(os.path.basename(gbk).encode())
+        with open(gbk, 'rb') as fh:
+            for chunk in iter(lambda: fh.read(self.CHUNK_SIZE), b''):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def read_entry(self, entry_dir: str) -> CachedGenbank:
+        with open(f'{entry_dir}/{self.ENTRY_JSON}') as fh:
+            d = json.load(fh)
+        db = None if d['db'] is None else f'{entry_dir}/{d["db"]}'
+        return CachedGenbank(db=db, seqname_to_residues=d['seqname_to_residues'], sequences=d['sequences'])
+
+    def save_index(self):
+        with open(f'{self.cache_dir}/{self.INDEX_JSON}', 'w') as fh:
+            json.dump(self.index, fh, indent=2)
+
+    def evict_unused_entries(self):
+        used = set(item['digest'] for item in self.index.values())
+        for name in os.listdir(self.cache_dir):
+            path = f'{self.cache_dir}/{name}'
+            if os.path.isdir(path) and name not in used and self.is_entry(name=name, path=path):
+                self.logger.debug(f'Evict {path}')
+                shutil.rmtree(path)
+
+    def is_entry(self, name: str, path: str) -> bool:
+        if name in self.previous_digests:
+            return True
+        return self.DIGEST_PATTERN.match(name) is not None and os.path.exists(f'{path}/{self.ENTRY_JSON}')
+
+
+class BuildCacheEntry(Processor):
+
+    gbk: str
+    entry_dir: str
+
+    def main(self, gbk: str, entry_dir: str):
+        self.gbk = gbk
+        self.entry_dir = entry_dir
+
+        if os.path.exists(self.entry_dir):  # incomplete entry from an interrupted run
+            shutil.rmtree(self.entry_dir)
+        os.makedirs(self.entry_dir)
+
+        faa = f'{self.entry_dir}/{BlastDbCache.LIBRARY_FAA}'
+        seqname_to_residues = ScanGenbank(self.settings).main(gbk=self.gbk, faa=faa)
+        with open(f'{faa}{ScanGenbank.COORDINATE_SUFFIX}') as fh:
+            sequences = sum(1 for _ in fh)  # one line per CDS
+
+        if len(seqname_to_residues) > 0:
+            db = 'db'
+            MakeBlastDb(self.settings).main(faa=faa, db=f'{self.entry_dir}/{db}')
+        else:
+            db = None
+
+        # entry.json is written last, marking the entry as complete
+        with open(f'{self.entry_dir}/{BlastDbCache.ENTRY_JSON}', 'w') as fh:
+            json.dump({'db': db, 'seqname_to_residues': seqname_to_residues, 'sequences': sequences}, fh)
@@ -54,3 +54,64 @@ class CdHit(Processor):
                     ret[protein_id] = cluster_id
 
         return ret
+
+
+class CdHit2D(Processor):
+
+    faa1: str
+    faa2: str
+    sequence_identity: float
+
+    def main(
+            self,
+            faa1: str,
+            faa2: str,
+            sequence_identity: float) -> Dict[str, str]:
+        """
+        Proteins in faa2 similar to those in faa1, {protein in faa2: protein in faa1}
+        """
+        self.faa1 = faa1
+        self.faa2 = faa2
+        self.sequence_identity = sequence_identity
+
+        clstr = self.run_cd_hit_2d()
+        return self.read_clstr(file=clstr)
+
+    def run_cd_hit_2d(self) -> str:
+        output = get_temp_path(prefix=f'{self.workdir}/cd_hit_2d_output')
+        lines = [
+            'cd-hit-2d',
+            f'-i {self.faa1}',
+            f'-i2 {self.faa2}',
+            f'-c {self.sequence_identity}',
+            '-d 0',
+            f'-T {self.threads}',
+            f'-o {output}',
+            f'1> {self.workdir}/cd-hit-2d.log',
+            f'2> {self.workdir}/cd-hit-2d.log',
+        ]
+        cmd = self.CMD_LINEBREAK.join(lines)
+        self.call(cmd)
+        return f'{output}.clstr'
+
+    def read_clstr(self, file: str) -> Dict[str, str]:
+
+        ret = {}
+
+        clusters = []
+        with open(file) as fh:
+            for line in fh:
+                if line.startswith('>Cluster'):
+                    clusters.append([])
+                else:
+                    protein_id = line.split(', >')[1].split('... ')[0]
+                    is_representative = line.rstrip().endswith('*')  # proteins of faa1 are representatives
+                    clusters[-1].append((protein_id, is_representative))
+
+        for cluster in clusters:
+            representative = [p for p, is_rep in cluster if is_rep][0]
+            for protein_id, is_rep in cluster:
+                if not is_rep:
+                    ret[protein_id] = representative
+
+        return ret
@@ -0,0 +1,130 @@
+import os
+import gzip
+import json
+import shutil
+import pickle
+import numpy as np
+from typing import List, Dict, Any
+from ngslite import Chromosome
+from .feature_table import FeatureTable, to_object_array
+
+
+class Checkpoint:
+    """
+    Outputs of finished stages, kept outside the temporary workdir so that a crashed run can be resumed
+
+    directory/
+        checkpoint.json     parameters of each finished stage
+        loci.pickle.gz      extracted loci, before the feature table is built from them
+        sort_loci.npz       order of the sorted loci among the extracted loci, and ortholog ids of their CDS
+        add_color.json      color of each CDS of the sorted loci
+
+    A stage is resumed only if it and all stages before it finished with the same parameters.
+    A disabled checkpoint writes nothing, and no stage is finished
+    """
+
+    EXTRACT_LOCI = 'extract_loci'
+    SORT_LOCI = 'sort_loci'
+    ADD_COLOR = 'add_color'
+    STAGES = [EXTRACT_LOCI, SORT_LOCI, ADD_COLOR]
+
+    CHECKPOINT_JSON = 'checkpoint.json'
+    LOCI_PICKLE = 'loci.pickle.gz'
+    SORT_LOCI_NPZ = 'sort_loci.npz'
+    ADD_COLOR_JSON = 'add_color.json'
+
+    directory: str
+    stage_to_parameters: Dict[str, Dict[str, Any]]
+    enabled: bool
+    finished: Dict[str, Dict[str, Any]]
+
+    def __init__(
+            self,
+            directory: str,
+            stage_to_parameters: Dict[str, Dict[str, Any]],
+            resume: bool,
+            enabled: bool = True):
+
+        self.directory = directory
+        self.stage_to_parameters = stage_to_parameters
+        self.enabled = enabled
+        self.finished = {}
+
+        if not self.enabled:
+            return
+
+        if not resume and os.path.exists(self.directory):
+            shutil.rmtree(self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+
+        file = f'{self.directory}/{self.CHECKPOINT_JSON}'
+        if os.path.exists(file):
+            with open(file) as fh:
+                self.finished = json.load(fh)
+
+    def is_finished(self, stage: str) -> bool:
+        for s in self.STAGES[:self.STAGES.index(stage) + 1]:
+            if self.finished.get(s) != self.stage_to_parameters[s]:
+                return False
+        return True
+
+    def save_loci(self, loci: List[Chromosome]):
+        if not self.enabled:
+            return
+        with gzip.open(self.__temp(self.LOCI_PICKLE), 'wb', compresslevel=1) as fh:
+            pickle.dump(loci, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        self.__finish(stage=self.EXTRACT_LOCI, file=self.LOCI_PICKLE)
+
+    def load_loci(self) -> List[Chromosome]:
+        with gzip.open(f'{self.directory}/{self.LOCI_PICKLE}', 'rb') as fh:
+            return pickle.load(fh)
+
+    def save_sort_loci(self, extracted_loci: List[Chromosome], feature_table: FeatureTable):
+        if not self.enabled:
+            return
+        index = {id(locus): i for i, locus in enumerate(extracted_loci)}
+        order = np.array([index[id(locus)] for locus in feature_table.loci], dtype=np.int64)
+        with open(self.__temp(self.SORT_LOCI_NPZ), 'wb') as fh:
+            np.savez(fh, order=order, ortholog_id=feature_table.ortholog_id)
+        self.__finish(stage=self.SORT_LOCI, file=self.SORT_LOCI_NPZ)
+
+    def load_sort_loci(self, feature_table: FeatureTable) -> FeatureTable:
+        """
+        feature_table: built from the extracted loci
+        """
+        with np.load(f'{self.directory}/{self.SORT_LOCI_NPZ}') as npz:
+            ret = feature_table.take_loci(idx=npz['order'])
+            ret.ortholog_id = npz['ortholog_id']
+        return ret
+
+    def save_add_color(self, feature_table: FeatureTable):
+        if not self.enabled:
+            return
+        with open(self.__temp(self.ADD_COLOR_JSON), 'w') as fh:
+            json.dump(feature_table.color.tolist(), fh)
+        self.__finish(stage=self.ADD_COLOR, file=self.ADD_COLOR_JSON)
+
+    def load_add_color(self, feature_table: FeatureTable) -> FeatureTable:
+        with open(f'{self.directory}/{self.ADD_COLOR_JSON}') as fh:
+            feature_table.color = to_object_array(json.load(fh))
+        return feature_table
+
+    def remove(self):
+        if self.enabled:
+            shutil.rmtree(self.directory)
+
+    def __temp(self, file: str) -> str:
+        # written to a temporary file and then moved, such that a crash while writing leaves no broken file
+        return f'{self.directory}/{file}.tmp'
+
+    def __finish(self, stage: str, file: str):
+        os.replace(self.__temp(file), f'{self.directory}/{file}')
+
+        self.finished[stage] = self.stage_to_parameters[stage]
+        # a later stage has to be rerun if an earlier one is rerun
+        for s in self.STAGES[self.STAGES.index(stage) + 1:]:
+            self.finished.pop(s, None)
+
+        with open(self.__temp(self.CHECKPOINT_JSON), 'w') as fh:
+            json.dump(self.finished, fh, indent=2)
+        os.replace(self.__temp(self.CHECKPOINT_JSON), f'{self.directory}/{self.CHECKPOINT_JSON}')
@@ -1,3 +1,4 @@
 CDS_ID_KEY = 'cds_id'
 ORTHOLOG_ID_KEY = 'ortholog_id'
+QUERY_HIT_KEY = 'query_hit'
 COLOR_KEY = 'Color'
@@ -1,23 +1,42 @@
 import os
-from copy import deepcopy
-from typing import List, Tuple
-from ngslite import Chromosome, read_genbank, get_files, GenericFeature
-from .blast import Blastp
+import shutil
+import pandas as pd
+from copy import copy
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple, Dict, Optional, Iterator
+from ngslite import Chromosome, FeatureArray, GenericFeature, read_fasta, write_fasta
+from .tools import get_temp_path, list_gbks
 from .template import Processor
-from .constant import CDS_ID_KEY
-
-
-JOINER = '___'
+from .constant import CDS_ID_KEY, QUERY_HIT_KEY
+from .blast_db_cache import BlastDbCache
+from .read_genbank import ReadGenbank, JOINER
+from .scan_genbank import ScanGenbank, iterate_scanned_records
+from .interval import Interval, merge_intervals, merge_circular_intervals
+from .blast import Blastp, BlastpOnDb, MakeBlastDb, MakeBlastDbAlias
 
 
 class ExtractLoci(Processor):
+    """
+    Two phases:
+        1. Search, blastp of the query against CDS translations scanned from the genbank text
+            (per chromosome, pooled or cached), without fully parsing any genbank file
+        2. Extraction, full parsing, cropping and annotation of the records with hits only
+
+    Genbank files without any hit are skipped in phase 2
+    """
 
     query_faa: str
     gbk_dir: str
     evalue: float
     extension: int
     min_hits_per_locus: int
+    pooled_search: bool
+    blast_db_cache: Optional[str]
+    parallel_extraction: bool
 
+    processes: int
+    gbks: List[str]
+    skipped_gbks: List[str]
     loci = List[Chromosome]
 
     def main(
@@ -26,90 +45,370 @@ class ExtractLoci(Processor):
             gbk_dir: str,
             evalue: float,
             extension: int,
-            min_hits_per_locus: int) -> List[Chromosome]:
+            min_hits_per_locus: int,
+            pooled_search: bool,
+            blast_db_cache: Optional[str],
+            parallel_extraction: bool) -> List[Chromosome]:
+
+        self.loci = list(self.iterate(
+            query_faa=query_faa,
+            gbk_dir=gbk_dir,
+            evalue=evalue,
+            extension=extension,
+            min_hits_per_locus=min_hits_per_locus,
+            pooled_search=pooled_search,
+            blast_db_cache=blast_db_cache,
+            parallel_extraction=parallel_extraction))
+
+        return self.loci
+
+    def iterate(
+            self,
+            query_faa: str,
+            gbk_dir: str,
+            evalue: float,
+            extension: int,
+            min_hits_per_locus: int,
+            pooled_search: bool,
+            blast_db_cache: Optional[str],
+            parallel_extraction: bool) -> Iterator[Chromosome]:
+        """
+        Yield loci as soon as they are cropped, so that the caller decides whether to
+            keep them in memory or spill them to disk
+        """
 
         self.query_faa = query_faa
         self.gbk_dir = gbk_dir
         self.evalue = evalue
         self.extension = extension
         self.min_hits_per_locus = min_hits_per_locus
+        self.pooled_search = pooled_search
+        self.blast_db_cache = blast_db_cache
+        self.parallel_extraction = parallel_extraction
+
+        self.processes = self.threads if self.parallel_extraction else 1
+        self.gbks = self.get_gbks()
+
+        if self.blast_db_cache is not None or self.pooled_search:
+            gbk_to_seqname_to_hits = self.search_by_genome_index()
+        else:
+            gbk_to_seqname_to_hits = self.search_by_chromosome()
+
+        yield from self.extract_loci_from(gbk_to_seqname_to_hits=gbk_to_seqname_to_hits)
+
+    def search_by_chromosome(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        kwargs_list = [{
+            'gbk': gbk,
+            'query_faa': self.query_faa,
+            'evalue': self.evalue,
+        } for gbk in self.gbks]
+
+        results = self.imap_processor(
+            processor_class=SearchGenbank,
+            kwargs_list=kwargs_list,
+            processes=self.processes)
+
+        return dict(zip(self.gbks, results))
+
+    def search_by_genome_index(self) -> Dict[str, Dict[str, Dict[str, str]]]:
+        index = self.get_genome_index()
+        if index.db is None:
+            return {}
+
+        return self.search_pooled_db(index=index)
+
+    def build_pooled_db(self) -> 'GenomeIndex':
+        """
+        Blastp database of CDS pooled from all genbank files
+        """
+        faa = get_temp_path(prefix=f'{self.workdir}/pooled_library', suffix='.faa')
+        gbk_to_seqnames, seqname_to_residues, sequences = {}, {}, 0
+        kwargs_list = [{'gbk': gbk} for gbk in self.gbks]
+        with open(faa, 'w') as writer:
+            results = self.imap_processor(
+                processor_class=WriteGenbankCdsFaa,
+                kwargs_list=kwargs_list,
+                processes=self.processes)
+            for gbk, (gbk_faa, residues) in zip(self.gbks, results):
+                with open(gbk_faa) as reader:
+                    shutil.copyfileobj(reader, writer)
+                os.remove(gbk_faa)
+                sequences += count_lines(f'{gbk_faa}{ScanGenbank.COORDINATE_SUFFIX}')  # one line per CDS
+                os.remove(f'{gbk_faa}{ScanGenbank.COORDINATE_SUFFIX}')
+                gbk_to_seqnames[gbk] = list(residues.keys())
+                seqname_to_residues.update(residues)
+
+        if len(seqname_to_residues) == 0:
+            db = None
+        else:
+            db = get_temp_path(prefix=f'{self.workdir}/pooled_db')
+            MakeBlastDb(self.settings).main(faa=faa, db=db)
+
+        return GenomeIndex(
+            gbks=self.gbks,
+            db=db,
+            gbk_to_seqnames=gbk_to_seqnames,
+            seqname_to_residues=seqname_to_residues,
+            sequences=sequences)
+
+    def alias_cached_db(self) -> 'GenomeIndex':
+        """
+        The same as build_pooled_db(), but an alias of the cached database of each genbank file
+        """
+        gbk_to_cached = BlastDbCache(self.settings).main(
+            gbks=self.gbks,
+            cache_dir=self.blast_db_cache,
+            processes=self.processes)
+
+        dbs, gbk_to_seqnames, seqname_to_residues, sequences = [], {}, {}, 0
+        for gbk, cached in gbk_to_cached.items():
+            gbk_to_seqnames[gbk] = list(cached.seqname_to_residues.keys())
+            if cached.db is not None:
+                dbs.append(cached.db)
+                seqname_to_residues.update(cached.seqname_to_residues)
+                sequences += cached.sequences
+
+        if len(dbs) == 0:
+            db = None
+        else:
+            db = get_temp_path(prefix=f'{self.workdir}/pooled_db')
+            MakeBlastDbAlias(self.settings).main(dbs=dbs, alias=db)
+
+        return GenomeIndex(
+            gbks=self.gbks,
+            db=db,
+            gbk_to_seqnames=gbk_to_seqnames,
+            seqname_to_residues=seqname_to_residues,
+            sequences=sequences)
+
+    def search_pooled_db(self, index: 'GenomeIndex') -> Dict[str, Dict[str, Dict[str, str]]]:
+
+        seqname_to_hits = PooledSearch(self.settings).main(
+            query_faa=self.query_faa,
+            db=index.db,
+            seqname_to_residues=index.seqname_to_residues,
+            sequences=index.sequences,
+            evalue=self.evalue)
 
-        self.loci = []
-
-        gbks = self.get_gbks()
-        for gbk in gbks:
-            chromosomes = self.read_genbank(gbk)
-            for chromosome in chromosomes:
-                self.extrac_loci_from(chromosome)
+        return {
+            gbk: {s: seqname_to_hits[s] for s in seqnames if s in seqname_to_hits}
+            for gbk, seqnames in index.gbk_to_seqnames.items()
+        }
 
-        return self.loci
+    def get_genome_index(self) -> 'GenomeIndex':
+        if self.blast_db_cache is not None:
+            return self.alias_cached_db()
+        else:
+            return self.build_pooled_db()
 
     def get_gbks(self) -> List[str]:
-        files = get_files(source=self.gbk_dir, isfullpath=True)
-        gbks = [f for f in files
-                if not os.path.basename(f).startswith('.')]
-        return gbks
+        return list_gbks(gbk_dir=self.gbk_dir)
 
-    def read_genbank(self, gbk: str) -> List[Chromosome]:
-        return ReadGenbank(self.settings).main(gbk=gbk)
-
-    def extrac_loci_from(self, chromosome: Chromosome):
-        loci = self.get_loci_from(chromosome)
-        self.log(chromosome=chromosome, loci=loci)
-        self.loci += loci
-
-    def get_loci_from(self, chromosome: Chromosome) -> List[Chromosome]:
-        return GetLociFromChromosome(self.settings).main(
-            query_faa=self.query_faa,
-            chromosome=chromosome,
-            evalue=self.evalue,
-            extension=self.extension,
-            min_hits_per_locus=self.min_hits_per_locus)
+    def extract_loci_from(
+            self,
+            gbk_to_seqname_to_hits: Dict[str, Dict[str, Dict[str, str]]]) -> Iterator[Chromosome]:
+
+        gbk_to_seqname_to_hits = self.skip_gbks_without_hits(gbk_to_seqname_to_hits=gbk_to_seqname_to_hits)
+
+        kwargs_list = [{
+            'gbk': gbk,
+            'query_faa': self.query_faa,
+            'evalue': self.evalue,
+            'extension': self.extension,
+            'min_hits_per_locus': self.min_hits_per_locus,
+            'seqname_to_hits': seqname_to_hits,
+        } for gbk, seqname_to_hits in gbk_to_seqname_to_hits.items()]
+
+        results = self.imap_processor(
+            processor_class=GetLociFromGenbank,
+            kwargs_list=kwargs_list,
+            processes=self.processes)
+
+        for seqname_loci_pairs in results:
+            for seqname, loci in seqname_loci_pairs:
+                self.log(seqname=seqname, loci=loci)
+                yield from loci
+
+    def skip_gbks_without_hits(self, gbk_to_seqname_to_hits: Dict[str, dict]) -> Dict[str, dict]:
+        # no need to parse genbank files without any hit
+        ret = {gbk: d for gbk, d in gbk_to_seqname_to_hits.items() if len(d) > 0}
+        self.skipped_gbks = [gbk for gbk in self.gbks if gbk not in ret]
+        self.logger.info(
+            f'{len(ret)} genbank files with hits to extract loci from, '
+            f'{len(self.skipped_gbks)} skipped without parsing')
+        return ret
 
     def log(self,
-            chromosome: Chromosome,
+            seqname: str,
             loci: List[Chromosome]):
-        msg = f'{chromosome.seqname} -> {len(loci)} loci'
+        msg = f'{seqname} -> {len(loci)} loci'
         self.logger.info(msg)
 
 
-class ReadGenbank(Processor):
+class WriteGenbankCdsFaa(Processor):
 
     gbk: str
 
-    def main(self, gbk: str) -> List[Chromosome]:
+    def main(self, gbk: str) -> Tuple[str, Dict[str, int]]:
         self.gbk = gbk
 
-        chromosomes = read_genbank(file=self.gbk)
+        faa = get_temp_path(prefix=f'{self.workdir}/cds', suffix='.faa')
+        seqname_to_residues = ScanGenbank(self.settings).main(gbk=self.gbk, faa=faa)
+
+        return faa, seqname_to_residues
+
+
+class SearchGenbank(Processor):
+
+    gbk: str
+    query_faa: str
+    evalue: float
+
+    seqname_to_hits: Dict[str, Dict[str, str]]
+
+    def main(
+            self,
+            gbk: str,
+            query_faa: str,
+            evalue: float) -> Dict[str, Dict[str, str]]:
+        """
+        Blastp on each chromosome, against CDS translations scanned from the genbank text without parsing it
+
+        Returns {seqname: {cds_id: query}} of chromosomes with any hit
+        """
+        self.gbk = gbk
+        self.query_faa = query_faa
+        self.evalue = evalue
+
+        self.seqname_to_hits = {}
+        for seqname, cds_list in iterate_scanned_records(gbk=self.gbk):
+            if len(cds_list) == 0:
+                continue
+
+            df = Blastp(self.settings).main(
+                query=self.query_faa,
+                library=[(cds.cds_id, cds.translation) for cds in cds_list],
+                evalue=self.evalue)
+
+            hits = get_best_query_hits(df=df)
+            if len(hits) > 0:
+                self.seqname_to_hits[seqname] = hits
+
+        return self.seqname_to_hits
 
+
+class GetLociFromGenbank(Processor):
+
+    gbk: str
+    query_faa: str
+    evalue: float
+    extension: int
+    min_hits_per_locus: int
+    seqname_to_hits: Dict[str, Dict[str, str]]
+
+    def main(
+            self,
+            gbk: str,
+            query_faa: str,
+            evalue: float,
+            extension: int,
+            min_hits_per_locus: int,
+            seqname_to_hits: Dict[str, Dict[str, str]]) -> List[Tuple[str, List[Chromosome]]]:
+        """
+        Returns (seqname, loci) of each chromosome with any hit, so that only the cropped loci
+            have to be passed back from a worker process
+
+        Only chromosomes with hits are fully parsed
+        """
+
+        self.gbk = gbk
+        self.query_faa = query_faa
+        self.evalue = evalue
+        self.extension = extension
+        self.min_hits_per_locus = min_hits_per_locus
+        self.seqname_to_hits = seqname_to_hits
+
+        chromosomes = ReadGenbank(self.settings).iterate(
+            gbk=self.gbk,
+            seqnames=set(self.seqname_to_hits.keys()))
+
+        ret = []
         for chromosome in chromosomes:
-            self.modify_one(chromosome)
+            loci = GetLociFromChromosome(self.settings).main(
+                query_faa=self.query_faa,
+                chromosome=chromosome,
+                evalue=self.evalue,
+                extension=self.extension,
+                min_hits_per_locus=self.min_hits_per_locus,
+                hits=self.seqname_to_hits[chromosome.seqname])
+            ret.append((chromosome.seqname, loci))
+        return ret
+
+
+class PooledSearch(Processor):
+    """
+    One blastp search against CDS pooled from many chromosomes, approximating a search on each chromosome one by one
+
+    The e-value of each hit is rescaled linearly from the pooled database to the residues of its own chromosome.
+    BLAST's effective search space is not linear in residues (length adjustment, number of sequences),
+        so hits near the e-value cutoff, especially on small contigs, may differ from those searched one by one
+    """
+
+    query_faa: str
+    db: str
+    seqname_to_residues: Dict[str, int]
+    sequences: int
+    evalue: float
+
+    seqname_to_hits: Dict[str, Dict[str, str]]
 
-        return chromosomes
+    def main(
+            self,
+            query_faa: str,
+            db: str,
+            seqname_to_residues: Dict[str, int],
+            sequences: int,
+            evalue: float) -> Dict[str, Dict[str, str]]:
+        """
+        sequences: number of sequences in db
+        """
+
+        self.query_faa = query_faa
+        self.db = db
+        self.seqname_to_residues = seqname_to_residues
+        self.sequences = sequences
+        self.evalue = evalue
 
-    def modify_one(self, chromosome: Chromosome):
-        fname = os.path.basename(self.gbk)
-        chromosome.seqname = f'{fname}{JOINER}{chromosome.seqname}'
-        for i, feature in enumerate(chromosome.features):
-            if feature.type == 'CDS':
-                feature.add_attribute(
-                    key=CDS_ID_KEY,
-                    val=f'{chromosome.seqname}{JOINER}{i+1}')
+        self.set_seqname_to_hits()
 
+        return self.seqname_to_hits
 
-class Interval:
+    def set_seqname_to_hits(self):
+        df = self.blastp_rescaled(evalue=self.evalue)
+        df = cap_target_seqs(df=df[df['evalue'] <= self.evalue], max_target_seqs=Blastp.DEFAULT_MAX_TARGET_SEQS)
+        self.seqname_to_hits = group_by_seqname(hits=get_best_query_hits(df=df))
 
-    def __init__(self, start: int, end: int, names: List[str]):
-        assert start <= end
-        self.start = start
-        self.end = end
-        self.names = names
+    def blastp_rescaled(self, evalue: float) -> pd.DataFrame:
+        # E-value is taken as linear in the database size (an approximation, see the class docstring),
+        #   so the pooled search is run with the cutoff of the smallest chromosome,
+        #   and each hit is then rescaled to the size of its own chromosome, as if searched one by one.
+        # The search cutoff grows with total / smallest, e.g. with tiny contigs, which only makes blastp slower:
+        #   hits are filtered again at their rescaled e-values, and therefore not more permissive
+        total = sum(self.seqname_to_residues.values())
+        smallest = min(self.seqname_to_residues.values())
 
-    def __str__(self) -> str:
-        return f'{self.start}-{self.end} names={self.names}'
+        # All subjects of the pooled database are reported,
+        #   and the default max_target_seqs of each chromosome is applied after rescaling, by cap_target_seqs()
+        df = BlastpOnDb(self.settings).main(
+            query=self.query_faa,
+            db=self.db,
+            evalue=evalue * total / smallest,
+            max_target_seqs=max(self.sequences, BlastpOnDb.DEFAULT_MAX_TARGET_SEQS))
 
-    def __repr__(self) -> str:
-        return f'Interval(start={self.start}, end={self.end}, names={self.names})'
+        seqnames = df['subject'].str.rsplit(JOINER, n=1).str[0]
+        residues = seqnames.map(self.seqname_to_residues)
+        df['evalue'] = df['evalue'] * residues / total
+        return df
 
 
 class GetLociFromChromosome(Processor):
@@ -121,9 +420,11 @@ class GetLociFromChromosome(Processor):
     min_hits_per_locus: int
 
     cds_features: List[GenericFeature]
-    hit_cds_ids: List[str]
+    hits: Dict[str, str]
     cds_intervals: List[Interval]
     merged_intervals: List[Interval]
+    features: List[GenericFeature]
+    feature_starts: List[int]
     loci: List[Chromosome]
 
     def main(
@@ -132,24 +433,26 @@ class GetLociFromChromosome(Processor):
             chromosome: Chromosome,
             evalue: float,
             extension: int,
-            min_hits_per_locus: int) -> List[Chromosome]:
+            min_hits_per_locus: int,
+            hits: Dict[str, str]) -> List[Chromosome]:
 
         self.query_faa = query_faa
         self.chromosome = chromosome
         self.evalue = evalue
         self.extension = extension
         self.min_hits_per_locus = min_hits_per_locus
+        self.hits = hits
 
         self.set_cds_features()
 
-        if len(self.cds_features) == 0:
+        if len(self.cds_features) == 0 or len(self.hits) == 0:
             return []
 
-        self.set_hit_cds_ids()
         self.set_cds_intervals()
         self.set_merged_intervals()
         self.filter_merged_intervals()
         self.set_loci()
+        self.add_query_hits()
 
         return self.loci
 
@@ -159,57 +462,25 @@ class GetLociFromChromosome(Processor):
             if f.type == 'CDS'
         ]
 
-    def set_hit_cds_ids(self):
-
-        library = self.__get_library_faa_data()
-
-        df = Blastp(self.settings).main(
-            query=self.query_faa,
-            library=library,
-            evalue=self.evalue)
-
-        self.hit_cds_ids = sorted(df['subject'].unique())
-
-    def __get_library_faa_data(self) -> List[Tuple[str, str]]:
-        ret = []
-        for feature in self.cds_features:
-            cds_id = feature.get_attribute(key=CDS_ID_KEY)
-            seq = feature.get_attribute(key='translation')
-            if seq is not None:
-                ret.append((cds_id, seq))
-        return ret
-
     def set_cds_intervals(self):
 
-        cds_dict = {c: True for c in self.hit_cds_ids}
-
         self.cds_intervals = []
         for feature in self.cds_features:
             cds_id = feature.get_attribute(key=CDS_ID_KEY)
-            in_cds_dict = cds_dict.get(cds_id, False)
-            if in_cds_dict:
+            if cds_id in self.hits:
                 start = feature.start - self.extension
                 end = feature.end + self.extension
                 interval = Interval(start=start, end=end, names=[cds_id])
                 self.cds_intervals.append(interval)
 
     def set_merged_intervals(self):
-
-        m = self.cds_intervals[0:1]
-
-        for this in self.cds_intervals[1:]:
-            last = m[-1]
-            if overlap(this, last):
-                merged_interval = Interval(
-                    start=last.start,
-                    end=this.end,
-                    names=last.names + this.names
-                )
-                m[-1] = merged_interval
-            else:
-                m.append(this)
-
-        self.merged_intervals = m
+        if self.chromosome.circular:
+            self.merged_intervals = merge_circular_intervals(
+                intervals=self.cds_intervals,
+                size=len(self.chromosome.sequence))
+        else:
+            self.merged_intervals = merge_intervals(
+                intervals=self.cds_intervals)
 
     def filter_merged_intervals(self):
         self.merged_intervals = [
@@ -218,19 +489,390 @@ class GetLociFromChromosome(Processor):
         ]
 
     def set_loci(self):
+        self.features = list(self.chromosome.features)
+        self.feature_starts = [f.start for f in self.features]  # features are sorted by start
+
         self.loci = []
         for interval in self.merged_intervals:
             locus = self.__get_locus(start=interval.start, end=interval.end)
             self.loci.append(locus)
 
+    def add_query_hits(self):
+        # features of loci are copies, the chromosome is not modified
+        for locus in self.loci:
+            for feature in locus.features:
+                if feature.type != 'CDS':
+                    continue
+                query = self.hits.get(feature.get_attribute(key=CDS_ID_KEY))
+                if query is not None:
+                    feature.add_attribute(key=QUERY_HIT_KEY, val=query)
+
     def __get_locus(self, start: int, end: int) -> Chromosome:
-        locus = deepcopy(self.chromosome)
-        locus.genbank_locus_text = ''
-        locus.seqname = f'{locus.seqname}{JOINER}{start:,d}-{end:,d}'
+        size = len(self.chromosome.sequence)
+        if self.chromosome.circular and end > size:
+            return self.__get_locus_across_origin(start=start, end=end)
+
+        # Instead of deepcopying the whole chromosome, only features that can fall within
+        #   the locus are copied, and the sequence string is shared until it is sliced by crop()
+        locus = Chromosome(
+            seqname=f'{self.chromosome.seqname}{JOINER}{start:,d}-{end:,d}',
+            sequence=self.chromosome.sequence,
+            features=self.__get_feature_array(start=start, end=end),
+            circular=self.chromosome.circular,
+            genbank_locus_text='')
         locus.crop(start, end)
         locus.circular = False
         return locus
 
+    def __get_locus_across_origin(self, start: int, end: int) -> Chromosome:
+        size = len(self.chromosome.sequence)
+        tail_end = end - size  # the locus continues from 1 to tail_end after the origin
+
+        def shift(pos: int) -> int:
+            return pos - start + 1 if pos >= start else pos + size - start + 1
+
+        features = []
+        for f in self.features:
+            before_origin = f.start >= start and (f.start <= f.end or f.end <= tail_end)
+            after_origin = f.start <= f.end <= tail_end
+            if not (before_origin or after_origin):
+                continue
+            f = copy_feature(f)
+            f.start, f.end = shift(f.start), shift(f.end)
+            f.regions = [(shift(a), shift(b), c) for a, b, c in f.regions]
+            features.append(f)
+
+        sequence = self.chromosome.sequence[start-1:] + self.chromosome.sequence[:tail_end]
+
+        return Chromosome(
+            seqname=f'{self.chromosome.seqname}{JOINER}{start:,d}-{tail_end:,d}',
+            sequence=sequence,
+            features=FeatureArray(
+                seqname=self.chromosome.features.seqname,
+                chromosome_size=len(sequence),
+                features=features,
+                circular=self.chromosome.features.circular),
+            circular=False,
+            genbank_locus_text='')
+
+    def __get_feature_array(self, start: int, end: int) -> FeatureArray:
+        # crop() keeps features lying within start..end, all of which start within start..end
+        i = bisect_left(self.feature_starts, max(start, 1))
+        j = bisect_right(self.feature_starts, end)
+        return FeatureArray(
+            seqname=self.chromosome.features.seqname,
+            chromosome_size=self.chromosome.features.chromosome_size,
+            features=[copy_feature(f) for f in self.features[i:j]],
+            circular=self.chromosome.features.circular)
+
+
+class GenomeIndex:
+    """
+    Pooled (or cached) blastp database of the CDS of a genbank folder, db being None if there is no CDS,
+        which can be searched by many queries without scanning the genbank files again
+    """
+
+    gbks: List[str]
+    db: Optional[str]
+    gbk_to_seqnames: Dict[str, List[str]]
+    seqname_to_residues: Dict[str, int]
+    sequences: int
+
+    def __init__(
+            self,
+            gbks: List[str],
+            db: Optional[str],
+            gbk_to_seqnames: Dict[str, List[str]],
+            seqname_to_residues: Dict[str, int],
+            sequences: int):
+        self.gbks = gbks
+        self.db = db
+        self.gbk_to_seqnames = gbk_to_seqnames
+        self.seqname_to_residues = seqname_to_residues
+        self.sequences = sequences
+
+
+class BuildGenomeIndex(ExtractLoci):
+
+    def main(
+            self,
+            gbk_dir: str,
+            blast_db_cache: Optional[str],
+            parallel_extraction: bool) -> GenomeIndex:
+
+        self.gbk_dir = gbk_dir
+        self.blast_db_cache = blast_db_cache
+        self.parallel_extraction = parallel_extraction
+
+        self.processes = self.threads if self.parallel_extraction else 1
+        self.gbks = self.get_gbks()
+
+        return self.get_genome_index()
+
+
+class ExtractLociFromIndex(ExtractLoci):
+    """
+    ExtractLoci with the search against a prebuilt GenomeIndex, i.e. the same as the pooled or cached search
+    """
+
+    index: GenomeIndex
+
+    def main(
+            self,
+            query_faa: str,
+            index: GenomeIndex,
+            evalue: float,
+            extension: int,
+            min_hits_per_locus: int,
+            parallel_extraction: bool) -> List[Chromosome]:
+
+        self.query_faa = query_faa
+        self.index = index
+        self.evalue = evalue
+        self.extension = extension
+        self.min_hits_per_locus = min_hits_per_locus
+        self.parallel_extraction = parallel_extraction
+
+        self.processes = self.threads if self.parallel_extraction else 1
+        self.gbks = self.index.gbks
+
+        if self.index.db is None:
+            gbk_to_seqname_to_hits = {}
+        else:
+            gbk_to_seqname_to_hits = self.search_pooled_db(index=self.index)
+
+        self.loci = list(self.extract_loci_from(gbk_to_seqname_to_hits=gbk_to_seqname_to_hits))
+
+        return self.loci
+
+
+class ExtractBatchLoci(ExtractLoci):
+    """
+    Loci of many jobs, each a query faa with its own evalue, extension and min_hits_per_locus,
+        from one scan of the genbank files and one blastp search
+
+    Queries of all jobs are combined into one faa, each header prefixed by its job (query provenance),
+        and searched at once against the pooled (or cached) database.
+    Hits of each job are selected with its own evalue, the same as if it were searched alone,
+        and each genbank file with any hit is parsed once for the loci of all jobs
+    """
+
+    query_faas: List[str]
+    evalues: List[float]
+    extensions: List[int]
+    min_hits_per_locus: List[int]
+
+    job_loci: List[List[Chromosome]]
+
+    def main(
+            self,
+            query_faas: List[str],
+            gbk_dir: str,
+            evalues: List[float],
+            extensions: List[int],
+            min_hits_per_locus: List[int],
+            blast_db_cache: Optional[str],
+            parallel_extraction: bool) -> List[List[Chromosome]]:
+        """
+        Returns loci of each job, in the same order as query_faas
+        """
+
+        self.query_faas = query_faas
+        self.gbk_dir = gbk_dir
+        self.evalues = evalues
+        self.extensions = extensions
+        self.min_hits_per_locus = min_hits_per_locus
+        self.blast_db_cache = blast_db_cache
+        self.parallel_extraction = parallel_extraction
+
+        self.processes = self.threads if self.parallel_extraction else 1
+        self.gbks = self.get_gbks()
+        self.set_query_faa()
+
+        index = self.get_genome_index()
+        if index.db is None:
+            gbk_to_seqname_to_job_hits = {}
+        else:
+            seqname_to_job_hits = PooledBatchSearch(self.settings).main(
+                query_faa=self.query_faa,
+                db=index.db,
+                seqname_to_residues=index.seqname_to_residues,
+                sequences=index.sequences,
+                evalues=self.evalues)
+            gbk_to_seqname_to_job_hits = {
+                gbk: {s: seqname_to_job_hits[s] for s in seqnames if s in seqname_to_job_hits}
+                for gbk, seqnames in index.gbk_to_seqnames.items()
+            }
+
+        self.set_job_loci(gbk_to_seqname_to_job_hits=gbk_to_seqname_to_job_hits)
+
+        return self.job_loci
+
+    def set_query_faa(self):
+        data = []
+        for job, query_faa in enumerate(self.query_faas):
+            data += [(f'{job}{JOINER}{header}', sequence) for header, sequence in read_fasta(query_faa)]
+        self.query_faa = get_temp_path(prefix=f'{self.workdir}/batch_query', suffix='.faa')
+        write_fasta(data=data, file=self.query_faa)
+
+    def set_job_loci(self, gbk_to_seqname_to_job_hits: Dict[str, Dict[str, Dict[int, Dict[str, str]]]]):
+        gbk_to_seqname_to_job_hits = self.skip_gbks_without_hits(gbk_to_seqname_to_hits=gbk_to_seqname_to_job_hits)
+
+        kwargs_list = [{
+            'gbk': gbk,
+            'query_faas': self.query_faas,
+            'evalues': self.evalues,
+            'extensions': self.extensions,
+            'min_hits_per_locus': self.min_hits_per_locus,
+            'seqname_to_job_hits': seqname_to_job_hits,
+        } for gbk, seqname_to_job_hits in gbk_to_seqname_to_job_hits.items()]
+
+        results = self.imap_processor(
+            processor_class=GetBatchLociFromGenbank,
+            kwargs_list=kwargs_list,
+            processes=self.processes)
+
+        self.job_loci = [[] for _ in self.query_faas]
+        for job_seqname_loci in results:
+            for job, seqname, loci in job_seqname_loci:
+                self.logger.info(f'{self.query_faas[job]}: {seqname} -> {len(loci)} loci')
+                self.job_loci[job] += loci
+
+
+class PooledBatchSearch(PooledSearch):
+
+    evalues: List[float]
+
+    seqname_to_job_hits: Dict[str, Dict[int, Dict[str, str]]]
+
+    def main(
+            self,
+            query_faa: str,
+            db: str,
+            seqname_to_residues: Dict[str, int],
+            sequences: int,
+            evalues: List[float]) -> Dict[str, Dict[int, Dict[str, str]]]:
+        """
+        query_faa: headers prefixed by f'{job}{JOINER}', job being the index of evalues
+
+        Returns {seqname: {job: {cds_id: query}}}, query without the job prefix
+        """
+
+        self.query_faa = query_faa
+        self.db = db
+        self.seqname_to_residues = seqname_to_residues
+        self.sequences = sequences
+        self.evalues = evalues
+
+        df = self.blastp_rescaled(evalue=max(self.evalues))
+        jobs = df['query'].str.split(JOINER, n=1).str[0].astype(int)
+        df['query'] = df['query'].str.split(JOINER, n=1).str[1]
+
+        self.seqname_to_job_hits = {}
+        for job, evalue in enumerate(self.evalues):
+            job_df = cap_target_seqs(
+                df=df[(jobs == job) & (df['evalue'] <= evalue)], max_target_seqs=Blastp.DEFAULT_MAX_TARGET_SEQS)
+            hits = get_best_query_hits(df=job_df)
+            for seqname, seqname_hits in group_by_seqname(hits=hits).items():
+                self.seqname_to_job_hits.setdefault(seqname, {})[job] = seqname_hits
+
+        return self.seqname_to_job_hits
+
+
+class GetBatchLociFromGenbank(Processor):
+
+    gbk: str
+    query_faas: List[str]
+    evalues: List[float]
+    extensions: List[int]
+    min_hits_per_locus: List[int]
+    seqname_to_job_hits: Dict[str, Dict[int, Dict[str, str]]]
+
+    def main(
+            self,
+            gbk: str,
+            query_faas: List[str],
+            evalues: List[float],
+            extensions: List[int],
+            min_hits_per_locus: List[int],
+            seqname_to_job_hits: Dict[str, Dict[int, Dict[str, str]]]) -> List[Tuple[int, str, List[Chromosome]]]:
+        """
+        Returns (job, seqname, loci) of each job of each chromosome with any hit,
+            each chromosome being parsed once for all jobs
+        """
+
+        self.gbk = gbk
+        self.query_faas = query_faas
+        self.evalues = evalues
+        self.extensions = extensions
+        self.min_hits_per_locus = min_hits_per_locus
+        self.seqname_to_job_hits = seqname_to_job_hits
+
+        chromosomes = ReadGenbank(self.settings).iterate(
+            gbk=self.gbk,
+            seqnames=set(self.seqname_to_job_hits.keys()))
+
+        ret = []
+        for chromosome in chromosomes:
+            for job, hits in sorted(self.seqname_to_job_hits[chromosome.seqname].items()):
+                loci = GetLociFromChromosome(self.settings).main(
+                    query_faa=self.query_faas[job],
+                    chromosome=chromosome,
+                    evalue=self.evalues[job],
+                    extension=self.extensions[job],
+                    min_hits_per_locus=self.min_hits_per_locus[job],
+                    hits=hits)
+                ret.append((job, chromosome.seqname, loci))
+        return ret
+
+
+def get_best_query_hits(df: pd.DataFrame) -> Dict[str, str]:
+    """
+    {subject: query} of the best hit of each subject by bitscore, the first query in the blastp output among ties
+    """
+    df = df.sort_values(by='bitscore', ascending=False, kind='stable')
+    df = df.drop_duplicates(subset='subject', keep='first')
+    return dict(sorted(zip(df['subject'], df['query'])))
+
+
+def cap_target_seqs(df: pd.DataFrame, max_target_seqs: int) -> pd.DataFrame:
+    """
+    Keep the best max_target_seqs subjects (by e-value) of each query on each chromosome,
+        the same as blastp searched on each chromosome one by one
+    """
+    seqnames = df['subject'].str.rsplit(JOINER, n=1).str[0]
+    best = df.assign(seqname=seqnames) \
+        .sort_values(by=['evalue', 'bitscore'], ascending=[True, False], kind='stable') \
+        .drop_duplicates(subset=['query', 'subject'], keep='first')
+    rank = best.groupby(['query', 'seqname'], sort=False).cumcount()
+    kept = set(zip(best['query'][rank < max_target_seqs], best['subject'][rank < max_target_seqs]))
+    mask = pd.Series([pair in kept for pair in zip(df['query'], df['subject'])], index=df.index, dtype=bool)
+    return df[mask]  # a mask rather than a list, which would select columns if empty
+
+
+def group_by_seqname(hits: Dict[str, str]) -> Dict[str, Dict[str, str]]:
+    """
+    {cds_id: query} -> {seqname: {cds_id: query}}
+    """
+    ret = {}
+    for cds_id, query in hits.items():
+        seqname = cds_id.rsplit(JOINER, 1)[0]
+        ret.setdefault(seqname, {})[cds_id] = query
+    return ret
+
+
+def count_lines(file: str) -> int:
+    with open(file) as fh:
+        return sum(1 for _ in fh)
+
+
+def copy_feature(feature: GenericFeature) -> GenericFeature:
+    """
+    Copy the mutable parts of a feature, attribute values are immutable str or int
+    """
+    ret = copy(feature)
+    ret.attributes = list(feature.attributes)
+    ret.tags = list(feature.tags)
+    ret.regions = list(feature.regions)
+    return ret
 
-def overlap(a: Interval, b: Interval) -> bool:
-    return (a.end >= b.start) and (b.end >= a.start)
@@ -0,0 +1,137 @@
+import numpy as np
+from copy import copy
+from typing import List, Dict, Any, Set, Iterable
+from ngslite import Chromosome, GenericFeature
+from .constant import CDS_ID_KEY, ORTHOLOG_ID_KEY, QUERY_HIT_KEY, COLOR_KEY
+
+
+class FeatureTable:
+    """
+    Columnar table of the CDS of loci, one row per CDS, rows grouped by locus in the order of loci
+
+    Stages read and write columns in bulk instead of scanning the attributes of each feature.
+    Intermediate values (cds_id, query_hit, ortholog_id) are read from the feature attributes into the table
+        without changing the input loci. materialize() strips them from the features and writes colors back.
+    """
+
+    NO_ORTHOLOG_ID = 0  # ortholog ids are 1-based
+    INTERMEDIATE_KEYS = [CDS_ID_KEY, ORTHOLOG_ID_KEY, QUERY_HIT_KEY]
+    STRAND_DICT = {
+        '+': 1,
+        '-': -1
+    }
+    COLUMNS = [
+        'feature', 'start', 'end', 'strand', 'cds_id', 'query_hit', 'translation',
+        'ortholog_id', 'input_color', 'color', 'label'
+    ]
+
+    loci: List[Chromosome]
+    offsets: np.ndarray  # rows of the i-th locus are offsets[i]:offsets[i + 1]
+
+    feature: np.ndarray  # GenericFeature of each row, to write back colors
+    start: np.ndarray
+    end: np.ndarray
+    strand: np.ndarray  # 1, -1 or 0
+    cds_id: np.ndarray
+    query_hit: np.ndarray  # best query of CDS hit by blastp, otherwise None
+    translation: np.ndarray
+    ortholog_id: np.ndarray  # NO_ORTHOLOG_ID if not assigned
+    input_color: np.ndarray  # color(s) already in the input genbank, as given by GenericFeature.get_attribute()
+    color: np.ndarray  # color assigned by AddColor
+    label: np.ndarray  # value of the first label attribute found
+
+    def __init__(self, loci: List[Chromosome], label_attributes: List[str]):
+        self.loci = loci
+
+        keys = set(self.INTERMEDIATE_KEYS + ['translation', COLOR_KEY] + label_attributes)
+
+        rows = {c: [] for c in self.COLUMNS}
+        lengths = []
+        for locus in self.loci:
+            n = 0
+            for feature in locus.features:
+                if feature.type != 'CDS':
+                    continue
+                attributes = get_attribute_table(feature=feature, keys=keys)
+                rows['feature'].append(feature)
+                rows['start'].append(feature.start)
+                rows['end'].append(feature.end)
+                rows['strand'].append(self.STRAND_DICT.get(feature.strand, 0))
+                rows['cds_id'].append(attributes.get(CDS_ID_KEY))
+                rows['query_hit'].append(attributes.get(QUERY_HIT_KEY))
+                rows['translation'].append(attributes.get('translation'))
+                ortholog_id = attributes.get(ORTHOLOG_ID_KEY)
+                rows['ortholog_id'].append(self.NO_ORTHOLOG_ID if ortholog_id is None else ortholog_id)
+                rows['input_color'].append(attributes.get(COLOR_KEY))
+                rows['color'].append(None)
+                rows['label'].append(next(
+                    (attributes[a] for a in label_attributes if a in attributes), None))
+                n += 1
+            lengths.append(n)
+
+        self.offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64)
+        for c in ['start', 'end', 'ortholog_id']:
+            setattr(self, c, np.array(rows[c], dtype=np.int64))
+        self.strand = np.array(rows['strand'], dtype=np.int8)
+        for c in ['feature', 'cds_id', 'query_hit', 'translation', 'input_color', 'color', 'label']:
+            setattr(self, c, to_object_array(rows[c]))
+
+    def __len__(self) -> int:
+        return len(self.loci)
+
+    def rows(self, i: int) -> slice:
+        return slice(int(self.offsets[i]), int(self.offsets[i + 1]))
+
+    def get_ortholog_ids(self, i: int) -> np.ndarray:
+        """
+        Assigned ortholog ids of the i-th locus, in the order of CDS
+        """
+        ortholog_ids = self.ortholog_id[self.rows(i)]
+        return ortholog_ids[ortholog_ids != self.NO_ORTHOLOG_ID]
+
+    def take_loci(self, idx: Iterable[int]) -> 'FeatureTable':
+        """
+        New table of the given loci in the given order, sharing the Chromosome objects
+        """
+        idx = np.fromiter(idx, dtype=np.int64)
+        lengths = np.diff(self.offsets)[idx]
+        offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+        # row r in the k-th new locus is row r - offsets[k] + self.offsets[idx[k]]
+        rows = np.arange(offsets[-1], dtype=np.int64) - np.repeat(offsets[:-1] - self.offsets[idx], lengths)
+
+        ret = copy(self)
+        ret.loci = [self.loci[i] for i in idx.tolist()]
+        ret.offsets = offsets
+        for c in self.COLUMNS:
+            setattr(ret, c, getattr(self, c)[rows])
+        return ret
+
+    def materialize(self) -> List[Chromosome]:
+        """
+        Strip intermediate attributes from the features, write assigned colors, and return the loci
+        """
+        intermediate_keys = set(self.INTERMEDIATE_KEYS)
+        for feature, color in zip(self.feature.tolist(), self.color.tolist()):
+            feature.attributes = [(k, v) for k, v in feature.attributes if k not in intermediate_keys]
+            if color is not None:
+                feature.add_attribute(key=COLOR_KEY, val=color)
+        return self.loci
+
+
+def get_attribute_table(feature: GenericFeature, keys: Set[str]) -> Dict[str, Any]:
+    """
+    The same values as GenericFeature.get_attribute() for the given keys, in one pass over the attributes
+    """
+    key_to_values = {}
+    for key, value in feature.attributes:
+        if key in keys:
+            key_to_values.setdefault(key, []).append(value)
+    return {k: v[0] if len(v) == 1 else v for k, v in key_to_values.items()}
+
+
+def to_object_array(values: List[Any]) -> np.ndarray:
+    # element-wise, as values can be lists which np.array() would take as another dimension
+    ret = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        ret[i] = v
+    return ret
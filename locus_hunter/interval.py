@@ -0,0 +1,66 @@
+from typing import List
+
+
+class Interval:
+
+    def __init__(self, start: int, end: int, names: List[str]):
+        assert start <= end
+        self.start = start
+        self.end = end
+        self.names = names
+
+    def __str__(self) -> str:
+        return f'{self.start}-{self.end} names={self.names}'
+
+    def __repr__(self) -> str:
+        return f'Interval(start={self.start}, end={self.end}, names={self.names})'
+
+    def __eq__(self, other) -> bool:
+        return (self.start, self.end, self.names) == (other.start, other.end, other.names)
+
+
+def overlap(a: Interval, b: Interval) -> bool:
+    return (a.end >= b.start) and (b.end >= a.start)
+
+
+def merge_intervals(intervals: List[Interval]) -> List[Interval]:
+    """
+    Sort by start and sweep once, O(n log n)
+    Input intervals can be out of order or nested, and are not modified
+    """
+    ret = []
+    for this in sorted(intervals, key=lambda i: (i.start, i.end)):
+        if len(ret) > 0 and overlap(this, ret[-1]):
+            last = ret[-1]
+            last.end = max(last.end, this.end)
+            last.names.extend(this.names)  # in place, to stay linear for long runs of overlaps
+        else:
+            ret.append(Interval(start=this.start, end=this.end, names=list(this.names)))
+    return ret
+
+
+def merge_circular_intervals(intervals: List[Interval], size: int) -> List[Interval]:
+    """
+    Merge intervals on a circular molecule of <size> bp
+
+    Every returned interval starts within 1..size, and an interval crossing
+        the origin ends beyond size, i.e. end - size is the position after the origin
+    An interval covering the whole molecule is returned as 1..size
+    """
+    shifted = []
+    for i in intervals:
+        offset = ((i.start - 1) // size) * size  # bring start into 1..size
+        shifted.append(Interval(start=i.start - offset, end=i.end - offset, names=i.names))
+
+    ret = merge_intervals(shifted)
+
+    # join the last interval, which may cross the origin, with the first ones
+    while len(ret) > 1 and ret[-1].end - size >= ret[0].start:
+        last, first = ret[-1], ret.pop(0)
+        ret[-1] = Interval(
+            start=last.start,
+            end=max(last.end, first.end + size),
+            names=last.names + first.names)
+
+    return [Interval(start=1, end=size, names=i.names) if i.end - i.start + 1 >= size else i
+            for i in ret]
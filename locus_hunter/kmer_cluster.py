@@ -0,0 +1,217 @@
+import numpy as np
+from itertools import chain
+from typing import List, Dict, Tuple, Optional
+from ngslite import FastaParser
+from .template import Processor
+
+
+class KmerCluster(Processor):
+    """
+    In-process greedy clustering following the cd-hit algorithm, as a drop-in for CdHit
+
+    Sequences are processed from the longest to the shortest.
+    Each sequence joins the first representative, in the order of creation,
+        passing the short word (k-mer) filter and the identity verified by alignment,
+        otherwise becomes a new representative.
+    Identity is the number of identical residues in the alignment divided by the length of the shorter sequence,
+        same as cd-hit -G 1
+    """
+
+    faa: str
+    sequence_identity: float
+
+    ids: List[str]
+    seqs: List[np.ndarray]
+    protein_to_cluster: Dict[str, int]
+
+    def main(
+            self,
+            faa: str,
+            sequence_identity: float) -> Dict[str, int]:
+
+        self.faa = faa
+        self.sequence_identity = sequence_identity
+
+        self.ids, self.seqs = read_encoded_faa(faa=self.faa)
+        self.cluster()
+
+        return self.protein_to_cluster
+
+    def cluster(self):
+        order = sorted(range(len(self.seqs)), key=lambda i: -len(self.seqs[i]))  # stable for equal lengths
+
+        index = RepresentativeIndex(sequence_identity=self.sequence_identity)
+        self.protein_to_cluster = {}
+
+        for i in order:
+            cluster = index.find(seq=self.seqs[i])
+            if cluster is None:
+                cluster = index.add(seq=self.seqs[i])
+            self.protein_to_cluster[self.ids[i]] = cluster + 1  # 1-based as read from .clstr
+
+
+class KmerCluster2D(Processor):
+    """
+    In-process counterpart of CdHit2D: proteins of faa2 similar to the representatives in faa1
+
+    Same as cd-hit-2d by default, a representative is not shorter than the protein joining it
+    """
+
+    faa1: str
+    faa2: str
+    sequence_identity: float
+
+    def main(
+            self,
+            faa1: str,
+            faa2: str,
+            sequence_identity: float) -> Dict[str, str]:
+
+        self.faa1 = faa1
+        self.faa2 = faa2
+        self.sequence_identity = sequence_identity
+
+        index = RepresentativeIndex(sequence_identity=self.sequence_identity)
+        rep_ids, rep_seqs = read_encoded_faa(faa=self.faa1)
+        for seq in rep_seqs:
+            index.add(seq=seq)
+
+        ret = {}
+        ids, seqs = read_encoded_faa(faa=self.faa2)
+        for protein_id, seq in zip(ids, seqs):
+            rep = index.find(seq=seq)
+            if rep is not None:
+                ret[protein_id] = rep_ids[rep]
+
+        return ret
+
+
+class RepresentativeIndex:
+    """
+    Representative sequences indexed by short words (k-mers),
+        to find the first representative similar to a query sequence
+    """
+
+    sequence_identity: float
+    word_length: int
+    seqs: List[np.ndarray]
+    word_to_reps: Dict[int, List[int]]  # word -> representative indices, in ascending order
+
+    def __init__(self, sequence_identity: float):
+        self.sequence_identity = sequence_identity
+        # the same as cd-hit recommends for each identity range
+        c = sequence_identity
+        self.word_length = 5 if c >= 0.7 else 4 if c >= 0.6 else 3 if c >= 0.5 else 2
+        self.seqs = []
+        self.word_to_reps = {}
+
+    def add(self, seq: np.ndarray) -> int:
+        rep = len(self.seqs)
+        self.seqs.append(seq)
+        for word in np.unique(get_words(seq=seq, k=self.word_length)).tolist():
+            self.word_to_reps.setdefault(word, []).append(rep)
+        return rep
+
+    def find(self, seq: np.ndarray) -> Optional[int]:
+        if len(self.seqs) == 0:
+            return None
+
+        k = self.word_length
+        words = get_words(seq=seq, k=k)
+        max_mismatches = int(np.ceil((1 - self.sequence_identity) * len(seq)))
+        # each mismatch breaks at most k words
+        min_shared_words = len(words) - k * max_mismatches
+
+        if min_shared_words > 0:
+            hit_reps = np.fromiter(
+                chain.from_iterable(self.word_to_reps.get(w, ()) for w in words.tolist()),  # words with multiplicity
+                dtype=np.int64)
+            shared = np.bincount(hit_reps, minlength=len(self.seqs))
+            candidates = np.flatnonzero(shared >= min_shared_words)
+        else:
+            candidates = np.arange(len(self.seqs))
+
+        min_identical = self.sequence_identity * len(seq)
+        for rep in candidates.tolist():
+            rep_seq = self.seqs[rep]
+            if len(rep_seq) < len(seq):
+                continue
+            # without gaps is a lower bound of the alignment, which is needed only if the bound fails
+            if count_identical_without_gap(short=seq, long=rep_seq, k=k) >= min_identical:
+                return rep
+            if count_identical(short=seq, long=rep_seq) >= min_identical:
+                return rep
+
+        return None
+
+
+MIN_LENGTH = 11  # cd-hit throws away sequences of length <= 10 by default
+
+
+def read_encoded_faa(faa: str) -> Tuple[List[str], List[np.ndarray]]:
+    ids, seqs = [], []
+    with FastaParser(faa) as parser:
+        for head, seq in parser:
+            if len(seq) < MIN_LENGTH:
+                continue
+            ids.append(head.split()[0])
+            seqs.append(encode_sequence(seq))
+    return ids, seqs
+
+
+def encode_sequence(seq: str) -> np.ndarray:
+    return np.frombuffer(seq.upper().encode(), dtype=np.uint8).astype(np.int64)
+
+
+def get_words(seq: np.ndarray, k: int) -> np.ndarray:
+    """
+    Integer code of each k-mer, with multiplicity
+    """
+    if len(seq) < k:
+        return np.empty(0, dtype=np.int64)
+    ret = np.zeros(len(seq) - k + 1, dtype=np.int64)
+    for i in range(k):
+        ret = ret * 256 + seq[i:len(seq) - k + 1 + i]
+    return ret
+
+
+def count_identical_without_gap(short: np.ndarray, long: np.ndarray, k: int) -> int:
+    """
+    Number of identical residues along the diagonal shared by most words
+    """
+    short_words, long_words = get_words(seq=short, k=k), get_words(seq=long, k=k)
+    _, short_idx, long_idx = np.intersect1d(short_words, long_words, return_indices=True)
+    if len(short_idx) == 0:
+        return 0
+
+    offsets, counts = np.unique(long_idx - short_idx, return_counts=True)
+    offset = offsets[np.argmax(counts)]  # position in the long sequence minus that in the short one
+
+    start, end = max(0, -offset), min(len(short), len(long) - offset)
+    return int(np.count_nonzero(short[start:end] == long[start + offset:end + offset]))
+
+
+def count_identical(short: np.ndarray, long: np.ndarray) -> int:
+    """
+    Number of identical residues in the best alignment of the whole short sequence within the long one
+
+    Match 1, mismatch 0, gap -1, free end gaps on the long sequence.
+    The score and the number of identical residues are packed in one integer,
+        such that ties of the score are broken by more identical residues.
+    """
+    big = 1 << 20  # more than any number of identical residues
+    gap = -big
+
+    gap_ramp = gap * np.arange(len(long) + 1, dtype=np.int64)
+    row = np.zeros(len(long) + 1, dtype=np.int64)  # free leading end gap on the long sequence
+    x = np.empty(len(long) + 1, dtype=np.int64)
+    for residue in short:
+        x[0] = row[0] + gap
+        x[1:] = np.maximum(
+            row[:-1] + np.where(long == residue, big + 1, 0),
+            row[1:] + gap)
+        # gaps along the row: running maximum, the same as SmithWatermanAligner.run_numpy
+        row = np.maximum.accumulate(x - gap_ramp) + gap_ramp
+
+    best = int(row.max())  # free trailing end gap on the long sequence
+    return best % big
@@ -1,14 +1,31 @@
-from typing import List
+from typing import List, Dict, Any, Optional, Callable, TYPE_CHECKING
 from ngslite import write_genbank, Chromosome
-from .sort_loci import SortLoci
-from .add_color import AddColor
-from .view_loci import ViewLoci
-from .extract_loci import ExtractLoci
 from .template import Processor
-from .constant import CDS_ID_KEY, ORTHOLOG_ID_KEY
+from .profiler import PROFILER, Profiler
+from .tools import list_gbks, get_fingerprint
+if TYPE_CHECKING:
+    from .feature_table import FeatureTable
+    from .checkpoint import Checkpoint
 
 
 class LocusHunter(Processor):
+    """
+    Each stage imports its module, and therefore its heavy dependencies (pandas, scipy, matplotlib...), only when it runs,
+        such that the CLI starts fast, e.g. for --help or a failed validation
+
+    With resume (or debug), outputs of stages are checkpointed in f'{output}.checkpoint',
+        which is removed when the run finishes (unless debug),
+        and stages finished by a previous run with the same parameters are skipped
+    """
+
+    CHECKPOINT_PARAMETERS = {  # parameters that change the output of each checkpointed stage
+        'extract_loci': [
+            'query_faa', 'gbk_dir', 'evalue', 'extension', 'min_hits_per_locus', 'pooled_search', 'blast_db_cache'],
+        'sort_loci': [
+            'ortholog_identity', 'clustering_engine', 'ortholog_catalogue', 'seed_orthologs_from_hits',
+            'dereplicate_loci', 'include_locus_names', 'alignment_engine', 'sort_method', 'optimal_leaf_ordering'],
+        'add_color': [],
+    }
 
     query_faa: str
     gbk_dir: str
@@ -22,8 +39,24 @@ class LocusHunter(Processor):
     loci_per_plot: int
     dpi: int
     output: str
+    pooled_search: bool
+    blast_db_cache: Optional[str]
+    parallel_extraction: bool
+    alignment_engine: str
+    sort_method: str
+    optimal_leaf_ordering: bool
+    newick: bool
+    clustering_engine: str
+    ortholog_catalogue: Optional[str]
+    seed_orthologs_from_hits: bool
+    formats: List[str]
+    no_plot: bool
+    profile: bool
+    resume: bool
 
+    checkpoint: 'Checkpoint'
     loci: List[Chromosome]
+    feature_table: 'FeatureTable'
 
     def main(
             self,
@@ -38,7 +71,21 @@ class LocusHunter(Processor):
             label_attributes: List[str],
             loci_per_plot: int,
             dpi: int,
-            output: str):
+            output: str,
+            pooled_search: bool,
+            blast_db_cache: Optional[str],
+            parallel_extraction: bool,
+            alignment_engine: str,
+            sort_method: str,
+            optimal_leaf_ordering: bool,
+            newick: bool,
+            clustering_engine: str,
+            ortholog_catalogue: Optional[str],
+            seed_orthologs_from_hits: bool,
+            formats: List[str],
+            no_plot: bool,
+            profile: bool,
+            resume: bool):
 
         self.query_faa = query_faa
         self.gbk_dir = gbk_dir
@@ -52,55 +99,143 @@ class LocusHunter(Processor):
         self.loci_per_plot = loci_per_plot
         self.dpi = dpi
         self.output = output
+        self.pooled_search = pooled_search
+        self.blast_db_cache = blast_db_cache
+        self.parallel_extraction = parallel_extraction
+        self.alignment_engine = alignment_engine
+        self.sort_method = sort_method
+        self.optimal_leaf_ordering = optimal_leaf_ordering
+        self.newick = newick
+        self.clustering_engine = clustering_engine
+        self.ortholog_catalogue = ortholog_catalogue
+        self.seed_orthologs_from_hits = seed_orthologs_from_hits
+        self.formats = formats
+        self.no_plot = no_plot
+        self.profile = profile
+        self.resume = resume
+
+        PROFILER.reset(enabled=self.profile)
+        try:
+            self.set_checkpoint()
+            self.run_stages()
+            if not self.debug:
+                self.checkpoint.remove()
+        finally:
+            if self.profile:
+                self.save_profile()
+
+    def set_checkpoint(self):
+        from .checkpoint import Checkpoint
+        enabled = self.is_checkpointed()
+        stage_to_parameters: Dict[str, Dict[str, Any]] = {
+            stage: {key: getattr(self, key) for key in keys}
+            for stage, keys in self.CHECKPOINT_PARAMETERS.items()
+        }
+        if enabled:
+            # input files modified in place, i.e. with the same paths, also change the output of extract_loci
+            stage_to_parameters[Checkpoint.EXTRACT_LOCI]['fingerprint'] = self.get_input_fingerprint()
+        self.checkpoint = Checkpoint(
+            directory=f'{self.output}.checkpoint',
+            stage_to_parameters=stage_to_parameters,
+            resume=self.resume,
+            enabled=enabled)
+
+    def is_checkpointed(self) -> bool:
+        return self.resume or self.debug
 
-        self.extract_loci()
+    def get_input_fingerprint(self) -> Dict[str, Any]:
+        return get_fingerprint(files=[self.query_faa] + list_gbks(gbk_dir=self.gbk_dir))
+
+    def run_stages(self):
+        self.run_stage(self.extract_loci)
 
         if len(self.loci) == 0:
             self.logger.info('No locus found. Abort')
             return
 
-        self.sort_loci()
-        self.add_color()
-        self.view_loci()
-        self.save_genbank()
+        self.run_stage(self.set_feature_table)
+        self.run_stage(self.sort_loci)
+        self.run_stage(self.add_color)
+        if not self.no_plot and len(self.formats) > 0:
+            self.run_stage(self.view_loci)
+        self.run_stage(self.save_genbank)
+
+    def run_stage(self, stage: Callable):
+        with PROFILER.measure(kind=Profiler.STAGE, name=stage.__name__):
+            stage()
 
     def extract_loci(self):
+        if self.checkpoint.is_finished(self.checkpoint.EXTRACT_LOCI):
+            self.logger.info('Resume extracted loci from the checkpoint')
+            self.loci = self.checkpoint.load_loci()
+            return
+
+        from .extract_loci import ExtractLoci
         self.loci = ExtractLoci(self.settings).main(
             query_faa=self.query_faa,
             gbk_dir=self.gbk_dir,
             evalue=self.evalue,
             extension=self.extension,
-            min_hits_per_locus=self.min_hits_per_locus)
+            min_hits_per_locus=self.min_hits_per_locus,
+            pooled_search=self.pooled_search,
+            blast_db_cache=self.blast_db_cache,
+            parallel_extraction=self.parallel_extraction)
+        self.checkpoint.save_loci(loci=self.loci)
 
-    def sort_loci(self):
-        self.loci = SortLoci(self.settings).main(
+    def set_feature_table(self):
+        from .feature_table import FeatureTable
+        self.feature_table = FeatureTable(
             loci=self.loci,
+            label_attributes=self.label_attributes)
+
+    def sort_loci(self):
+        if self.checkpoint.is_finished(self.checkpoint.SORT_LOCI):
+            self.logger.info('Resume ortholog ids and the order of loci from the checkpoint')
+            self.feature_table = self.checkpoint.load_sort_loci(feature_table=self.feature_table)
+            return
+
+        from .sort_loci import SortLoci
+        self.feature_table = SortLoci(self.settings).main(
+            feature_table=self.feature_table,
             ortholog_identity=self.ortholog_identity,
+            clustering_engine=self.clustering_engine,
+            ortholog_catalogue=self.ortholog_catalogue,
+            seed_orthologs_from_hits=self.seed_orthologs_from_hits,
             dereplicate_loci=self.dereplicate_loci,
-            include_locus_names=self.include_locus_names)
+            include_locus_names=self.include_locus_names,
+            alignment_engine=self.alignment_engine,
+            sort_method=self.sort_method,
+            optimal_leaf_ordering=self.optimal_leaf_ordering,
+            newick=f'{self.output}.nwk' if self.newick else None)
+        self.checkpoint.save_sort_loci(extracted_loci=self.loci, feature_table=self.feature_table)
 
     def add_color(self):
-        self.loci = AddColor(self.settings).main(
-            loci=self.loci)
+        if self.checkpoint.is_finished(self.checkpoint.ADD_COLOR):
+            self.logger.info('Resume colors from the checkpoint')
+            self.feature_table = self.checkpoint.load_add_color(feature_table=self.feature_table)
+            return
+
+        from .add_color import AddColor
+        self.feature_table = AddColor(self.settings).main(
+            feature_table=self.feature_table)
+        self.checkpoint.save_add_color(feature_table=self.feature_table)
 
     def view_loci(self):
+        from .view_loci import ViewLoci
         ViewLoci(self.settings).main(
-            loci=self.loci,
+            feature_table=self.feature_table,
             output=self.output,
-            label_attributes=self.label_attributes,
             loci_per_plot=self.loci_per_plot,
-            dpi=self.dpi)
+            dpi=self.dpi,
+            formats=self.formats)
 
     def save_genbank(self):
-        self.remove_intermediate_labels()
+        # intermediate labels (cds_id, ortholog_id...) have been moved into the feature table
         write_genbank(
-            data=self.loci,
+            data=self.feature_table.materialize(),
             file=f'{self.output}.gbk',
             use_locus_text=False)
 
-    def remove_intermediate_labels(self):
-        intermediate_keys = [CDS_ID_KEY, ORTHOLOG_ID_KEY]
-        for locus in self.loci:
-            for feature in locus.features:
-                for key in intermediate_keys:
-                    feature.remove_attribute(key)
+    def save_profile(self):
+        PROFILER.write_report(prefix=self.output)
+        PROFILER.reset(enabled=False)
@@ -0,0 +1,151 @@
+import os
+import json
+import shutil
+from typing import List, Dict, Tuple
+from ngslite import FastaParser, FastaWriter
+from .cd_hit import CdHit, CdHit2D
+from .kmer_cluster import KmerCluster, KmerCluster2D
+from .template import Processor
+
+
+class OrthologCatalogue(Processor):
+    """
+    Ortholog ids persisted across runs, as a folder of representative proteins
+
+    catalogue_dir/
+        representatives.faa: one representative protein per ortholog id, the header being the id
+        catalogue.json: sequence identity of the catalogue
+
+    Proteins similar to existing representatives get their ortholog ids.
+    The rest are clustered among themselves into new ortholog ids,
+        and the longest protein of each new ortholog is added as a representative.
+    """
+
+    REPRESENTATIVES_FAA = 'representatives.faa'
+    CATALOGUE_JSON = 'catalogue.json'
+
+    CLUSTERING_ENGINES = {
+        'cd-hit': CdHit,
+        'native': KmerCluster,
+    }
+    CLUSTERING_2D_ENGINES = {
+        'cd-hit': CdHit2D,
+        'native': KmerCluster2D,
+    }
+
+    faa: str
+    sequence_identity: float
+    catalogue_dir: str
+    clustering_engine: str
+
+    representatives_faa: str
+    next_ortholog_id: int
+    protein_to_ortholog_id: Dict[str, int]
+    new_representatives: List[Tuple[int, str]]
+
+    def main(
+            self,
+            faa: str,
+            sequence_identity: float,
+            catalogue_dir: str,
+            clustering_engine: str) -> Dict[str, int]:
+
+        self.faa = faa
+        self.sequence_identity = sequence_identity
+        self.catalogue_dir = catalogue_dir
+        self.clustering_engine = clustering_engine
+
+        self.load_catalogue()
+        self.assign_to_representatives()
+        self.cluster_unassigned()
+        self.save_catalogue()
+
+        return self.protein_to_ortholog_id
+
+    def load_catalogue(self):
+        os.makedirs(self.catalogue_dir, exist_ok=True)
+        self.representatives_faa = f'{self.catalogue_dir}/{self.REPRESENTATIVES_FAA}'
+
+        json_path = f'{self.catalogue_dir}/{self.CATALOGUE_JSON}'
+        if os.path.exists(json_path):
+            with open(json_path) as fh:
+                identity = json.load(fh)['sequence_identity']
+            assert identity == self.sequence_identity, \
+                f'Ortholog catalogue "{self.catalogue_dir}" was built with sequence identity {identity}, not {self.sequence_identity}'
+
+        ortholog_ids = []
+        if os.path.exists(self.representatives_faa):
+            with FastaParser(self.representatives_faa) as parser:
+                ortholog_ids = [int(head) for head, _ in parser]
+
+        self.next_ortholog_id = max(ortholog_ids, default=0) + 1
+        self.logger.info(f'Ortholog catalogue "{self.catalogue_dir}" has {len(ortholog_ids)} orthologs')
+
+    def assign_to_representatives(self):
+        self.protein_to_ortholog_id = {}
+        if self.next_ortholog_id == 1:  # empty catalogue
+            return
+
+        clustering_class = self.CLUSTERING_2D_ENGINES[self.clustering_engine]
+        protein_to_representative = clustering_class(self.settings).main(
+            faa1=self.representatives_faa,
+            faa2=self.faa,
+            sequence_identity=self.sequence_identity)
+
+        for protein_id, representative in protein_to_representative.items():
+            self.protein_to_ortholog_id[protein_id] = int(representative)
+
+    def cluster_unassigned(self):
+        self.new_representatives = []
+
+        unassigned_faa = f'{self.workdir}/unassigned.faa'
+        protein_to_seq = {}
+        with FastaParser(self.faa) as parser:
+            with FastaWriter(unassigned_faa) as writer:
+                for head, seq in parser:
+                    protein_id = head.split()[0]
+                    if protein_id not in self.protein_to_ortholog_id:
+                        writer.write(header=protein_id, sequence=seq)
+                        protein_to_seq[protein_id] = seq
+
+        if len(protein_to_seq) == 0:
+            return
+
+        clustering_class = self.CLUSTERING_ENGINES[self.clustering_engine]
+        protein_to_cluster = clustering_class(self.settings).main(
+            faa=unassigned_faa,
+            sequence_identity=self.sequence_identity)
+
+        cluster_to_ortholog_id = {
+            cluster: self.next_ortholog_id + i
+            for i, cluster in enumerate(sorted(set(protein_to_cluster.values())))
+        }
+
+        ortholog_id_to_representative = {}
+        for protein_id, cluster in protein_to_cluster.items():
+            ortholog_id = cluster_to_ortholog_id[cluster]
+            self.protein_to_ortholog_id[protein_id] = ortholog_id
+
+            seq = protein_to_seq[protein_id]
+            representative = ortholog_id_to_representative.get(ortholog_id)
+            if representative is None or len(seq) > len(representative):  # the longest, the first among ties
+                ortholog_id_to_representative[ortholog_id] = seq
+
+        self.new_representatives = sorted(ortholog_id_to_representative.items())
+        self.logger.info(f'Add {len(self.new_representatives)} new orthologs to the ortholog catalogue')
+
+    def save_catalogue(self):
+        # written to temporary files and then moved, such that an interrupted run leaves the catalogue intact
+        temp_faa = f'{self.representatives_faa}.tmp'
+        if os.path.exists(self.representatives_faa):
+            shutil.copyfile(self.representatives_faa, temp_faa)
+        with FastaWriter(temp_faa, mode='a') as writer:
+            for ortholog_id, seq in self.new_representatives:
+                writer.write(header=str(ortholog_id), sequence=seq)
+
+        json_path = f'{self.catalogue_dir}/{self.CATALOGUE_JSON}'
+        with open(f'{json_path}.tmp', 'w') as fh:
+            json.dump({'sequence_identity': self.sequence_identity}, fh, indent=2)
+
+        os.replace(temp_faa, self.representatives_faa)
+        os.replace(f'{json_path}.tmp', json_path)
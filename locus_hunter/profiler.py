@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import resource
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator
+
+
+class Profiler:
+    """
+    Wall time, CPU time and peak RSS of stages, processors and subprocess calls in this process
+
+    CPU time includes waited child processes, i.e. subprocess calls and pool workers.
+    Peak RSS is the high-water mark of this process or any waited child so far,
+        so the first record reaching the overall peak is where the memory was used.
+
+    Records of pool workers are passed back to the parent process by ProcessorWorker
+
+    The state (enabled, depth and records) is of each thread, e.g. of each job of the service,
+        while CPU time and peak RSS are of the whole process, i.e. including concurrent jobs
+    """
+
+    STAGE = 'stage'
+    PROCESSOR = 'processor'
+    CALL = 'call'
+
+    TSV_COLUMNS = [
+        'kind', 'name', 'depth', 'pid', 'start', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'exit_status', 'command'
+    ]
+
+    local: threading.local
+
+    def __init__(self):
+        self.local = threading.local()
+        self.reset(enabled=False)
+
+    @property
+    def enabled(self) -> bool:
+        return getattr(self.local, 'enabled', False)
+
+    @enabled.setter
+    def enabled(self, value: bool):
+        self.local.enabled = value
+
+    @property
+    def depth(self) -> int:
+        return getattr(self.local, 'depth', 0)
+
+    @depth.setter
+    def depth(self, value: int):
+        self.local.depth = value
+
+    @property
+    def records(self) -> List[Dict[str, Any]]:
+        if not hasattr(self.local, 'records'):
+            self.local.records = []
+        return self.local.records
+
+    @records.setter
+    def records(self, value: List[Dict[str, Any]]):
+        self.local.records = value
+
+    def reset(self, enabled: bool):
+        self.enabled = enabled
+        self.depth = 0
+        self.records = []
+
+    @contextmanager
+    def measure(self, kind: str, name: str) -> Iterator[Dict[str, Any]]:
+        """
+        Yield the record, to which the caller can add fields, e.g. exit_status
+        """
+        record = {'kind': kind, 'name': name, 'depth': self.depth, 'pid': os.getpid()}
+        if not self.enabled:
+            yield record
+            return
+
+        start, wall, cpu = time.time(), time.perf_counter(), get_cpu_seconds()
+        self.depth += 1
+        try:
+            yield record
+        finally:
+            self.depth -= 1
+            record.update({
+                'start': start,
+                'wall_seconds': time.perf_counter() - wall,
+                'cpu_seconds': get_cpu_seconds() - cpu,
+                'peak_rss_mb': get_peak_rss_mb(),
+            })
+            self.records.append(record)
+
+    def pop_records(self, since: int) -> List[Dict[str, Any]]:
+        ret = self.records[since:]
+        del self.records[since:]
+        return ret
+
+    def write_report(self, prefix: str):
+        """
+        Write f'{prefix}.profile.json' and f'{prefix}.profile.tsv', records ordered by start,
+            start being seconds since the first record
+        """
+        records = sorted(self.records, key=lambda r: r['start'])
+        t0 = records[0]['start'] if len(records) > 0 else 0
+        records = [{**r, 'start': r['start'] - t0} for r in records]
+
+        with open(f'{prefix}.profile.json', 'w') as fh:
+            json.dump({'records': records}, fh, indent=2)
+
+        with open(f'{prefix}.profile.tsv', 'w') as fh:
+            fh.write('\t'.join(self.TSV_COLUMNS) + '\n')
+            for r in records:
+                fh.write('\t'.join(format_value(r.get(c)) for c in self.TSV_COLUMNS) + '\n')
+
+
+def get_cpu_seconds() -> float:
+    ret = 0.
+    for who in [resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN]:
+        usage = resource.getrusage(who)
+        ret += usage.ru_utime + usage.ru_stime
+    return ret
+
+
+def get_peak_rss_mb() -> float:
+    ret = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    unit = 1 if sys.platform == 'darwin' else 1024  # bytes on macOS, kilobytes on Linux
+    return ret * unit / 2 ** 20
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return ''
+    if type(value) is float:
+        return f'{value:.3f}'
+    return str(value)
+
+
+PROFILER = Profiler()  # one per process, shared by all processors of each thread
@@ -0,0 +1,66 @@
+import os
+from typing import List, Dict, Set, Iterable, Iterator, Optional
+from ngslite import Chromosome, FastaWriter
+from ngslite.genbank_parse import GenbankTextParser, construct_chromosome, get_seqname
+from .template import Processor
+from .constant import CDS_ID_KEY
+
+
+JOINER = '___'
+
+
+class ReadGenbank(Processor):
+
+    gbk: str
+
+    def main(self, gbk: str) -> List[Chromosome]:
+        return list(self.iterate(gbk=gbk))
+
+    def iterate(self, gbk: str, seqnames: Optional[Set[str]] = None) -> Iterator[Chromosome]:
+        """
+        Parse one record at a time, so that a multi-record file is never fully held in memory
+
+        If seqnames is given, other records are skipped without parsing their features and sequence
+        """
+        self.gbk = gbk
+        fname = os.path.basename(self.gbk)
+
+        with GenbankTextParser(self.gbk) as parser:
+            for genbank_text in parser:
+                if seqnames is not None and \
+                        f'{fname}{JOINER}{get_seqname(locus_text=genbank_text.locus_text)}' not in seqnames:
+                    continue
+                chromosome = construct_chromosome(genbank_text)
+                self.modify_one(chromosome)
+                yield chromosome
+
+    def modify_one(self, chromosome: Chromosome):
+        fname = os.path.basename(self.gbk)
+        chromosome.seqname = f'{fname}{JOINER}{chromosome.seqname}'
+        for i, feature in enumerate(chromosome.features):
+            if feature.type == 'CDS':
+                feature.add_attribute(
+                    key=CDS_ID_KEY,
+                    val=f'{chromosome.seqname}{JOINER}{i+1}')
+
+
+def write_cds_faa(
+        chromosomes: Iterable[Chromosome],
+        writer: FastaWriter) -> Dict[str, int]:
+    """
+    Write CDS translations headed by cds_id, and return the number of residues of each chromosome
+    """
+    seqname_to_residues = {}
+    for chromosome in chromosomes:
+        residues = 0
+        for feature in chromosome.features:
+            if feature.type != 'CDS':
+                continue
+            cds_id = feature.get_attribute(key=CDS_ID_KEY)
+            seq = feature.get_attribute(key='translation')
+            if seq is not None:
+                writer.write(header=cds_id, sequence=seq)
+                residues += len(seq)
+        if residues > 0:
+            seqname_to_residues[chromosome.seqname] = residues
+    return seqname_to_residues
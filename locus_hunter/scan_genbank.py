@@ -0,0 +1,161 @@
+import os
+from typing import List, Dict, Tuple, Iterator, Optional, TextIO
+from ngslite import FastaWriter
+from ngslite.genbank_parse import GenbankText, get_seqname, get_valid_features_text, split_features_text, \
+    get_feature_type, get_feature_location
+from .template import Processor
+from .read_genbank import JOINER
+
+
+class ScannedCds:
+
+    cds_id: str
+    start: int
+    end: int
+    strand: str
+    translation: str
+
+    def __init__(self, cds_id: str, start: int, end: int, strand: str, translation: str):
+        self.cds_id = cds_id
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.translation = translation
+
+    def __repr__(self) -> str:
+        return f'ScannedCds({self.cds_id}, {self.start}-{self.end} ({self.strand}))'
+
+
+class ScanGenbank(Processor):
+    """
+    CDS translations and coordinates of a genbank file, scanned from the text without building Chromosome objects,
+        i.e. without parsing the sequence (ORIGIN) or any qualifier other than /translation
+
+    Writes
+        faa: CDS translations headed by cds_id, the same as write_cds_faa() of ReadGenbank chromosomes
+        f'{faa}.tsv': coordinate index, cds_id, start, end and strand of each CDS in faa
+
+    Returns the number of residues of each chromosome with any translation, also the same as write_cds_faa()
+    """
+
+    COORDINATE_SUFFIX = '.tsv'
+
+    gbk: str
+    faa: str
+
+    def main(self, gbk: str, faa: str) -> Dict[str, int]:
+        self.gbk = gbk
+        self.faa = faa
+
+        seqname_to_residues = {}
+        with FastaWriter(self.faa) as writer:
+            with open(f'{self.faa}{self.COORDINATE_SUFFIX}', 'w') as fh:
+                for seqname, cds_list in iterate_scanned_records(gbk=self.gbk):
+                    for cds in cds_list:
+                        writer.write(header=cds.cds_id, sequence=cds.translation)
+                        fh.write(f'{cds.cds_id}\t{cds.start}\t{cds.end}\t{cds.strand}\n')
+                    residues = sum(len(cds.translation) for cds in cds_list)
+                    if residues > 0:
+                        seqname_to_residues[seqname] = residues
+
+        return seqname_to_residues
+
+
+def iterate_scanned_records(gbk: str) -> Iterator[Tuple[str, List[ScannedCds]]]:
+    """
+    Yield (seqname, CDS with translation) of each record, seqname and cds_id being the same as ReadGenbank
+    """
+    fname = os.path.basename(gbk)
+    with open(gbk) as fh:
+        for head_text in iterate_head_texts(fh=fh):
+            yield scan_head_text(head_text=head_text, fname=fname)
+
+
+def iterate_head_texts(fh: TextIO) -> Iterator[str]:
+    """
+    Yield the text of each record before ORIGIN, skipping the sequence lines without keeping them
+
+    Records are split the same way as ngslite.GenbankTextParser: a record starts with 'LOCUS' and ends at '//'
+    """
+    while True:
+        line = fh.readline()
+        if not line.startswith('LOCUS'):
+            return
+
+        lines = []
+        while line != '' and not line.startswith('//'):
+            lines.append(line[:-1])  # remove '\n'
+            if 'ORIGIN' in line:
+                break
+            line = fh.readline()
+
+        while line != '' and not line.startswith('//'):  # skip the sequence
+            line = fh.readline()
+
+        yield '\n'.join(lines)
+
+
+def scan_head_text(head_text: str, fname: str) -> Tuple[str, List[ScannedCds]]:
+    # the same sections as ngslite.GenbankTextParser, as long as ORIGIN is found
+    i, j = head_text.find('FEATURES'), head_text.find('ORIGIN')
+    features_text = get_valid_features_text(genbank_text=GenbankText(
+        locus_text=head_text[0:i], features_text=head_text[i:j], origin_text=''))
+
+    seqname = f'{fname}{JOINER}{get_seqname(locus_text=head_text[0:i])}'
+
+    starts, cds_texts = [], {}
+    for k, feature_text in enumerate(split_features_text(features_text)):
+        start, end, strand, _, _, _ = get_feature_location(feature_text)
+        starts.append(start)
+        if get_feature_type(feature_text) == 'CDS':
+            cds_texts[k] = (feature_text, start, end, strand)
+
+    # cds_id is numbered by the position among all features, which are sorted by start in ngslite.FeatureArray
+    order = sorted(range(len(starts)), key=lambda k: starts[k])
+
+    ret = []
+    for n, k in enumerate(order):
+        if k not in cds_texts:
+            continue
+        feature_text, start, end, strand = cds_texts[k]
+        translation = get_translation(feature_text=feature_text)
+        if translation is not None:
+            ret.append(ScannedCds(
+                cds_id=f'{seqname}{JOINER}{n + 1}',
+                start=start,
+                end=end,
+                strand=strand,
+                translation=translation))
+
+    return seqname, ret
+
+
+TRANSLATION_START = ' ' * 21 + '/translation="'
+QUALIFIER_START = '\n' + ' ' * 21 + '/'
+
+
+def get_translation(feature_text: str) -> Optional[str]:
+    """
+    Value of the /translation qualifier, the same as parsed by ngslite, or None
+    """
+    pos = feature_text.find(TRANSLATION_START)
+    if pos == -1:
+        return None
+    pos += len(TRANSLATION_START)
+
+    # the value ends before the next qualifier line with '=', or the end of the feature
+    end = pos
+    while True:
+        end = feature_text.find(QUALIFIER_START, end)
+        if end == -1:
+            end = len(feature_text) - 1  # feature text ends with '\n'
+            break
+        line_end = feature_text.find('\n', end + 1)
+        if '=' in feature_text[end:line_end]:
+            break
+        end = line_end
+
+    value = feature_text[pos:end].rstrip()
+    if value.endswith('"'):
+        value = value[:-1]
+    return value.replace('\n', '').replace(' ', '')
@@ -0,0 +1,347 @@
+import os
+import json
+import uuid
+import shutil
+import signal
+import mimetypes
+from queue import Queue, Empty
+from collections import deque
+from threading import Thread, Lock, Event, current_thread, main_thread
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict, Any, Optional, Tuple, TYPE_CHECKING
+from .template import Processor, Settings
+from .tools import get_fingerprint
+from .batch import LocusHunterBatch, BatchJob, parse_value
+if TYPE_CHECKING:
+    from .extract_loci import GenomeIndex
+
+
+class ServiceJob:
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FINISHED = 'finished'
+    FAILED = 'failed'
+
+    job_id: str
+    directory: str
+    kwargs: Dict[str, Any]
+    status: str
+    error: Optional[str]
+
+    def __init__(self, job_id: str, directory: str, kwargs: Dict[str, Any]):
+        self.job_id = job_id
+        self.directory = directory
+        self.kwargs = kwargs
+        self.status = self.QUEUED
+        self.error = None
+
+    def is_done(self) -> bool:
+        return self.status in [self.FINISHED, self.FAILED]
+
+    def to_dict(self) -> Dict[str, Any]:
+        files = sorted(os.listdir(self.directory)) if self.status == self.FINISHED else []
+        return {'job_id': self.job_id, 'status': self.status, 'error': self.error, 'files': files}
+
+
+class LocusHunterService(Processor):
+    """
+    Local HTTP service searching a genbank folder indexed once at startup, with all modules already imported
+
+        POST /jobs?evalue=1e-10&sort_method=sketch  query faa as the request body, returns the job
+        GET /jobs                                   all jobs
+        GET /jobs/JOB_ID                            status of the job, and output files when finished
+        GET /jobs/JOB_ID/FILE                       an output file, e.g. output.gbk or output_1.png
+
+    Parameters in the query string override the defaults, the same as columns of a batch manifest.
+    Jobs are queued and run concurrently by a fixed number of worker threads, each with THREADS.
+    Forking from the threaded server is unsafe, so process pools of jobs (extraction, sort_loci, view_loci)
+        are started by a forkserver instead.
+    Outputs of each job are kept in f'{output}.jobs/JOB_ID', until more than MAX_FINISHED_JOBS jobs are finished,
+        the earliest finished job being evicted first.
+    Jobs are not checkpointed. Restart the service after the genbank folder is changed
+    """
+
+    HOST = '127.0.0.1'
+    JOB_OUTPUT = 'output'
+    QUERY_FAA = 'query.faa'
+    FORBIDDEN_PARAMETERS = LocusHunterBatch.SHARED_PARAMETERS + LocusHunterBatch.REQUIRED_COLUMNS + ['resume']
+    MAX_FINISHED_JOBS = 1000
+
+    port: int
+    workers: int
+    defaults: Dict[str, Any]
+
+    index: 'GenomeIndex'
+    gbk_fingerprint: Dict[str, Optional[Dict[str, int]]]
+    jobs_dir: str
+    jobs: Dict[str, ServiceJob]  # guarded by lock, as well as the status and error of each job
+    finished_job_ids: deque  # in the order of finishing
+    queue: Queue
+    lock: Lock
+    worker_threads: List[Thread]
+    server: ThreadingHTTPServer
+    started: Event
+
+    def __init__(self, settings: Settings):
+        super().__init__(settings=settings)
+        self.started = Event()
+
+    def main(self, port: int, workers: int, defaults: Dict[str, Any]):
+        """
+        port: 0 for any free port, which is then self.server.server_port
+        defaults: keyword arguments of LocusHunter.main(), output being the prefix of the jobs folder
+        """
+        self.port = port
+        self.workers = workers
+        self.defaults = defaults
+
+        self.set_index()
+        self.start_workers()
+        try:
+            self.serve()
+        finally:
+            self.stop_workers()
+
+    def set_index(self):
+        from .extract_loci import BuildGenomeIndex
+        self.index = BuildGenomeIndex(self.settings).main(
+            gbk_dir=self.defaults['gbk_dir'],
+            blast_db_cache=self.defaults['blast_db_cache'],
+            parallel_extraction=self.defaults['parallel_extraction'])
+        self.gbk_fingerprint = get_fingerprint(files=self.index.gbks)
+
+        self.jobs_dir = f'{self.defaults["output"]}.jobs'
+        os.makedirs(self.jobs_dir, exist_ok=True)
+
+    def start_workers(self):
+        self.jobs, self.finished_job_ids, self.queue, self.lock = {}, deque(), Queue(), Lock()
+        self.worker_threads = [Thread(target=self.work, daemon=True) for _ in range(self.workers)]
+        for thread in self.worker_threads:
+            thread.start()
+
+    def serve(self):
+        self.server = ThreadingHTTPServer((self.HOST, self.port), ServiceRequestHandler)
+        self.server.service = self
+        self.logger.info(
+            f'Serving {len(self.index.gbks)} genbank files on http://{self.HOST}:{self.server.server_port} '
+            f'with {self.workers} workers')
+        if current_thread() is main_thread():  # a daemon is stopped by SIGTERM, cleaned up the same as Ctrl-C
+            signal.signal(signal.SIGTERM, raise_keyboard_interrupt)
+        self.started.set()
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server.server_close()
+
+    def shutdown(self):
+        """
+        Stop serving, called from another thread, e.g. of a test
+        """
+        self.started.wait()
+        self.server.shutdown()
+
+    def stop_workers(self):
+        # running jobs are finished, queued jobs are not
+        while True:
+            try:
+                job = self.queue.get_nowait()
+            except Empty:
+                break
+            self.set_status(job=job, status=ServiceJob.FAILED, error='Service stopped')
+
+        for _ in self.worker_threads:
+            self.queue.put(None)
+        for thread in self.worker_threads:
+            thread.join()
+
+    def submit(self, query: str, parameters: Dict[str, str]) -> Dict[str, Any]:
+        """
+        query: text of the query faa
+        parameters: unparsed parameters of LocusHunter.main(), overriding the defaults
+
+        Returns the job as a dict
+        """
+        assert query.lstrip().startswith('>'), 'Query is not a fasta text'
+
+        kwargs = dict(self.defaults)
+        for key, value in parameters.items():
+            assert key in self.defaults, f'Unknown parameter "{key}"'
+            assert key not in self.FORBIDDEN_PARAMETERS, f'Parameter "{key}" cannot be set for a job'
+            kwargs[key] = parse_value(key=key, value=value, default=self.defaults[key])
+
+        job_id = uuid.uuid4().hex
+        directory = f'{self.jobs_dir}/{job_id}'
+        os.makedirs(directory)
+        with open(f'{directory}/{self.QUERY_FAA}', 'w') as fh:
+            fh.write(query)
+
+        kwargs.update({
+            'query_faa': f'{directory}/{self.QUERY_FAA}',
+            'output': f'{directory}/{self.JOB_OUTPUT}',
+            'resume': False,
+        })
+
+        job = ServiceJob(job_id=job_id, directory=directory, kwargs=kwargs)
+        with self.lock:
+            self.jobs[job_id] = job
+            ret = job.to_dict()
+        self.queue.put(job)
+        self.logger.info(f'Job {job_id} queued')
+        return ret
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return None if job is None else job.to_dict()
+
+    def get_jobs(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def get_job_file(self, job_id: str, file: str) -> Optional[str]:
+        """
+        Path of an output file of a finished job, None if not found
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or file not in job.to_dict()['files']:
+                return None
+            return f'{job.directory}/{file}'
+
+    def set_status(self, job: ServiceJob, status: str, error: Optional[str] = None):
+        with self.lock:
+            job.status, job.error = status, error
+            if job.is_done():
+                self.finished_job_ids.append(job.job_id)
+                while len(self.finished_job_ids) > self.MAX_FINISHED_JOBS:
+                    self.evict(job_id=self.finished_job_ids.popleft())
+
+    def evict(self, job_id: str):
+        job = self.jobs.pop(job_id)
+        shutil.rmtree(job.directory, ignore_errors=True)
+        self.logger.debug(f'Job {job_id} evicted')
+
+    def work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            self.run_job(job=job)
+
+    def run_job(self, job: ServiceJob):
+        self.set_status(job=job, status=ServiceJob.RUNNING)
+        self.logger.info(f'Job {job.job_id} running')
+
+        settings = Settings(
+            workdir=f'{self.workdir}/job_{job.job_id}',
+            outdir=job.directory,
+            threads=self.threads,
+            debug=self.debug,
+            start_method='forkserver')
+        os.makedirs(settings.workdir)
+
+        try:
+            from .extract_loci import ExtractLociFromIndex
+            loci = ExtractLociFromIndex(settings).main(
+                query_faa=job.kwargs['query_faa'],
+                index=self.index,
+                evalue=job.kwargs['evalue'],
+                extension=job.kwargs['extension'],
+                min_hits_per_locus=job.kwargs['min_hits_per_locus'],
+                parallel_extraction=self.defaults['parallel_extraction'])
+            ServiceBatchJob(settings).main(extracted_loci=loci, gbk_fingerprint=self.gbk_fingerprint, **job.kwargs)
+            status, error = ServiceJob.FINISHED, None
+        except Exception as e:
+            status, error = ServiceJob.FAILED, f'{e.__class__.__name__}: {e}'
+        finally:
+            if not self.debug:
+                shutil.rmtree(settings.workdir)
+
+        self.logger.info(f'Job {job.job_id} {status}' + (f': {error}' if error else ''))
+        self.set_status(job=job, status=status, error=error)
+
+
+class ServiceBatchJob(BatchJob):
+    """
+    BatchJob of the service, never checkpointed as it is not resumed, even with debug
+    """
+
+    def is_checkpointed(self) -> bool:
+        return False
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+
+    server: ThreadingHTTPServer
+
+    def do_POST(self):
+        path, parameters = self.parse_path()
+        if path != ['jobs']:
+            self.send_json(status=404, data={'error': f'Not found: {self.path}'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        query = self.rfile.read(length).decode()
+        try:
+            job = self.server.service.submit(query=query, parameters=parameters)
+        except (AssertionError, ValueError) as e:
+            self.send_json(status=400, data={'error': str(e)})
+            return
+        self.send_json(status=202, data=job)
+
+    def do_GET(self):
+        path, _ = self.parse_path()
+        service: LocusHunterService = self.server.service
+
+        if path == ['jobs']:
+            self.send_json(status=200, data=service.get_jobs())
+            return
+
+        if len(path) == 2 and path[0] == 'jobs':
+            job = service.get_job(job_id=path[1])
+            if job is not None:
+                self.send_json(status=200, data=job)
+                return
+        elif len(path) == 3 and path[0] == 'jobs':
+            file = service.get_job_file(job_id=path[1], file=path[2])
+            try:
+                if file is not None:
+                    self.send_file(file=file)
+                    return
+            except FileNotFoundError:  # the job was just evicted
+                pass
+
+        self.send_json(status=404, data={'error': f'Not found: {self.path}'})
+
+    def parse_path(self) -> Tuple[List[str], Dict[str, str]]:
+        url = urlsplit(self.path)
+        path = [p for p in url.path.split('/') if p != '']
+        parameters = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return path, parameters
+
+    def send_json(self, status: int, data: Any):
+        self.send_body(status=status, body=json.dumps(data).encode(), content_type='application/json')
+
+    def send_file(self, file: str):
+        with open(file, 'rb') as fh:
+            body = fh.read()
+        content_type = mimetypes.guess_type(file)[0] or 'application/octet-stream'
+        self.send_body(status=200, body=body, content_type=content_type)
+
+    def send_body(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args):
+        self.server.service.logger.debug(format % args)
+
+
+def raise_keyboard_interrupt(signum: int, frame: Any):
+    raise KeyboardInterrupt
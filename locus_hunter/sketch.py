@@ -0,0 +1,127 @@
+import numpy as np
+from typing import List
+from .template import Processor
+from .feature_table import FeatureTable
+
+
+class SortLociBySketch(Processor):
+    """
+    Approximate ordering of loci with linear memory, for too many loci to be compared all-vs-all
+
+    Each locus is sketched by MinHash of its ortholog ids and adjacent pairs of ortholog ids.
+    Starting from the first locus in the lexicographic order of sketches, the next locus is the most similar unvisited one
+        among loci sharing at least one band of the sketch (locality-sensitive hashing).
+    If there is no such locus, jump to the next unvisited locus in the lexicographic order.
+    """
+
+    NUM_HASHES = 64
+    ROWS_PER_BAND = 4
+    MAX_CANDIDATES_PER_BAND = 50
+    PRIME = 2 ** 31 - 1
+    SEED = 1
+
+    feature_table: FeatureTable
+
+    locus_shingles: List[np.ndarray]
+    signatures: np.ndarray
+    band_buckets: List[np.ndarray]
+    band_members: List[List[np.ndarray]]
+    idx_order: List[int]
+    sorted_table: FeatureTable
+
+    def main(self, feature_table: FeatureTable) -> FeatureTable:
+
+        self.feature_table = feature_table
+
+        self.set_locus_shingles()
+        self.set_signatures()
+        self.set_bands()
+        self.chain_and_set_idx_order()
+        self.set_sorted_table()
+
+        return self.sorted_table
+
+    def set_locus_shingles(self):
+        locus_ortholog_ids = [
+            self.feature_table.get_ortholog_ids(i).tolist() for i in range(len(self.feature_table))]
+
+        ortholog_id_to_code = {}
+        for ortholog_ids in locus_ortholog_ids:
+            for ortholog_id in ortholog_ids:
+                ortholog_id_to_code.setdefault(ortholog_id, len(ortholog_id_to_code) + 1)
+
+        n = len(ortholog_id_to_code) + 1
+
+        self.locus_shingles = []
+        for ortholog_ids in locus_ortholog_ids:
+            codes = [ortholog_id_to_code[o] for o in ortholog_ids]
+            # single codes are in [1, n), pairs are offset into [n, PRIME) after the modulo, i.e. distinct from single codes
+            pairs = [n + (a * n + b) % (self.PRIME - n) for a, b in zip(codes[:-1], codes[1:])]
+            shingles = np.array(codes + pairs, dtype=np.int64)
+            self.locus_shingles.append(np.unique(shingles))
+
+    def set_signatures(self):
+        rng = np.random.RandomState(self.SEED)
+        a = rng.randint(1, self.PRIME, size=(self.NUM_HASHES, 1)).astype(np.int64)
+        b = rng.randint(0, self.PRIME, size=(self.NUM_HASHES, 1)).astype(np.int64)
+
+        # loci without any ortholog id have the max signature, i.e. they are similar to each other
+        self.signatures = np.full((len(self.feature_table), self.NUM_HASHES), self.PRIME, dtype=np.int64)
+        for i, shingles in enumerate(self.locus_shingles):
+            if len(shingles) > 0:
+                # a, b, shingles < 2^31, no overflow of int64
+                self.signatures[i] = ((a * shingles + b) % self.PRIME).min(axis=1)
+
+    def set_bands(self):
+        """
+        For each band, the bucket of each locus, and the members of each bucket in ascending order
+        """
+        self.band_buckets, self.band_members = [], []
+        for start in range(0, self.NUM_HASHES, self.ROWS_PER_BAND):
+            band = self.signatures[:, start:start + self.ROWS_PER_BAND]
+            _, buckets = np.unique(band, axis=0, return_inverse=True)
+            buckets = buckets.reshape(-1)
+            members = np.argsort(buckets, kind='stable')
+            splits = np.flatnonzero(np.diff(buckets[members])) + 1
+            self.band_buckets.append(buckets)
+            self.band_members.append(np.split(members, splits))
+
+    def chain_and_set_idx_order(self):
+        n = len(self.feature_table)
+        visited = np.zeros(n, dtype=bool)
+        fallback_order = np.lexsort(self.signatures.T[::-1])
+        fallback_pos = 0
+
+        # start position of unvisited members in each bucket, visited ones are mostly at the front
+        heads = [[0] * len(members) for members in self.band_members]
+
+        self.idx_order = []
+        current = fallback_order[0] if n > 0 else None
+        while current is not None:
+            visited[current] = True
+            self.idx_order.append(int(current))
+
+            candidates = []
+            for band, buckets in enumerate(self.band_buckets):
+                bucket = buckets[current]
+                members = self.band_members[band][bucket]
+                head = heads[band][bucket]
+                while head < len(members) and visited[members[head]]:
+                    head += 1
+                heads[band][bucket] = head
+                unvisited = members[head:head + self.MAX_CANDIDATES_PER_BAND]
+                candidates.append(unvisited[~visited[unvisited]])
+
+            candidates = np.unique(np.concatenate(candidates))
+
+            if len(candidates) > 0:
+                similarity = np.count_nonzero(self.signatures[candidates] == self.signatures[current], axis=1)
+                current = candidates[np.argmax(similarity)]  # the lowest index among ties
+                continue
+
+            while fallback_pos < n and visited[fallback_order[fallback_pos]]:
+                fallback_pos += 1
+            current = fallback_order[fallback_pos] if fallback_pos < n else None
+
+    def set_sorted_table(self):
+        self.sorted_table = self.feature_table.take_loci(self.idx_order)
@@ -1,259 +1,470 @@
 import numpy as np
-from typing import List, Dict, Any
-from itertools import combinations
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from scipy.cluster import hierarchy
-from ngslite import Chromosome, FastaWriter
-from .cd_hit import CdHit
-from .template import Processor, Settings
-from .constant import CDS_ID_KEY, ORTHOLOG_ID_KEY
+from ngslite import FastaWriter
+from .ortholog_catalogue import OrthologCatalogue
+from .sketch import SortLociBySketch
+from .feature_table import FeatureTable
+from .template import Processor
 
 
 class SortLoci(Processor):
 
-    loci: List[Chromosome]
+    LINKAGE = 'linkage'
+    SKETCH = 'sketch'
+    SORT_METHODS = [LINKAGE, SKETCH]
+
+    feature_table: FeatureTable
     ortholog_identity: float
+    clustering_engine: str
+    ortholog_catalogue: Optional[str]
+    seed_orthologs_from_hits: bool
     dereplicate_loci: bool
     include_locus_names: List[str]
+    alignment_engine: str
+    sort_method: str
+    optimal_leaf_ordering: bool
+    newick: Optional[str]
 
     def main(
             self,
-            loci: List[Chromosome],
+            feature_table: FeatureTable,
             ortholog_identity: float,
+            clustering_engine: str,
+            ortholog_catalogue: Optional[str],
+            seed_orthologs_from_hits: bool,
             dereplicate_loci: bool,
-            include_locus_names: List[str]) -> List[Chromosome]:
+            include_locus_names: List[str],
+            alignment_engine: str,
+            sort_method: str,
+            optimal_leaf_ordering: bool,
+            newick: Optional[str]) -> FeatureTable:
 
-        self.loci = loci
+        self.feature_table = feature_table
         self.ortholog_identity = ortholog_identity
+        self.clustering_engine = clustering_engine
+        self.ortholog_catalogue = ortholog_catalogue
+        self.seed_orthologs_from_hits = seed_orthologs_from_hits
         self.dereplicate_loci = dereplicate_loci
         self.include_locus_names = include_locus_names
+        self.alignment_engine = alignment_engine
+        self.sort_method = sort_method
+        self.optimal_leaf_ordering = optimal_leaf_ordering
+        self.newick = newick
+
+        assert self.sort_method in self.SORT_METHODS, f'sort_method must be one of {self.SORT_METHODS}'
 
         self.assign_ortholog_id()
         self.dereplicate_loci_by_identical_ortholog_ids()
-        self.sort_loci_by_comparison()
+        self.sort_loci_by_method()
 
-        return self.loci
+        return self.feature_table
 
     def assign_ortholog_id(self):
-        self.loci = AssignOrthologId(self.settings).main(
-            loci=self.loci,
-            ortholog_identity=self.ortholog_identity)
+        self.feature_table = AssignOrthologId(self.settings).main(
+            feature_table=self.feature_table,
+            ortholog_identity=self.ortholog_identity,
+            clustering_engine=self.clustering_engine,
+            ortholog_catalogue=self.ortholog_catalogue,
+            seed_orthologs_from_hits=self.seed_orthologs_from_hits)
 
     def dereplicate_loci_by_identical_ortholog_ids(self):
         if self.dereplicate_loci:
-            self.loci = DereplicateLociByIdenticalOrthologIDs(self.settings).main(
-                loci=self.loci,
+            self.feature_table = DereplicateLociByIdenticalOrthologIDs(self.settings).main(
+                feature_table=self.feature_table,
                 include_locus_names=self.include_locus_names)
 
-    def sort_loci_by_comparison(self):
-        self.loci = SortLociByComparison(self.settings).main(
-            loci=self.loci)
+    def sort_loci_by_method(self):
+        if self.sort_method == self.SKETCH:
+            if self.optimal_leaf_ordering or self.newick is not None:
+                self.logger.info('WARNING: no tree of loci for the sketch sort method, skip leaf ordering and Newick')
+            self.feature_table = SortLociBySketch(self.settings).main(
+                feature_table=self.feature_table)
+        else:
+            self.feature_table = SortLociByComparison(self.settings).main(
+                feature_table=self.feature_table,
+                alignment_engine=self.alignment_engine,
+                optimal_leaf_ordering=self.optimal_leaf_ordering,
+                newick=self.newick)
 
 
 class AssignOrthologId(Processor):
 
-    loci: List[Chromosome]
+    CLUSTERING_ENGINES = OrthologCatalogue.CLUSTERING_ENGINES
+
+    feature_table: FeatureTable
     ortholog_identity: float
+    clustering_engine: str
+    ortholog_catalogue: Optional[str]
+    seed_orthologs_from_hits: bool
 
     faa: str
+    n_proteins: int
+    query_to_representative: Dict[str, str]
     cds_id_to_ortholog_id: Dict[str, int]
 
     def main(
             self,
-            loci: List[Chromosome],
-            ortholog_identity: float) -> List[Chromosome]:
+            feature_table: FeatureTable,
+            ortholog_identity: float,
+            clustering_engine: str,
+            ortholog_catalogue: Optional[str],
+            seed_orthologs_from_hits: bool) -> FeatureTable:
 
-        self.loci = loci
+        self.feature_table = feature_table
         self.ortholog_identity = ortholog_identity
+        self.clustering_engine = clustering_engine
+        self.ortholog_catalogue = ortholog_catalogue
+        self.seed_orthologs_from_hits = seed_orthologs_from_hits
+
+        assert self.clustering_engine in self.CLUSTERING_ENGINES, \
+            f'clustering_engine must be one of {list(self.CLUSTERING_ENGINES)}'
 
         self.write_faa()
-        self.create_orthologs_by_cd_hit()
-        self.add_ortholog_id_to_features()
+        self.create_orthologs()
+        self.seed_orthologs()
+        self.set_ortholog_id_column()
 
-        return self.loci
+        return self.feature_table
 
     def write_faa(self):
 
         self.faa = f'{self.workdir}/loci.faa'
+        self.n_proteins = 0
+
+        t = self.feature_table
+        mask = np.not_equal(t.translation, None)
+        if self.seed_orthologs_from_hits:
+            mask &= np.equal(t.query_hit, None)
+
+        records = list(zip(t.cds_id[mask].tolist(), t.translation[mask].tolist()))
+        if self.seed_orthologs_from_hits and self.ortholog_catalogue is not None:
+            # ortholog ids of seeds are allocated by the catalogue, through one representative CDS per query
+            records += self.get_query_representatives()
 
         with FastaWriter(self.faa) as writer:
-            for locus in self.loci:
-                for feature in locus.features:
-                    if feature.type != 'CDS':
-                        continue
-                    cds_id = feature.get_attribute(key=CDS_ID_KEY)
-                    seq = feature.get_attribute(key='translation')
-                    if seq is not None:
-                        writer.write(header=cds_id, sequence=seq)
+            for cds_id, seq in records:
+                writer.write(header=cds_id, sequence=seq)
+                self.n_proteins += 1
 
         return self.faa
 
-    def create_orthologs_by_cd_hit(self):
-        self.cds_id_to_ortholog_id = CdHit(self.settings).main(
-            faa=self.faa,
-            sequence_identity=self.ortholog_identity)
-
-    def add_ortholog_id_to_features(self):
-        for locus in self.loci:
-            for feature in locus.features:
-                if feature.type != 'CDS':
-                    continue
-                cds_id = feature.get_attribute(CDS_ID_KEY)
-                ortholog_id = self.cds_id_to_ortholog_id.get(cds_id, None)
-                if ortholog_id is not None:
-                    feature.add_attribute(
-                        key=ORTHOLOG_ID_KEY,
-                        val=ortholog_id)
+    def get_query_representatives(self) -> List[Tuple[str, str]]:
+        # the longest CDS hit by each query
+        t = self.feature_table
+        mask = np.not_equal(t.query_hit, None) & np.not_equal(t.translation, None)
+        query_to_record = {}
+        for cds_id, seq, query in zip(
+                t.cds_id[mask].tolist(), t.translation[mask].tolist(), t.query_hit[mask].tolist()):
+            if query not in query_to_record or len(seq) > len(query_to_record[query][1]):
+                query_to_record[query] = (cds_id, seq)
+
+        self.query_to_representative = {query: cds_id for query, (cds_id, _) in query_to_record.items()}
+        return [query_to_record[query] for query in sorted(query_to_record.keys())]
+
+    def create_orthologs(self):
+        if self.n_proteins == 0:
+            self.cds_id_to_ortholog_id = {}
+        elif self.ortholog_catalogue is not None:
+            self.cds_id_to_ortholog_id = OrthologCatalogue(self.settings).main(
+                faa=self.faa,
+                sequence_identity=self.ortholog_identity,
+                catalogue_dir=self.ortholog_catalogue,
+                clustering_engine=self.clustering_engine)
+        else:
+            # any clustering engine: main(faa, sequence_identity) -> {protein_id: cluster_id}
+            clustering_class = self.CLUSTERING_ENGINES[self.clustering_engine]
+            self.cds_id_to_ortholog_id = clustering_class(self.settings).main(
+                faa=self.faa,
+                sequence_identity=self.ortholog_identity)
+
+    def seed_orthologs(self):
+        if not self.seed_orthologs_from_hits:
+            return
+
+        t = self.feature_table
+        mask = np.not_equal(t.query_hit, None)
+        cds_id_to_query = dict(zip(t.cds_id[mask].tolist(), t.query_hit[mask].tolist()))
+
+        if self.ortholog_catalogue is not None:
+            query_to_ortholog_id = {
+                query: self.cds_id_to_ortholog_id[cds_id]
+                for query, cds_id in self.query_to_representative.items()
+            }
+        else:
+            # after the ortholog ids of clustered CDS, so as not to collide
+            offset = max(self.cds_id_to_ortholog_id.values(), default=0)
+            query_to_ortholog_id = {
+                query: offset + i + 1
+                for i, query in enumerate(sorted(set(cds_id_to_query.values())))
+            }
+        for cds_id, query in cds_id_to_query.items():
+            self.cds_id_to_ortholog_id[cds_id] = query_to_ortholog_id[query]
+
+    def set_ortholog_id_column(self):
+        d, none = self.cds_id_to_ortholog_id, FeatureTable.NO_ORTHOLOG_ID
+        self.feature_table.ortholog_id = np.array(
+            [d.get(cds_id, none) for cds_id in self.feature_table.cds_id.tolist()], dtype=np.int64)
 
 
 class DereplicateLociByIdenticalOrthologIDs(Processor):
 
-    loci: List[Chromosome]
+    feature_table: FeatureTable
     include_locus_names: List[str]
 
-    ortholog_ids_to_loci: Dict[str, List[Chromosome]]
+    ortholog_ids_to_loci: Dict[Tuple[int, ...], List[int]]
 
-    dereplicated_loci: List[Chromosome]
+    picked_loci: List[int]
 
     def main(
             self,
-            loci: List[Chromosome],
-            include_locus_names: List[str]) -> List[Chromosome]:
+            feature_table: FeatureTable,
+            include_locus_names: List[str]) -> FeatureTable:
 
-        self.loci = loci
+        self.feature_table = feature_table
         self.include_locus_names = include_locus_names
 
         self.set_ortholog_ids_to_loci()
         self.pick_loci()
         self.log_info()
 
-        return self.dereplicated_loci
+        return self.feature_table.take_loci(self.picked_loci)
 
     def set_ortholog_ids_to_loci(self):
+        # ortholog ids of all CDS, including NO_ORTHOLOG_ID, as the key of each locus
         self.ortholog_ids_to_loci = {}
-        for locus in self.loci:
-            ortholog_ids = locus_to_ortholog_ids(locus)
-            self.ortholog_ids_to_loci.setdefault(ortholog_ids, []).append(locus)
+        ortholog_id = self.feature_table.ortholog_id
+        for i in range(len(self.feature_table)):
+            ortholog_ids = tuple(ortholog_id[self.feature_table.rows(i)].tolist())
+            self.ortholog_ids_to_loci.setdefault(ortholog_ids, []).append(i)
 
     def pick_loci(self):
-        self.dereplicated_loci = []
+        self.picked_loci = []
         for loci in self.ortholog_ids_to_loci.values():
 
             picked = 0
-            for locus in loci:  # look for the locus names to be included
-                if self.__should_be_included(locus=locus):
-                    self.dereplicated_loci.append(locus)
+            for i in loci:  # look for the locus names to be included
+                if self.__should_be_included(seqname=self.feature_table.loci[i].seqname):
+                    self.picked_loci.append(i)
                     picked += 1
 
             if picked == 0:  # pick the first locus if nothing has been picked yet
-                self.dereplicated_loci.append(loci[0])
+                self.picked_loci.append(loci[0])
 
-    def __should_be_included(self, locus: Chromosome) -> bool:
+    def __should_be_included(self, seqname: str) -> bool:
         for locus_name in self.include_locus_names:
-            if locus_name in locus.seqname:
+            if locus_name in seqname:
                 return True
         return False
 
     def log_info(self):
-        msg = f'Dereplicated {len(self.loci)} loci to {len(self.dereplicated_loci)} loci'
+        msg = f'Dereplicated {len(self.feature_table)} loci to {len(self.picked_loci)} loci'
         self.logger.info(msg)
 
 
-def locus_to_ortholog_ids(chromosome: Chromosome) -> str:
-    ortholog_ids = []
-    for feature in chromosome.features:
-        if feature.type != 'CDS':
-            continue
-        orid = str(feature.get_attribute(ORTHOLOG_ID_KEY))  # can be None, so convert to str
-        ortholog_ids.append(orid)
-    return ','.join(ortholog_ids)
-
-
 class SortLociByComparison(Processor):
 
     LINKAGE_METHOD = 'average'
+    CHUNKS_PER_THREAD = 4
 
-    loci: List[Chromosome]
+    feature_table: FeatureTable
+    alignment_engine: str
+    optimal_leaf_ordering: bool
+    newick: Optional[str]
 
-    locus_id_to_ortholog_ids: Dict[str, List[int]]
     distance_matrix: np.ndarray
     linkage_matrix: np.ndarray
     idx_order: List[int]
-    sorted_loci: List[Chromosome]
-
-    def __init__(self, settings: Settings):
-        super().__init__(settings=settings)
-        self.compare = SmithWatermanAligner().run
+    sorted_table: FeatureTable
 
     def main(
             self,
-            loci: List[Chromosome]) -> List[Chromosome]:
+            feature_table: FeatureTable,
+            alignment_engine: str,
+            optimal_leaf_ordering: bool,
+            newick: Optional[str]) -> FeatureTable:
 
-        self.loci = loci
+        self.feature_table = feature_table
+        self.alignment_engine = alignment_engine
+        self.optimal_leaf_ordering = optimal_leaf_ordering
+        self.newick = newick
 
-        self.set_locus_id_to_ortholog_ids()
+        self.set_aligner()
         self.set_condensed_distance_matrix()
         self.set_linkage_matrix()
-        self.plot_tree_and_set_idx_order()
-        self.set_sorted_loci()
-
-        return self.sorted_loci
-
-    def set_locus_id_to_ortholog_ids(self):
-        d = {}
-
-        for locus in self.loci:
+        self.set_idx_order()
+        self.write_newick()
+        self.set_sorted_table()
 
-            orthologs = []
-            for feature in locus.features:
-                if feature.type != 'CDS':
-                    continue
-                ortholog_id = feature.get_attribute(key=ORTHOLOG_ID_KEY)
-                if ortholog_id is not None:
-                    orthologs.append(ortholog_id)
+        return self.sorted_table
 
-            d[locus.seqname] = orthologs
-
-        self.locus_id_to_ortholog_ids = d
+    def set_aligner(self):
+        aligner = SmithWatermanAligner(engine=self.alignment_engine)
+        if aligner.engine != self.alignment_engine:
+            self.logger.info(f'WARNING: numba is not installed, use {aligner.engine} alignment engine instead')
+            self.alignment_engine = aligner.engine
+        if aligner.engine == SmithWatermanAligner.NUMBA:
+            # compile before forking, such that worker processes inherit the compiled kernel
+            aligner.run_int_arrays(a=np.zeros(1, dtype=np.int64), b=np.zeros(1, dtype=np.int64))
 
     def set_condensed_distance_matrix(self):
 
         # condensed distance matrix:
         #   1-D array of pairs following the order given by combinations()
-        similarity_matrix = []
+        n = len(self.feature_table)
+        similarity_matrix = np.empty(n * (n - 1) // 2, dtype=np.float64)
 
-        for locus1, locus2 in combinations(self.loci, 2):
+        # encode ortholog ids of all loci once, into integers shared across loci
+        codes = encode_as_int_arrays(
+            *[self.feature_table.get_ortholog_ids(i).tolist() for i in range(n)])
 
-            orthologs_1 = self.locus_id_to_ortholog_ids[locus1.seqname]
-            orthologs_2 = self.locus_id_to_ortholog_ids[locus2.seqname]
+        n_chunks = 1 if self.threads <= 1 else self.threads * self.CHUNKS_PER_THREAD
+        kwargs_list = [{
+            'codes': codes[first:],
+            'rows': last - first,
+            'alignment_engine': self.alignment_engine,
+        } for first, last in split_rows_by_pairs(n=n, n_chunks=n_chunks)]
 
-            s = self.compare(list1=orthologs_1, list2=orthologs_2)
+        results = self.imap_processor(
+            processor_class=AlignLocusPairs,
+            kwargs_list=kwargs_list,
+            processes=self.threads)
 
-            similarity_matrix.append(s)
+        pos = 0  # chunks are contiguous rows, so results are written in order
+        for scores in results:
+            similarity_matrix[pos:pos + len(scores)] = scores
+            pos += len(scores)
 
-        self.distance_matrix = np.exp(-np.array(similarity_matrix))
+        self.distance_matrix = np.exp(-similarity_matrix)
 
     def set_linkage_matrix(self):
         self.linkage_matrix = hierarchy.linkage(self.distance_matrix, self.LINKAGE_METHOD)
+        if self.optimal_leaf_ordering:
+            self.linkage_matrix = hierarchy.optimal_leaf_ordering(self.linkage_matrix, self.distance_matrix)
+
+    def set_idx_order(self):
+        # same order as the leaves of the dendrogram, without plotting
+        self.idx_order = hierarchy.leaves_list(self.linkage_matrix).tolist()
+
+    def write_newick(self):
+        if self.newick is None:
+            return
+        with open(self.newick, 'w') as fh:
+            fh.write(linkage_to_newick(
+                linkage_matrix=self.linkage_matrix,
+                labels=[locus.seqname for locus in self.feature_table.loci]) + '\n')
+
+    def set_sorted_table(self):
+        self.sorted_table = self.feature_table.take_loci(self.idx_order)
+
+
+def linkage_to_newick(linkage_matrix: np.ndarray, labels: List[str]) -> str:
+    """
+    Labels are always quoted, since unquoted underscores are read as blanks in Newick
+    """
+    n = len(labels)
+    heights = [0.] * n + linkage_matrix[:, 2].tolist()
+    children = {n + k: (int(a), int(b)) for k, (a, b) in enumerate(linkage_matrix[:, :2])}
+
+    # iterative traversal, as the tree can be deeper than the recursion limit
+    tokens = []
+    stack = [(2 * n - 2, None)]  # (node, parent), or a str token to be written
+    while stack:
+        item = stack.pop()
+        if type(item) is str:
+            tokens.append(item)
+            continue
+
+        node, parent = item
+        length = '' if parent is None else f':{heights[parent] - heights[node]:g}'
+        if node < n:
+            label = labels[node].replace("'", "''")
+            tokens.append(f"'{label}'{length}")
+        else:
+            left, right = children[node]
+            stack += [f'){length}', (right, node), ',', (left, node)]
+            tokens.append('(')
+
+    return ''.join(tokens) + ';'
 
-    def plot_tree_and_set_idx_order(self):
-        idx_order = hierarchy.dendrogram(
-            Z=self.linkage_matrix,
-            orientation='top'  # root on top
-        )['ivl']  # 'ivl': a list of labels corresponding to the leaf nodes
 
-        self.idx_order = list(map(int, idx_order))
+class AlignLocusPairs(Processor):
 
-    def set_sorted_loci(self):
-        self.sorted_loci = [self.loci[i] for i in self.idx_order]
+    codes: List[np.ndarray]
+    rows: int
+    alignment_engine: str
+
+    def main(
+            self,
+            codes: List[np.ndarray],
+            rows: int,
+            alignment_engine: str) -> np.ndarray:
+        """
+        Scores of pairs (i, j) for i in range(rows) and j > i, in the order of combinations()
+        """
+        self.codes = codes
+        self.rows = rows
+        self.alignment_engine = alignment_engine
+
+        aligner = SmithWatermanAligner(engine=self.alignment_engine)
+
+        n = len(self.codes)
+        ret = np.empty(sum(n - 1 - i for i in range(self.rows)), dtype=np.float64)
+        k = 0
+        for i in range(self.rows):
+            for j in range(i + 1, n):
+                if self.alignment_engine == SmithWatermanAligner.PYTHON:
+                    ret[k] = aligner.run(list1=list(self.codes[i]), list2=list(self.codes[j]))
+                else:
+                    ret[k] = aligner.run_int_arrays(a=self.codes[i], b=self.codes[j])
+                k += 1
+        return ret
+
+
+def split_rows_by_pairs(n: int, n_chunks: int) -> List[Tuple[int, int]]:
+    """
+    Split rows 0..n-1 of the upper triangle into contiguous (first, last) chunks
+        with about the same number of pairs, since row i has n - 1 - i pairs
+    """
+    target = (n * (n - 1) // 2) / n_chunks
+    ret = []
+    first, pairs = 0, 0
+    for i in range(n - 1):
+        pairs += n - 1 - i
+        if pairs >= target:
+            ret.append((first, i + 1))
+            first, pairs = i + 1, 0
+    if first < n - 1:
+        ret.append((first, n - 1))
+    return ret
 
 
 class SmithWatermanAligner:
 
+    PYTHON = 'python'
+    NUMPY = 'numpy'
+    NUMBA = 'numba'
+    ENGINES = [PYTHON, NUMPY, NUMBA]
+
     END_GAP_SCORE = 0.
     GAP_SCORE = -1.
     MATCH_SCORE = 100.
     MISMATCH_SCORE = -1.
 
+    engine: str
+
+    def __init__(self, engine: str = NUMPY):
+        """
+        Engines give identical scores:
+            'python': reference implementation, filling the matrix cell by cell
+            'numpy': row by row, the gap recurrence within a row being a running maximum
+            'numba': compiled cell-by-cell kernel, falls back to 'numpy' if numba is not installed
+        """
+        assert engine in self.ENGINES, f'engine must be one of {self.ENGINES}'
+        if engine == self.NUMBA and get_numba_kernel() is None:
+            engine = self.NUMPY
+        self.engine = engine
+
     def compare(self, a: Any, b: Any) -> float:
         return self.MATCH_SCORE if a == b else self.MISMATCH_SCORE
 
@@ -261,6 +472,44 @@ class SmithWatermanAligner:
             list1: List[Any],
             list2: List[Any]) -> float:
 
+        if self.engine == self.PYTHON:
+            return self.run_python(list1=list1, list2=list2)
+
+        a, b = encode_as_int_arrays(list1, list2)
+        return self.run_int_arrays(a=a, b=b)
+
+    def run_int_arrays(self, a: np.ndarray, b: np.ndarray) -> int:
+        """
+        a, b: 1-D int64 arrays, where equal items are encoded as equal integers
+        """
+        if self.engine == self.NUMBA:
+            return int(get_numba_kernel()(
+                a, b,
+                int(self.END_GAP_SCORE), int(self.GAP_SCORE), int(self.MATCH_SCORE), int(self.MISMATCH_SCORE)))
+        return self.run_numpy(a=a, b=b)
+
+    def run_numpy(self, a: np.ndarray, b: np.ndarray) -> int:
+        end_gap, gap = int(self.END_GAP_SCORE), int(self.GAP_SCORE)
+        match, mismatch = int(self.MATCH_SCORE), int(self.MISMATCH_SCORE)
+
+        # M[r + 1, c + 1] = max(diagonal, M[r, c + 1] + gap, M[r + 1, c] + gap)
+        #   Unrolling the last term along a row: M[r + 1, j] = max_k(X[k] + gap * (j - k)),
+        #   where X holds the first two terms, which is a running maximum of X - gap * k
+        gap_ramp = gap * np.arange(len(b) + 1, dtype=np.int64)
+        row = end_gap * np.arange(len(b) + 1, dtype=np.int64)  # first row
+        x = np.empty(len(b) + 1, dtype=np.int64)
+        for item in a:
+            x[0] = row[0] + end_gap
+            x[1:] = np.maximum(
+                row[:-1] + np.where(b == item, match, mismatch),
+                row[1:] + gap)
+            row = np.maximum.accumulate(x - gap_ramp) + gap_ramp
+        return int(row[-1])
+
+    def run_python(self,
+                   list1: List[Any],
+                   list2: List[Any]) -> float:
+
         L1, L2 = list1, list2
 
         M = np.zeros((len(L1) + 1, len(L2) + 1), dtype=np.int32)
@@ -280,3 +529,47 @@ class SmithWatermanAligner:
                 M[r + 1, c + 1] = max(down_right, right, down)
 
         return M[-1, -1]
+
+
+def encode_as_int_arrays(*lists: List[Any]) -> List[np.ndarray]:
+    """
+    Encode items into integers shared across all lists, such that a == b <=> code(a) == code(b)
+    """
+    item_to_code = {}
+    return [
+        np.array([item_to_code.setdefault(item, len(item_to_code)) for item in ls], dtype=np.int64)
+        for ls in lists
+    ]
+
+
+_NUMBA_KERNEL = None
+
+
+def get_numba_kernel() -> Optional[Callable]:
+    """
+    Compile the cell-by-cell kernel on first use, None if numba is not installed
+    """
+    global _NUMBA_KERNEL
+    if _NUMBA_KERNEL is not None:
+        return _NUMBA_KERNEL
+
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    @numba.njit(cache=False)
+    def kernel(a, b, end_gap, gap, match, mismatch):
+        M = np.zeros((len(a) + 1, len(b) + 1), dtype=np.int64)
+        for r in range(len(a)):
+            M[r + 1, 0] = M[r, 0] + end_gap
+        for c in range(len(b)):
+            M[0, c + 1] = M[0, c] + end_gap
+        for r in range(len(a)):
+            for c in range(len(b)):
+                s = match if a[r] == b[c] else mismatch
+                M[r + 1, c + 1] = max(M[r, c] + s, M[r + 1, c] + gap, M[r, c + 1] + gap)
+        return M[-1, -1]
+
+    _NUMBA_KERNEL = kernel
+    return _NUMBA_KERNEL
@@ -1,6 +1,10 @@
+import os
 import subprocess
-from typing import Any
+from functools import wraps
 from datetime import datetime
+from multiprocessing import get_context
+from typing import Any, Dict, List, Iterator, Callable, Optional
+from .profiler import PROFILER, Profiler
 
 
 class Settings:
@@ -9,18 +13,25 @@ class Settings:
     outdir: str
     threads: int
     debug: bool
+    start_method: Optional[str]
 
     def __init__(
             self,
             workdir: str,
             outdir: str,
             threads: int,
-            debug: bool):
+            debug: bool,
+            start_method: Optional[str] = None):
+        """
+        start_method: of process pools, None for the platform default,
+            'forkserver' in a threaded process, from which forking is unsafe
+        """
 
         self.workdir = workdir
         self.outdir = outdir
         self.threads = threads
         self.debug = debug
+        self.start_method = start_method
 
 
 class Logger:
@@ -51,6 +62,9 @@ class Logger:
 
 
 class Processor:
+    """
+    main() of every subclass is measured by the PROFILER when it is enabled
+    """
 
     CMD_LINEBREAK = ' \\\n  '
 
@@ -75,6 +89,83 @@ class Processor:
             level=Logger.DEBUG if self.debug else Logger.INFO
         )
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if 'main' in cls.__dict__:
+            cls.main = profiled(cls.main, name=cls.__name__)
+
     def call(self, cmd: str):
         self.logger.debug(cmd)
-        subprocess.check_call(cmd, shell=True)
+        command = ' '.join(s for s in cmd.split() if s != '\\')  # without CMD_LINEBREAK
+        with PROFILER.measure(kind=Profiler.CALL, name=command.split()[0]) as record:
+            record['command'] = command
+            try:
+                subprocess.check_call(cmd, shell=True)
+                record['exit_status'] = 0
+            except subprocess.CalledProcessError as e:
+                record['exit_status'] = e.returncode
+                raise
+
+    def imap_processor(
+            self,
+            processor_class: type,
+            kwargs_list: List[Dict[str, Any]],
+            processes: int) -> Iterator[Any]:
+        """
+        Run processor_class(settings).main(**kwargs) for each kwargs,
+            yielding results in the same order as kwargs_list
+        """
+        if processes <= 1:
+            for kwargs in kwargs_list:
+                yield processor_class(self.settings).main(**kwargs)
+            return
+
+        worker = ProcessorWorker(processor_class=processor_class, settings=self.settings)
+        with get_context(self.settings.start_method).Pool(processes=processes) as pool:
+            for result, records in pool.imap(worker, kwargs_list):
+                PROFILER.records.extend(records)
+                yield result
+
+
+class ProcessorWorker:
+    """
+    Picklable callable to run a Processor in a pool worker process,
+        which has its own workdir and runs single-threaded subprocesses
+    """
+
+    processor_class: type
+    settings: Settings
+    profile: bool
+    depth: int
+
+    def __init__(self, processor_class: type, settings: Settings):
+        self.processor_class = processor_class
+        self.settings = settings
+        # profiler state of the parent process, as workers may be spawned rather than forked
+        self.profile = PROFILER.enabled
+        self.depth = PROFILER.depth
+
+    def __call__(self, kwargs: Dict[str, Any]) -> Any:
+        workdir = os.path.join(self.settings.workdir, f'worker_{os.getpid()}')
+        os.makedirs(workdir, exist_ok=True)
+        settings = Settings(
+            workdir=workdir,
+            outdir=self.settings.outdir,
+            threads=1,
+            debug=self.settings.debug,
+            start_method=self.settings.start_method)
+
+        PROFILER.enabled, PROFILER.depth = self.profile, self.depth
+        since = len(PROFILER.records)  # a forked worker inherits records of the parent
+        result = self.processor_class(settings).main(**kwargs)
+        return result, PROFILER.pop_records(since=since)
+
+
+def profiled(main: Callable, name: str) -> Callable:
+
+    @wraps(main)
+    def wrapper(*args, **kwargs):
+        with PROFILER.measure(kind=Profiler.PROCESSOR, name=name):
+            return main(*args, **kwargs)
+
+    return wrapper
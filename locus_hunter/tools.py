@@ -1,4 +1,9 @@
 import os
+from typing import List, Dict, Optional
+from ngslite import get_files
+
+
+IMAGE_FORMATS = ['pdf', 'png', 'svg']  # light, to validate arguments without importing matplotlib
 
 
 def get_temp_path(prefix: str = 'temp', suffix: str = '') -> str:
@@ -9,3 +14,32 @@ def get_temp_path(prefix: str = 'temp', suffix: str = '') -> str:
             break
         i += 1
     return path
+
+
+def list_gbks(gbk_dir: str) -> List[str]:
+    files = get_files(source=gbk_dir, isfullpath=True)
+    return [f for f in files if not os.path.basename(f).startswith('.')]
+
+
+def get_fingerprint(files: List[str]) -> Dict[str, Optional[Dict[str, int]]]:
+    """
+    mtime and size of each file, which change when the file is modified, None for a missing file
+    """
+    ret = {}
+    for file in files:
+        if not os.path.exists(file):
+            ret[file] = None
+            continue
+        stat = os.stat(file)
+        ret[file] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+    return ret
+
+
+def parse_formats(value: str) -> List[str]:
+    """
+    Comma-separated image formats, "none" for no image
+    """
+    formats = [] if value == 'none' else value.split(',')
+    for fmt in formats:
+        assert fmt in IMAGE_FORMATS, f'image format must be among {IMAGE_FORMATS}, not "{fmt}"'
+    return formats
@@ -1,105 +1,64 @@
-import matplotlib.pyplot as plt
-from typing import List, Optional, Dict
-from ngslite import GenericFeature, Chromosome
+from matplotlib.axes import Axes
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from typing import List, Dict
 from dna_features_viewer import GraphicFeature, GraphicRecord
-from .constant import COLOR_KEY
+from .tools import IMAGE_FORMATS
 from .template import Processor
+from .feature_table import FeatureTable
 
 
 class ViewLoci(Processor):
 
-    loci: List[Chromosome]
+    feature_table: FeatureTable
     output: str
-    label_attributes: List[str]
     loci_per_plot: int
     dpi: int
+    formats: List[str]
 
     graphic_records: List[GraphicRecord]
 
     def main(
             self,
-            loci: List[Chromosome],
+            feature_table: FeatureTable,
             output: str,
-            label_attributes: List[str],
             loci_per_plot: int,
-            dpi: int):
+            dpi: int,
+            formats: List[str]):
 
-        self.loci = loci
+        self.feature_table = feature_table
         self.output = output
-        self.label_attributes = label_attributes
         self.loci_per_plot = loci_per_plot
         self.dpi = dpi
+        self.formats = formats
+
+        for fmt in self.formats:
+            assert fmt in MakeOnePlot.FORMATS, f'image format must be among {MakeOnePlot.FORMATS}, not "{fmt}"'
 
         self.set_graphic_records()
         self.plot_graphic_records()
 
     def set_graphic_records(self):
-        self.graphic_records = []
-        for locus in self.loci:
-            record = ChromosomeToGraphicRecord(self.settings).main(
-                chromosome=locus,
-                label_attributes=self.label_attributes)
-            self.graphic_records.append(record)
+        self.graphic_records = FeatureTableToGraphicRecords(self.settings).main(
+            feature_table=self.feature_table)
 
     def plot_graphic_records(self):
         PlotGraphicRecords(self.settings).main(
             graphic_records=self.graphic_records,
             loci_per_plot=self.loci_per_plot,
             dpi=self.dpi,
+            formats=self.formats,
             output=self.output)
 
 
 #
 
 
-class ChromosomeToGraphicRecord(Processor):
-
-    FEATURE_TYPES = ['CDS']
-
-    chromosome: Chromosome
-    label_attributes: List[str]
-
-    graphic_features: List[GraphicFeature]
+class FeatureTableToGraphicRecords(Processor):
+    """
+    One graphic record per locus, the graphic features built from the columns of the feature table
+    """
 
-    def main(
-            self,
-            chromosome: Chromosome,
-            label_attributes: List[str]) -> GraphicRecord:
-
-        self.chromosome = chromosome
-        self.label_attributes = label_attributes
-
-        self.set_graphic_features()
-
-        r = GraphicRecord(
-            sequence_length=len(self.chromosome.sequence),
-            sequence=None,
-            features=self.graphic_features,
-            feature_level_height=1,
-            first_index=0,
-            plots_indexing='biopython',
-            labels_spacing=8,
-            ticks_resolution='auto')
-        r.seqname = self.chromosome.seqname  # attach seqname to the graphic record
-        return r
-
-    def set_graphic_features(self):
-        self.graphic_features = []
-        for feature in self.chromosome.features:
-            if feature.type not in self.FEATURE_TYPES:
-                continue
-            graphic_feature = GenericToGraphicFeature(self.settings).main(
-                generic_feature=feature,
-                label_attributes=self.label_attributes)
-            self.graphic_features.append(graphic_feature)
-
-
-class GenericToGraphicFeature(Processor):
-
-    STRAND_DICT = {
-        '+': 1,
-        '-': -1
-    }
     DEFAULT_COLOR = '#FFFFFF'
     THICKNESS = 8.0
     LINEWIDTH = 0.5
@@ -108,71 +67,70 @@ class GenericToGraphicFeature(Processor):
     OPEN_RIGHT = False
     FONTDICT = {'fontsize': 6}
 
-    generic_feature: GenericFeature
-    label_attributes: List[str]
+    feature_table: FeatureTable
 
-    strand: int
-    label: Optional[str]
-    color: Optional[str]
+    colors: List[str]
+    graphic_records: List[GraphicRecord]
 
-    graphic_feature: GraphicFeature
+    def main(self, feature_table: FeatureTable) -> List[GraphicRecord]:
 
-    def main(
-            self,
-            generic_feature: GenericFeature,
-            label_attributes: List[str]) -> GraphicFeature:
-
-        self.generic_feature = generic_feature
-        self.label_attributes = label_attributes
-
-        self.set_strand()
-        self.set_label()
-        self.set_color()
-        self.set_graphic_feature()
-
-        return self.graphic_feature
-
-    def set_strand(self):
-        f = self.generic_feature
-        self.strand = self.STRAND_DICT.get(f.strand, 0)
-
-    def set_label(self):
-        self.label = None
-        for attr in self.label_attributes:
-            value = self.generic_feature.get_attribute(key=attr)
-            if value is not None:
-                self.label = value
-                break
-
-    def set_color(self):
-        color = self.generic_feature.get_attribute(key=COLOR_KEY)
-
-        if type(color) is list:
-            self.logger.info(f'WARNING: multiple colors {color} found for {self.generic_feature}')
-            self.color = color[0]
-        elif color is None:
-            self.color = self.DEFAULT_COLOR
-        else:
-            self.color = color
-
-    def set_graphic_feature(self):
-        self.graphic_feature = GraphicFeature(
-            start=self.generic_feature.start,
-            end=self.generic_feature.end,
-            strand=self.strand,
-            label=self.label,
-            color=self.color,
-            thickness=self.THICKNESS,
-            linewidth=self.LINEWIDTH,
-            linecolor=self.LINECOLOR,
-            fontdict=self.FONTDICT,
-            html=None,
-            open_left=self.OPEN_LEFT,
-            open_right=self.OPEN_RIGHT,
-            box_linewidth=1,
-            box_color='auto',
-            legend_text=None,
-            label_link_color='black')
+        self.feature_table = feature_table
+
+        self.set_colors()
+        self.set_graphic_records()
+
+        return self.graphic_records
+
+    def set_colors(self):
+        t = self.feature_table
+        self.colors = []
+        for feature, input_color, color in zip(t.feature.tolist(), t.input_color.tolist(), t.color.tolist()):
+            colors = [] if input_color is None else input_color if type(input_color) is list else [input_color]
+            if color is not None:
+                colors.append(color)  # after any color in the input genbank
+
+            if len(colors) > 1:
+                self.logger.info(f'WARNING: multiple colors {colors} found for {feature}')
+            self.colors.append(colors[0] if len(colors) > 0 else self.DEFAULT_COLOR)
+
+    def set_graphic_records(self):
+        t = self.feature_table
+        starts, ends, strands, labels = t.start.tolist(), t.end.tolist(), t.strand.tolist(), t.label.tolist()
+        offsets = t.offsets.tolist()
+
+        self.graphic_records = []
+        for i, locus in enumerate(t.loci):
+            features = [
+                GraphicFeature(
+                    start=starts[j],
+                    end=ends[j],
+                    strand=strands[j],
+                    label=labels[j],
+                    color=self.colors[j],
+                    thickness=self.THICKNESS,
+                    linewidth=self.LINEWIDTH,
+                    linecolor=self.LINECOLOR,
+                    fontdict=self.FONTDICT,
+                    html=None,
+                    open_left=self.OPEN_LEFT,
+                    open_right=self.OPEN_RIGHT,
+                    box_linewidth=1,
+                    box_color='auto',
+                    legend_text=None,
+                    label_link_color='black')
+                for j in range(offsets[i], offsets[i + 1])
+            ]
+            r = GraphicRecord(
+                sequence_length=len(locus.sequence),
+                sequence=None,
+                features=features,
+                feature_level_height=1,
+                first_index=0,
+                plots_indexing='biopython',
+                labels_spacing=8,
+                ticks_resolution='auto')
+            r.seqname = locus.seqname  # attach seqname to the graphic record
+            self.graphic_records.append(r)
 
 
 #
@@ -183,6 +141,7 @@ class PlotGraphicRecords(Processor):
     graphic_records: List[GraphicRecord]
     loci_per_plot: int
     dpi: int
+    formats: List[str]
     output: str
 
     output_to_graphic_records: Dict[str, List[GraphicRecord]]
@@ -192,11 +151,13 @@ class PlotGraphicRecords(Processor):
             graphic_records: List[GraphicRecord],
             loci_per_plot: int,
             dpi: int,
+            formats: List[str],
             output: str):
 
         self.graphic_records = graphic_records
         self.loci_per_plot = loci_per_plot
         self.dpi = dpi
+        self.formats = formats
         self.output = output
 
         self.split_graphic_records()
@@ -209,11 +170,20 @@ class PlotGraphicRecords(Processor):
             output_prefix=self.output)
 
     def make_plots(self):
-        for output, graphic_records in self.output_to_graphic_records.items():
-            MakeOnePlot(self.settings).main(
-                graphic_records=graphic_records,
-                dpi=self.dpi,
-                output=output)
+        kwargs_list = [{
+            'graphic_records': graphic_records,
+            'dpi': self.dpi,
+            'formats': self.formats,
+            'output': output,
+        } for output, graphic_records in self.output_to_graphic_records.items()]
+
+        results = self.imap_processor(
+            processor_class=MakeOnePlot,
+            kwargs_list=kwargs_list,
+            processes=min(self.threads, len(kwargs_list)))
+
+        for _ in results:  # consume the iterator to render all plots
+            pass
 
 
 class SplitGraphicRecords(Processor):
@@ -265,23 +235,27 @@ class MakeOnePlot(Processor):
     WIDTH_CM_PER_KB = 2 / 2.54
     WIDTH_CM_PER_CHAR = 0.2 / 2.54
     SCALE_BAR_KB = 5000
+    FORMATS = IMAGE_FORMATS
 
     graphic_records: List[GraphicRecord]
     dpi: int
+    formats: List[str]
     output: str
 
     seqnames: List[str]
-    figure: plt.Figure
-    axs = List[plt.Axes]
+    figure: Figure
+    axs = List[Axes]
 
     def main(
             self,
             graphic_records: List[GraphicRecord],
             dpi: int,
+            formats: List[str],
             output: str):
 
         self.graphic_records = graphic_records
         self.dpi = dpi
+        self.formats = formats
         self.output = output
 
         self.set_seqnames()
@@ -294,7 +268,11 @@ class MakeOnePlot(Processor):
         self.seqnames = [r.seqname for r in self.graphic_records]
 
     def init_figure(self):
-        self.figure, self.axs = plt.subplots(
+        # not managed by pyplot, drawn by the Agg backend regardless of the interactive backend,
+        #   such that no global figure is left behind and it is safe in worker processes
+        self.figure = Figure()
+        FigureCanvasAgg(self.figure)
+        self.axs = self.figure.subplots(
             nrows=len(self.graphic_records),
             ncols=1
         )
@@ -365,7 +343,7 @@ class MakeOnePlot(Processor):
         return max(map(len, self.seqnames))
 
     def save_output(self):
-        for fmt in ['pdf', 'png']:
+        for fmt in self.formats:
             self.figure.savefig(f'{self.output}.{fmt}', dpi=self.dpi)
 
 
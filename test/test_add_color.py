@@ -1,6 +1,8 @@
 import random
 from ngslite import read_genbank, write_genbank
+from locus_hunter.constant import COLOR_KEY
 from locus_hunter.add_color import ColorDictGenerator, AddColor
+from locus_hunter.feature_table import FeatureTable
 from .setup import TestCase, remove_genbank_date_str
 
 
@@ -18,11 +20,16 @@ class TestAddColor(TestCase):
 
         sorted_loci = read_genbank(file=f'{self.indir}/sorted_loci.gbk')
 
-        colored_loci = AddColor(settings=self.settings).main(
-            loci=sorted_loci)
+        feature_table = AddColor(settings=self.settings).main(
+            feature_table=FeatureTable(loci=sorted_loci, label_attributes=[]))
+
+        # expected attributes: those of sorted_loci.gbk (cds_id and ortholog_id included), and the assigned color
+        for feature, color in zip(feature_table.feature.tolist(), feature_table.color.tolist()):
+            if color is not None:
+                feature.add_attribute(key=COLOR_KEY, val=color)
 
         write_genbank(
-            data=colored_loci,
+            data=feature_table.loci,
             file=f'{self.outdir}/colored_loci.gbk',
             use_locus_text=False)
 
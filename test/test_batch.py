@@ -0,0 +1,128 @@
+import json
+import random
+from locus_hunter.batch import LocusHunterBatch, read_manifest, parse_value
+from locus_hunter.locus_hunter import LocusHunter
+from .setup import TestCase, remove_genbank_date_str
+
+
+def get_defaults(indir: str, outdir: str) -> dict:
+    return dict(
+        query_faa=None,
+        gbk_dir=f'{indir}/gbk_dir',
+        evalue=1e-20,
+        extension=5000,
+        min_hits_per_locus=1,
+        ortholog_identity=0.9,
+        dereplicate_loci=False,
+        include_locus_names=[],
+        label_attributes=['gene', 'locus_tag'],
+        loci_per_plot=3,
+        dpi=100,
+        output=f'{outdir}/batch',
+        pooled_search=False,
+        blast_db_cache=None,
+        parallel_extraction=False,
+        alignment_engine='numpy',
+        sort_method='linkage',
+        optimal_leaf_ordering=False,
+        newick=False,
+        clustering_engine='native',
+        ortholog_catalogue=None,
+        seed_orthologs_from_hits=False,
+        formats=[],
+        no_plot=True,
+        profile=False,
+        resume=False)
+
+
+class TestLocusHunterBatch(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.defaults = get_defaults(indir=self.indir, outdir=self.outdir)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def write_manifest(self, lines: list) -> str:
+        ret = f'{self.outdir}/manifest.tsv'
+        with open(ret, 'w') as fh:
+            fh.write(''.join('\t'.join(line) + '\n' for line in lines))
+        return ret
+
+    def test_main(self):
+        manifest = self.write_manifest(lines=[
+            ['query_faa', 'output', 'extension', 'sort_method'],
+            [f'{self.indir}/query.faa', f'{self.outdir}/job1', '', ''],
+            [f'{self.indir}/query.faa', f'{self.outdir}/job2', '1000', 'sketch'],
+            [f'{self.indir}/wrong_query.faa', f'{self.outdir}/job3', '', ''],
+        ])
+
+        random.seed(1)
+        LocusHunterBatch(settings=self.settings).main(manifest=manifest, defaults=self.defaults)
+
+        # the first job is the same as a run of its own, colors of later jobs are from a different random state
+        random.seed(1)
+        LocusHunter(settings=self.settings).main(**{
+            **self.defaults, 'query_faa': f'{self.indir}/query.faa', 'output': f'{self.outdir}/single'})
+
+        for gbk in ['job1.gbk', 'single.gbk']:
+            remove_genbank_date_str(f'{self.outdir}/{gbk}')
+        self.assertFileEqual(f'{self.outdir}/single.gbk', f'{self.outdir}/job1.gbk')
+
+    def test_profile(self):
+        manifest = self.write_manifest(lines=[
+            ['query_faa', 'output'],
+            [f'{self.indir}/query.faa', self.defaults['output']],  # the same prefix as the shared profile
+        ])
+
+        LocusHunterBatch(settings=self.settings).main(manifest=manifest, defaults={**self.defaults, 'profile': True})
+
+        for prefix, stage in [(f'{self.outdir}/batch.shared', 'extract_loci'), (f'{self.outdir}/batch', 'sort_loci')]:
+            with open(f'{prefix}.profile.json') as fh:
+                names = [r['name'] for r in json.load(fh)['records']]
+            self.assertIn(stage, names)
+
+    def test_read_manifest(self):
+        manifest = self.write_manifest(lines=[
+            ['query_faa', 'output', 'evalue', 'dereplicate_loci', 'formats', 'ortholog_catalogue'],
+            ['a.faa', 'a', '', '', '', ''],
+            ['b.faa', 'b', '1e-5', 'true', 'pdf,svg', 'catalogue'],
+            ['c.faa', 'c', '', 'False', 'none', 'None'],
+        ])
+
+        jobs = read_manifest(
+            manifest=manifest,
+            defaults=self.defaults,
+            required_columns=LocusHunterBatch.REQUIRED_COLUMNS,
+            shared_parameters=LocusHunterBatch.SHARED_PARAMETERS)
+
+        self.assertListEqual(['a.faa', 'b.faa', 'c.faa'], [j['query_faa'] for j in jobs])
+        self.assertListEqual([1e-20, 1e-5, 1e-20], [j['evalue'] for j in jobs])
+        self.assertListEqual([False, True, False], [j['dereplicate_loci'] for j in jobs])
+        self.assertListEqual([[], ['pdf', 'svg'], []], [j['formats'] for j in jobs])
+        self.assertListEqual([None, 'catalogue', None], [j['ortholog_catalogue'] for j in jobs])
+        self.assertEqual(self.defaults['gbk_dir'], jobs[1]['gbk_dir'])
+
+    def test_read_manifest_invalid(self):
+        for lines in [
+            [['query_faa'], ['a.faa']],  # no output column
+            [['query_faa', 'output', 'color'], ['a.faa', 'a', 'red']],  # unknown parameter
+            [['query_faa', 'output', 'gbk_dir'], ['a.faa', 'a', 'gbk_dir']],  # shared by all jobs
+            [['query_faa', 'output'], ['a.faa', 'a'], ['b.faa', 'a']],  # duplicated output
+        ]:
+            with self.assertRaises(AssertionError):
+                read_manifest(
+                    manifest=self.write_manifest(lines=lines),
+                    defaults=self.defaults,
+                    required_columns=LocusHunterBatch.REQUIRED_COLUMNS,
+                    shared_parameters=LocusHunterBatch.SHARED_PARAMETERS)
+
+    def test_parse_value(self):
+        self.assertEqual(3, parse_value(key='dpi', value='3', default=300))
+        self.assertEqual(['gene'], parse_value(key='label_attributes', value='gene', default=['gene', 'locus_tag']))
+        with self.assertRaises(AssertionError):
+            parse_value(key='newick', value='yes', default=False)
+        self.assertEqual([], parse_value(key='formats', value='none', default=['pdf', 'png']))
+        with self.assertRaises(AssertionError):
+            parse_value(key='formats', value='pdf,pgn', default=['pdf', 'png'])
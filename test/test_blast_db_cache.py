@@ -0,0 +1,76 @@
+import os
+from ngslite import write_genbank, Chromosome, FeatureArray, GenericFeature
+from locus_hunter.blast_db_cache import BlastDbCache
+from .setup import TestCase
+
+
+def write_one_cds_genbank(file: str, translation: str):
+    feature = GenericFeature(
+        seqname='contig', type_='CDS', start=1, end=3 * len(translation) + 3, strand='+',
+        attributes=[('translation', translation)])
+    chromosome = Chromosome(
+        seqname='contig',
+        sequence='A' * 1000,
+        features=FeatureArray(seqname='contig', chromosome_size=1000, features=[feature]))
+    write_genbank(data=[chromosome], file=file)
+
+
+class TestBlastDbCache(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.gbk_dir = f'{self.outdir}/gbk_dir'
+        self.cache_dir = f'{self.outdir}/cache'
+        os.makedirs(self.gbk_dir)
+        write_one_cds_genbank(file=f'{self.gbk_dir}/a.gbk', translation='MKKLLPTAAAGLLLLAAQPAMA')
+        write_one_cds_genbank(file=f'{self.gbk_dir}/b.gbk', translation='MSTNPKPQRKTKRNTNRRPQDVKFPGG')
+
+    def tearDown(self):
+        self.tear_down()
+
+    def run_cache(self):
+        gbks = sorted(f'{self.gbk_dir}/{f}' for f in os.listdir(self.gbk_dir))
+        return BlastDbCache(self.settings).main(gbks=gbks, cache_dir=self.cache_dir, processes=2)
+
+    def test_main(self):
+        gbk_to_cached = self.run_cache()
+
+        cached = gbk_to_cached[f'{self.gbk_dir}/a.gbk']
+        self.assertDictEqual({'a.gbk___contig': 22}, cached.seqname_to_residues)
+        self.assertEqual(1, cached.sequences)
+        self.assertTrue(os.path.exists(f'{os.path.dirname(cached.db)}/library.faa'))
+
+    def test_reuse_and_evict(self):
+        first = self.run_cache()
+
+        os.remove(f'{self.gbk_dir}/b.gbk')
+        second = self.run_cache()
+
+        a = f'{self.gbk_dir}/a.gbk'
+        self.assertEqual(first[a].db, second[a].db)
+
+        evicted = os.path.dirname(first[f'{self.gbk_dir}/b.gbk'].db)
+        self.assertFalse(os.path.exists(evicted))
+
+    def test_foreign_folders_not_evicted(self):
+        foreign = [f'{self.cache_dir}/results', f'{self.cache_dir}/{"0" * 40}']  # the latter is not an entry
+        for folder in foreign:
+            os.makedirs(folder)
+            with open(f'{folder}/file.txt', 'w') as fh:
+                fh.write('not cached by locus hunter')
+
+        self.run_cache()
+
+        for folder in foreign:
+            self.assertTrue(os.path.exists(f'{folder}/file.txt'))
+
+    def test_content_changed(self):
+        first = self.run_cache()
+
+        write_one_cds_genbank(file=f'{self.gbk_dir}/a.gbk', translation='MKKLLPTAAAGLLLL')
+        os.utime(f'{self.gbk_dir}/a.gbk', ns=(0, 0))
+        second = self.run_cache()
+
+        a = f'{self.gbk_dir}/a.gbk'
+        self.assertNotEqual(first[a].db, second[a].db)
+        self.assertDictEqual({'a.gbk___contig': 15}, second[a].seqname_to_residues)
@@ -1,5 +1,5 @@
 import shutil
-from locus_hunter.cd_hit import CdHit
+from locus_hunter.cd_hit import CdHit, CdHit2D
 from .setup import TestCase
 
 
@@ -25,3 +25,35 @@ class TestCdHit(TestCase):
         }
 
         self.assertDictEqual(expected, actual)
+
+
+class TestCdHit2D(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_read_clstr(self):
+        clstr = f'{self.outdir}/cd_hit_2d.clstr'
+        with open(clstr, 'w') as fh:
+            fh.write('''>Cluster 0
+0	300aa, >1... *
+1	290aa, >cds_a... at 95.17%
+2	300aa, >cds_b... at 100.00%
+>Cluster 1
+0	200aa, >2... *
+>Cluster 2
+0	250aa, >3... *
+1	240aa, >cds_c... at 92.50%
+''')
+
+        actual = CdHit2D(self.settings).read_clstr(file=clstr)
+
+        expected = {
+            'cds_a': '1',
+            'cds_b': '1',
+            'cds_c': '3',
+        }
+        self.assertDictEqual(expected, actual)
@@ -0,0 +1,102 @@
+import os
+from locus_hunter.tools import get_fingerprint
+from locus_hunter.checkpoint import Checkpoint
+from locus_hunter.feature_table import FeatureTable, to_object_array
+from .test_sort_loci import get_locus
+from .setup import TestCase
+
+
+STAGE_TO_PARAMETERS = {
+    'extract_loci': {'evalue': 1e-20},
+    'sort_loci': {'sort_method': 'linkage'},
+    'add_color': {},
+}
+
+
+class TestCheckpoint(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.directory = f'{self.outdir}/output.checkpoint'
+
+    def tearDown(self):
+        self.tear_down()
+
+    def get_checkpoint(self, resume: bool, stage_to_parameters: dict = None) -> Checkpoint:
+        return Checkpoint(
+            directory=self.directory,
+            stage_to_parameters=stage_to_parameters or STAGE_TO_PARAMETERS,
+            resume=resume)
+
+    def run_stages(self, checkpoint: Checkpoint):
+        loci = [get_locus(seqname=f'locus_{i}', ortholog_ids=list(range(1, i + 2))) for i in range(4)]
+        checkpoint.save_loci(loci=loci)
+
+        t = FeatureTable(loci=loci, label_attributes=[]).take_loci([2, 0, 3])
+        t.ortholog_id = t.ortholog_id * 10
+        checkpoint.save_sort_loci(extracted_loci=loci, feature_table=t)
+
+        t.color = to_object_array([f'#{o:06d}' for o in t.ortholog_id.tolist()])
+        checkpoint.save_add_color(feature_table=t)
+        return t
+
+    def test_resume(self):
+        expected = self.run_stages(checkpoint=self.get_checkpoint(resume=False))
+
+        checkpoint = self.get_checkpoint(resume=True)
+        for stage in Checkpoint.STAGES:
+            self.assertTrue(checkpoint.is_finished(stage))
+
+        loci = checkpoint.load_loci()
+        t = FeatureTable(loci=loci, label_attributes=[])
+        t = checkpoint.load_sort_loci(feature_table=t)
+        t = checkpoint.load_add_color(feature_table=t)
+
+        self.assertListEqual(['locus_2', 'locus_0', 'locus_3'], [l.seqname for l in t.loci])
+        self.assertListEqual(expected.ortholog_id.tolist(), t.ortholog_id.tolist())
+        self.assertListEqual(expected.color.tolist(), t.color.tolist())
+
+    def test_not_resume(self):
+        self.run_stages(checkpoint=self.get_checkpoint(resume=False))
+        checkpoint = self.get_checkpoint(resume=False)
+        self.assertFalse(checkpoint.is_finished(Checkpoint.EXTRACT_LOCI))
+
+    def test_disabled(self):
+        checkpoint = Checkpoint(
+            directory=self.directory, stage_to_parameters=STAGE_TO_PARAMETERS, resume=True, enabled=False)
+        self.run_stages(checkpoint=checkpoint)
+        checkpoint.remove()
+
+        self.assertFalse(os.path.exists(self.directory))
+        for stage in Checkpoint.STAGES:
+            self.assertFalse(checkpoint.is_finished(stage))
+
+    def test_changed_parameters(self):
+        self.run_stages(checkpoint=self.get_checkpoint(resume=False))
+
+        checkpoint = self.get_checkpoint(
+            resume=True,
+            stage_to_parameters={**STAGE_TO_PARAMETERS, 'sort_loci': {'sort_method': 'sketch'}})
+
+        self.assertTrue(checkpoint.is_finished(Checkpoint.EXTRACT_LOCI))
+        self.assertFalse(checkpoint.is_finished(Checkpoint.SORT_LOCI))
+        self.assertFalse(checkpoint.is_finished(Checkpoint.ADD_COLOR))  # after a stage to be rerun
+
+    def test_changed_input_file(self):
+        query = f'{self.outdir}/query.faa'
+        with open(query, 'w') as fh:
+            fh.write('>query_1\nMKV\n')
+
+        def stage_to_parameters() -> dict:
+            return {**STAGE_TO_PARAMETERS, 'extract_loci': {'evalue': 1e-20, 'fingerprint': get_fingerprint([query])}}
+
+        self.run_stages(checkpoint=self.get_checkpoint(resume=False, stage_to_parameters=stage_to_parameters()))
+        self.assertTrue(self.get_checkpoint(resume=True, stage_to_parameters=stage_to_parameters()).is_finished(
+            Checkpoint.EXTRACT_LOCI))
+
+        with open(query, 'w') as fh:  # same path, modified in place
+            fh.write('>query_1\nMKVLL\n')
+        os.utime(query, ns=(0, 0))
+
+        checkpoint = self.get_checkpoint(resume=True, stage_to_parameters=stage_to_parameters())
+        self.assertFalse(checkpoint.is_finished(Checkpoint.EXTRACT_LOCI))
@@ -1,5 +1,11 @@
-from ngslite import write_genbank
-from locus_hunter.extract_loci import ExtractLoci
+import os
+import random
+import pandas as pd
+from copy import deepcopy
+from ngslite import write_genbank, write_fasta, Chromosome, FeatureArray, GenericFeature
+from locus_hunter.constant import QUERY_HIT_KEY
+from locus_hunter.read_genbank import JOINER
+from locus_hunter.extract_loci import ExtractLoci, GetLociFromChromosome, get_best_query_hits, cap_target_seqs
 from .setup import TestCase, remove_genbank_date_str
 
 
@@ -17,7 +23,10 @@ class TestExtractLoci(TestCase):
             gbk_dir=f'{self.indir}/gbk_dir',
             extension=5000,
             evalue=1e-3,
-            min_hits_per_locus=1)
+            min_hits_per_locus=1,
+            pooled_search=False,
+            blast_db_cache=None,
+            parallel_extraction=False)
 
         write_genbank(
             data=loci,
@@ -31,11 +40,352 @@ class TestExtractLoci(TestCase):
             second=f'{self.outdir}/loci.gbk')
 
     def test_no_hit(self):
+        extract_loci = ExtractLoci(settings=self.settings)
+        loci = extract_loci.main(
+            query_faa=f'{self.indir}/wrong_query.faa',
+            gbk_dir=f'{self.indir}/gbk_dir',
+            extension=5000,
+            evalue=1e-20,
+            min_hits_per_locus=1,
+            pooled_search=False,
+            blast_db_cache=None,
+            parallel_extraction=False)
+
+        self.assertEqual([], loci)
+        self.assertListEqual(extract_loci.gbks, extract_loci.skipped_gbks)
+
+    def test_pooled_search(self):
+        loci = ExtractLoci(settings=self.settings).main(
+            query_faa=f'{self.indir}/query.faa',
+            gbk_dir=f'{self.indir}/gbk_dir',
+            extension=5000,
+            evalue=1e-3,
+            min_hits_per_locus=1,
+            pooled_search=True,
+            blast_db_cache=None,
+            parallel_extraction=False)
+
+        write_genbank(
+            data=loci,
+            file=f'{self.outdir}/loci.gbk',
+            use_locus_text=False)
+
+        remove_genbank_date_str(f'{self.outdir}/loci.gbk')
+
+        self.assertFileEqual(
+            first=f'{self.indir}/loci.gbk',
+            second=f'{self.outdir}/loci.gbk')
+
+    def test_pooled_search_no_hit(self):
         loci = ExtractLoci(settings=self.settings).main(
             query_faa=f'{self.indir}/wrong_query.faa',
             gbk_dir=f'{self.indir}/gbk_dir',
             extension=5000,
             evalue=1e-20,
-            min_hits_per_locus=1)
+            min_hits_per_locus=1,
+            pooled_search=True,
+            blast_db_cache=None,
+            parallel_extraction=False)
 
         self.assertEqual([], loci)
+
+    def test_blast_db_cache(self):
+        for _ in range(2):  # the second run reuses the cache
+            loci = ExtractLoci(settings=self.settings).main(
+                query_faa=f'{self.indir}/query.faa',
+                gbk_dir=f'{self.indir}/gbk_dir',
+                extension=5000,
+                evalue=1e-3,
+                min_hits_per_locus=1,
+                pooled_search=True,
+                blast_db_cache=f'{self.outdir}/cache',
+                parallel_extraction=False)
+
+            write_genbank(
+                data=loci,
+                file=f'{self.outdir}/loci.gbk',
+                use_locus_text=False)
+
+            remove_genbank_date_str(f'{self.outdir}/loci.gbk')
+
+            self.assertFileEqual(
+                first=f'{self.indir}/loci.gbk',
+                second=f'{self.outdir}/loci.gbk')
+
+    def test_parallel_extraction(self):
+        for pooled_search in [False, True]:
+            loci = ExtractLoci(settings=self.settings).main(
+                query_faa=f'{self.indir}/query.faa',
+                gbk_dir=f'{self.indir}/gbk_dir',
+                extension=5000,
+                evalue=1e-3,
+                min_hits_per_locus=1,
+                pooled_search=pooled_search,
+                blast_db_cache=None,
+                parallel_extraction=True)
+
+            write_genbank(
+                data=loci,
+                file=f'{self.outdir}/loci.gbk',
+                use_locus_text=False)
+
+            remove_genbank_date_str(f'{self.outdir}/loci.gbk')
+
+            self.assertFileEqual(
+                first=f'{self.indir}/loci.gbk',
+                second=f'{self.outdir}/loci.gbk')
+
+    def test_iterate(self):
+        loci = ExtractLoci(settings=self.settings).iterate(
+            query_faa=f'{self.indir}/query.faa',
+            gbk_dir=f'{self.indir}/gbk_dir',
+            extension=5000,
+            evalue=1e-3,
+            min_hits_per_locus=1,
+            pooled_search=False,
+            blast_db_cache=None,
+            parallel_extraction=False)
+
+        write_genbank(
+            data=list(loci),
+            file=f'{self.outdir}/loci.gbk',
+            use_locus_text=False)
+
+        remove_genbank_date_str(f'{self.outdir}/loci.gbk')
+
+        self.assertFileEqual(
+            first=f'{self.indir}/loci.gbk',
+            second=f'{self.outdir}/loci.gbk')
+
+
+def get_random_chromosome(size: int, n_features: int, circular: bool) -> Chromosome:
+    features = []
+    for i in range(n_features):
+        start = random.randint(1, size - 100)
+        end = start + random.randint(10, 99)
+        features.append(GenericFeature(
+            seqname='chr', type_=random.choice(['CDS', 'tRNA']), start=start, end=end,
+            strand=random.choice(['+', '-']), attributes=[('locus_tag', f'tag_{i}')]))
+    for i, feature in enumerate(features):
+        if feature.type == 'CDS':
+            feature.add_attribute(key='cds_id', val=f'cds_{i}')
+    sequence = ''.join(random.choice('ACGT') for _ in range(size))
+    return Chromosome(
+        seqname='genome.gbk___chr',
+        sequence=sequence,
+        features=FeatureArray(seqname='chr', chromosome_size=size, features=features, circular=circular),
+        circular=circular)
+
+
+class TestGetLociFromChromosome(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def get_loci_by_deepcopy(self, chromosome: Chromosome, intervals: list, hits: dict) -> list:
+        ret = []
+        for start, end in intervals:
+            locus = deepcopy(chromosome)
+            locus.genbank_locus_text = ''
+            locus.seqname = f'{locus.seqname}___{start:,d}-{end:,d}'
+            locus.crop(start, end)
+            locus.circular = False
+            for feature in locus.features:
+                query = hits.get(feature.get_attribute('cds_id'))
+                if feature.type == 'CDS' and query is not None:
+                    feature.add_attribute(key='query_hit', val=query)
+            ret.append(locus)
+        return ret
+
+    def test_crop_same_as_deepcopy(self):
+        random.seed(1)
+        for circular in [False, True]:
+            chromosome = get_random_chromosome(size=20000, n_features=300, circular=circular)
+            hits = {f.get_attribute('cds_id'): f'query_{i}' for i, f in enumerate(chromosome.features)
+                    if f.type == 'CDS' and random.random() < 0.03}
+
+            processor = GetLociFromChromosome(self.settings)
+            loci = processor.main(
+                query_faa='',
+                chromosome=chromosome,
+                evalue=1e-3,
+                extension=1000,
+                min_hits_per_locus=1,
+                hits=hits)
+
+            # loci crossing the origin are not cropped by Chromosome.crop()
+            pairs = [(i, l) for i, l in zip(processor.merged_intervals, loci) if i.end <= 20000]
+            intervals = [(i.start, i.end) for i, _ in pairs]
+            expected = self.get_loci_by_deepcopy(chromosome=chromosome, intervals=intervals, hits=hits)
+
+            self.assertListEqual([repr(l) for l in expected], [repr(l) for _, l in pairs])
+
+    def test_original_chromosome_unchanged(self):
+        random.seed(2)
+        chromosome = get_random_chromosome(size=20000, n_features=300, circular=False)
+        before = repr(chromosome)
+
+        loci = GetLociFromChromosome(self.settings).main(
+            query_faa='',
+            chromosome=chromosome,
+            evalue=1e-3,
+            extension=1000,
+            min_hits_per_locus=1,
+            hits={f.get_attribute('cds_id'): 'query' for f in chromosome.features if f.type == 'CDS'})
+        for locus in loci:
+            for feature in locus.features:
+                feature.add_attribute(key='ortholog_id', val=1)
+
+        self.assertEqual(before, repr(chromosome))
+
+    def test_locus_across_origin(self):
+        sequence = 'A' * 50 + 'C' * 900 + 'G' * 50
+        features = [
+            GenericFeature(seqname='chr', type_='CDS', start=11, end=40, strand='+',
+                           attributes=[('cds_id', 'cds_1')]),
+            GenericFeature(seqname='chr', type_='CDS', start=501, end=530, strand='+',
+                           attributes=[('cds_id', 'cds_2')]),
+            GenericFeature(seqname='chr', type_='CDS', start=971, end=20, strand='-',
+                           attributes=[('cds_id', 'cds_3')], regions=[(971, 1000, '-'), (1, 20, '-')]),
+            GenericFeature(seqname='chr', type_='CDS', start=961, end=990, strand='+',
+                           attributes=[('cds_id', 'cds_4')]),
+        ]
+        chromosome = Chromosome(
+            seqname='genome.gbk___chr',
+            sequence=sequence,
+            features=FeatureArray(seqname='chr', chromosome_size=1000, features=features, circular=True),
+            circular=True)
+
+        loci = GetLociFromChromosome(self.settings).main(
+            query_faa='',
+            chromosome=chromosome,
+            evalue=1e-3,
+            extension=30,
+            min_hits_per_locus=2,
+            hits={'cds_1': 'query_1', 'cds_2': 'query_1', 'cds_4': 'query_2'})
+
+        self.assertEqual(1, len(loci))
+        locus = loci[0]
+        self.assertEqual('genome.gbk___chr___931-70', locus.seqname)
+        self.assertEqual('C' * 20 + 'G' * 50 + 'A' * 50 + 'C' * 20, locus.sequence)
+
+        actual = [(f.get_attribute('cds_id'), f.start, f.end) for f in locus.features]
+        expected = [('cds_4', 31, 60), ('cds_3', 41, 90), ('cds_1', 81, 110)]
+        self.assertListEqual(expected, actual)
+        self.assertListEqual([(41, 70, '-'), (71, 90, '-')], locus.features[1].regions)
+
+        actual = [f.get_attribute('query_hit') for f in locus.features]
+        self.assertListEqual(['query_2', None, 'query_1'], actual)
+
+
+class TestManyHits(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_more_hits_than_default_max_target_seqs(self):
+        random.seed(3)
+        protein = 'M' + ''.join(random.choice('ACDEFGHIKLMNPQRSTVWY') for _ in range(199))
+        contigs = 600  # > 500, the default max_target_seqs of blastp
+
+        query_faa = f'{self.outdir}/query.faa'
+        write_fasta(data=[('query', protein)], file=query_faa)
+
+        gbk_dir = f'{self.outdir}/gbk_dir'
+        os.makedirs(gbk_dir)
+        data = []
+        for i in range(contigs):
+            seqname = f'contig_{i + 1}'
+            feature = GenericFeature(
+                seqname=seqname, type_='CDS', start=101, end=100 + 3 * len(protein) + 3, strand='+',
+                attributes=[('translation', protein)])
+            data.append(Chromosome(
+                seqname=seqname,
+                sequence='A' * 1000,
+                features=FeatureArray(seqname=seqname, chromosome_size=1000, features=[feature])))
+        write_genbank(data=data, file=f'{gbk_dir}/genome.gbk')
+
+        for blast_db_cache in [None, f'{self.outdir}/cache']:
+            loci = ExtractLoci(settings=self.settings).main(
+                query_faa=query_faa,
+                gbk_dir=gbk_dir,
+                extension=10,
+                evalue=1e-3,
+                min_hits_per_locus=1,
+                pooled_search=True,
+                blast_db_cache=blast_db_cache,
+                parallel_extraction=False)
+            self.assertEqual(contigs, len(loci))
+
+    def test_more_hits_on_one_chromosome_than_default_max_target_seqs(self):
+        random.seed(3)
+        protein = 'M' + ''.join(random.choice('ACDEFGHIKLMNPQRSTVWY') for _ in range(199))
+        cds = 600  # > 500, the default max_target_seqs of blastp
+
+        query_faa = f'{self.outdir}/query.faa'
+        write_fasta(data=[('query', protein)], file=query_faa)
+
+        gbk_dir = f'{self.outdir}/gbk_dir'
+        os.makedirs(gbk_dir)
+        size = 1000 * cds
+        features = [
+            GenericFeature(
+                seqname='contig', type_='CDS', start=1000 * i + 1, end=1000 * i + 3 * len(protein) + 3, strand='+',
+                attributes=[('translation', protein)])
+            for i in range(cds)
+        ]
+        write_genbank(
+            data=[Chromosome(
+                seqname='contig',
+                sequence='A' * size,
+                features=FeatureArray(seqname='contig', chromosome_size=size, features=features))],
+            file=f'{gbk_dir}/genome.gbk')
+
+        hit_counts = []
+        for pooled_search in [False, True]:  # the same cap of subjects of each chromosome
+            loci = ExtractLoci(settings=self.settings).main(
+                query_faa=query_faa,
+                gbk_dir=gbk_dir,
+                extension=10,
+                evalue=1e-3,
+                min_hits_per_locus=1,
+                pooled_search=pooled_search,
+                blast_db_cache=None,
+                parallel_extraction=False)
+            hit_counts.append(sum(
+                1 for locus in loci for f in locus.features if f.get_attribute(QUERY_HIT_KEY) is not None))
+
+        self.assertListEqual([500, 500], hit_counts)
+
+
+class TestFunctions(TestCase):
+
+    def test_cap_target_seqs(self):
+        df = pd.DataFrame({
+            'query': ['q1', 'q1', 'q1', 'q1', 'q2'],
+            'subject': [f'c1{JOINER}1', f'c1{JOINER}2', f'c1{JOINER}3', f'c2{JOINER}1', f'c1{JOINER}3'],
+            'evalue': [1e-5, 1e-9, 1e-7, 1e-3, 1e-3],
+            'bitscore': [50., 90., 70., 30., 30.],
+        })
+        actual = cap_target_seqs(df=df, max_target_seqs=2)
+        expected = [f'c1{JOINER}2', f'c1{JOINER}3', f'c2{JOINER}1', f'c1{JOINER}3']
+        self.assertListEqual(expected, actual['subject'].tolist())
+
+        empty = cap_target_seqs(df=df.iloc[:0], max_target_seqs=2)  # no hit at all
+        self.assertListEqual(df.columns.tolist(), empty.columns.tolist())
+
+    def test_get_best_query_hits(self):
+        df = pd.DataFrame({
+            'query': ['q1', 'q2', 'q1', 'q2', 'q3'],
+            'subject': ['s1', 's1', 's2', 's2', 's3'],
+            'bitscore': [100., 200., 50., 50., 10.],
+        })
+        actual = get_best_query_hits(df=df)
+        expected = {'s1': 'q2', 's2': 'q1', 's3': 'q3'}
+        self.assertDictEqual(expected, actual)
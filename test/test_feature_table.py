@@ -0,0 +1,88 @@
+from ngslite import GenericFeature, Chromosome, FeatureArray
+from locus_hunter.constant import CDS_ID_KEY, ORTHOLOG_ID_KEY, QUERY_HIT_KEY, COLOR_KEY
+from locus_hunter.feature_table import FeatureTable, get_attribute_table
+from .test_sort_loci import get_locus
+from .setup import TestCase
+
+
+def get_annotated_locus(seqname: str) -> Chromosome:
+    features = [
+        GenericFeature(
+            seqname=seqname, type_='gene', start=1, end=99, strand='+',
+            attributes=[('gene', 'abc')]),
+        GenericFeature(
+            seqname=seqname, type_='CDS', start=1, end=99, strand='+',
+            attributes=[
+                ('gene', 'abc'), (CDS_ID_KEY, f'{seqname}_1'), (QUERY_HIT_KEY, 'query'), ('translation', 'MKV')]),
+        GenericFeature(
+            seqname=seqname, type_='CDS', start=101, end=199, strand='-',
+            attributes=[('locus_tag', 'tag'), (CDS_ID_KEY, f'{seqname}_2'), (COLOR_KEY, '#1F77B4')]),
+    ]
+    return Chromosome(
+        seqname=seqname,
+        sequence='A' * 200,
+        features=FeatureArray(seqname=seqname, chromosome_size=200, features=features))
+
+
+class TestFeatureTable(TestCase):
+
+    def test_columns(self):
+        locus = get_annotated_locus(seqname='locus')
+        t = FeatureTable(loci=[locus], label_attributes=['gene', 'locus_tag'])
+
+        self.assertListEqual([0, 2], t.offsets.tolist())
+        self.assertListEqual([1, 101], t.start.tolist())
+        self.assertListEqual([1, -1], t.strand.tolist())
+        self.assertListEqual(['locus_1', 'locus_2'], t.cds_id.tolist())
+        self.assertListEqual(['query', None], t.query_hit.tolist())
+        self.assertListEqual(['MKV', None], t.translation.tolist())
+        self.assertListEqual([None, '#1F77B4'], t.input_color.tolist())
+        self.assertListEqual(['abc', 'tag'], t.label.tolist())
+        self.assertListEqual([FeatureTable.NO_ORTHOLOG_ID] * 2, t.ortholog_id.tolist())
+
+    def test_input_loci_unchanged(self):
+        locus = get_annotated_locus(seqname='locus')
+        expected = [list(f.attributes) for f in locus.features]
+        FeatureTable(loci=[locus], label_attributes=[])
+        self.assertListEqual(expected, [f.attributes for f in locus.features])
+
+    def test_take_loci(self):
+        loci = [get_locus(seqname=f'locus_{i}', ortholog_ids=list(range(1, i + 1))) for i in range(4)]
+        t = FeatureTable(loci=loci, label_attributes=[])
+
+        taken = t.take_loci([3, 0, 2])
+
+        self.assertListEqual(['locus_3', 'locus_0', 'locus_2'], [l.seqname for l in taken.loci])
+        self.assertListEqual([0, 3, 3, 5], taken.offsets.tolist())
+        self.assertListEqual([1, 2, 3, 1, 2], taken.ortholog_id.tolist())
+        self.assertListEqual([[1, 2, 3], [], [1, 2]], [taken.get_ortholog_ids(i).tolist() for i in range(3)])
+        self.assertEqual(0, len(t.take_loci([])))
+
+    def test_materialize(self):
+        locus = get_annotated_locus(seqname='locus')
+        t = FeatureTable(loci=[locus], label_attributes=[])
+        t.color[:] = ['#FF7F0E', '#2CA02C']
+
+        loci = t.materialize()
+
+        self.assertEqual('#FF7F0E', loci[0].features[1].get_attribute(key=COLOR_KEY))
+        self.assertListEqual(['#1F77B4', '#2CA02C'], loci[0].features[2].get_attribute(key=COLOR_KEY))
+        self.assertIsNone(loci[0].features[0].get_attribute(key=COLOR_KEY))
+
+        for feature in loci[0].features:  # intermediate keys are stripped
+            for key in [CDS_ID_KEY, ORTHOLOG_ID_KEY, QUERY_HIT_KEY]:
+                self.assertIsNone(feature.get_attribute(key=key))
+        self.assertEqual('MKV', loci[0].features[1].get_attribute(key='translation'))
+
+
+class TestFunctions(TestCase):
+
+    def test_get_attribute_table(self):
+        feature = GenericFeature(
+            seqname='.', type_='CDS', start=1, end=99, strand='+',
+            attributes=[('gene', 'abc'), ('note', 'x'), ('note', 'y'), ('note', 'z')])
+
+        actual = get_attribute_table(feature=feature, keys={'gene', 'note', 'product'})
+        for key in ['gene', 'note', 'product']:
+            self.assertEqual(feature.get_attribute(key=key), actual.get(key))
+        self.assertNotIn('product', actual)
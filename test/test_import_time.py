@@ -0,0 +1,42 @@
+import os
+import sys
+import json
+import subprocess
+from typing import List
+from .setup import TestCase
+
+
+HEAVY_MODULES = ['numpy', 'pandas', 'scipy', 'matplotlib', 'dna_features_viewer']
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_imported_heavy_modules(code: str) -> List[str]:
+    """
+    Heavy modules in sys.modules after running the code in a fresh interpreter
+    """
+    check = f'import sys, json; print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    proc = subprocess.run(
+        [sys.executable, '-c', f'{code}\n{check}'],
+        cwd=REPO_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        universal_newlines=True,
+        check=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+class TestImportTime(TestCase):
+
+    def test_import_package(self):
+        self.assertListEqual([], get_imported_heavy_modules(code='import locus_hunter'))
+
+    def test_cli_help(self):
+        code = '\n'.join([
+            'import sys, runpy',
+            "sys.argv = ['locus_hunter', '--help']",
+            'try:',
+            "    runpy.run_path('.', run_name='__main__')",
+            'except SystemExit:',
+            '    pass',
+        ])
+        self.assertListEqual([], get_imported_heavy_modules(code=code))
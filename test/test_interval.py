@@ -0,0 +1,90 @@
+from locus_hunter.interval import Interval, merge_intervals, merge_circular_intervals
+from .setup import TestCase
+
+
+class TestMergeIntervals(TestCase):
+
+    def test_sorted(self):
+        actual = merge_intervals([
+            Interval(1, 10, ['a']),
+            Interval(5, 20, ['b']),
+            Interval(30, 40, ['c']),
+        ])
+        expected = [
+            Interval(1, 20, ['a', 'b']),
+            Interval(30, 40, ['c']),
+        ]
+        self.assertListEqual(expected, actual)
+
+    def test_unsorted(self):
+        actual = merge_intervals([
+            Interval(30, 40, ['c']),
+            Interval(5, 20, ['b']),
+            Interval(1, 10, ['a']),
+        ])
+        expected = [
+            Interval(1, 20, ['a', 'b']),
+            Interval(30, 40, ['c']),
+        ]
+        self.assertListEqual(expected, actual)
+
+    def test_nested(self):
+        actual = merge_intervals([
+            Interval(1, 100, ['a']),
+            Interval(10, 20, ['b']),
+            Interval(90, 120, ['c']),
+        ])
+        expected = [
+            Interval(1, 120, ['a', 'b', 'c']),
+        ]
+        self.assertListEqual(expected, actual)
+
+    def test_empty(self):
+        self.assertListEqual([], merge_intervals([]))
+
+
+class TestMergeCircularIntervals(TestCase):
+
+    def test_join_across_origin(self):
+        actual = merge_circular_intervals(
+            intervals=[
+                Interval(-10, 20, ['a']),
+                Interval(400, 500, ['b']),
+                Interval(980, 1005, ['c']),
+            ],
+            size=1000)
+        expected = [
+            Interval(400, 500, ['b']),
+            Interval(980, 1020, ['c', 'a']),
+        ]
+        self.assertListEqual(expected, actual)
+
+    def test_no_join(self):
+        actual = merge_circular_intervals(
+            intervals=[
+                Interval(10, 20, ['a']),
+                Interval(980, 990, ['b']),
+            ],
+            size=1000)
+        expected = [
+            Interval(10, 20, ['a']),
+            Interval(980, 990, ['b']),
+        ]
+        self.assertListEqual(expected, actual)
+
+    def test_start_before_origin(self):
+        actual = merge_circular_intervals(
+            intervals=[Interval(-9, 20, ['a'])],
+            size=1000)
+        expected = [Interval(991, 1020, ['a'])]
+        self.assertListEqual(expected, actual)
+
+    def test_whole_molecule(self):
+        actual = merge_circular_intervals(
+            intervals=[
+                Interval(-100, 600, ['a']),
+                Interval(500, 950, ['b']),
+            ],
+            size=1000)
+        expected = [Interval(1, 1000, ['b', 'a'])]
+        self.assertListEqual(expected, actual)
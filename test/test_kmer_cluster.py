@@ -0,0 +1,103 @@
+import random
+import numpy as np
+from ngslite import FastaWriter
+from locus_hunter.kmer_cluster import KmerCluster, count_identical, count_identical_without_gap, \
+    encode_sequence, get_words
+from .setup import TestCase
+
+
+AMINO_ACIDS = 'ACDEFGHIKLMNPQRSTVWY'
+
+
+def random_protein(length: int) -> str:
+    return ''.join(random.choice(AMINO_ACIDS) for _ in range(length))
+
+
+def substitute(seq: str, n: int) -> str:
+    seq = list(seq)
+    for i in random.sample(range(len(seq)), n):
+        seq[i] = random.choice([a for a in AMINO_ACIDS if a != seq[i]])
+    return ''.join(seq)
+
+
+class TestKmerCluster(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def write_faa(self, records: list) -> str:
+        faa = f'{self.outdir}/in.faa'
+        with FastaWriter(faa) as writer:
+            for head, seq in records:
+                writer.write(header=head, sequence=seq)
+        return faa
+
+    def test_main(self):
+        random.seed(1)
+        a = random_protein(300)
+        b = random_protein(200)
+        records = [
+            ('b_1', b),
+            ('a_1', a),
+            ('a_2', substitute(a, n=15)),  # 95% identical
+            ('a_3', a[20:]),  # shorter, 100% identical to the shorter length
+            ('b_2', substitute(b, n=40)),  # 80% identical
+            ('short', a[:10]),  # thrown away like cd-hit
+        ]
+
+        actual = KmerCluster(self.settings).main(
+            faa=self.write_faa(records),
+            sequence_identity=0.9)
+
+        expected = {
+            'a_1': 1,  # the longest sequence is the first representative
+            'a_2': 1,
+            'a_3': 1,
+            'b_1': 2,
+            'b_2': 3,
+        }
+        self.assertDictEqual(expected, actual)
+
+    def test_lower_identity(self):
+        random.seed(1)
+        b = random_protein(200)
+        actual = KmerCluster(self.settings).main(
+            faa=self.write_faa([('b_1', b), ('b_2', substitute(b, n=40))]),
+            sequence_identity=0.75)
+        self.assertDictEqual({'b_1': 1, 'b_2': 1}, actual)
+
+
+class TestFunctions(TestCase):
+
+    def test_count_identical(self):
+        long = encode_sequence('MKTAYIAKQRQISFVKSHFSRQ')
+        self.assertEqual(22, count_identical(short=long, long=long))
+        self.assertEqual(10, count_identical(short=encode_sequence('AYIAKQRQIS'), long=long))
+        # one deletion in the short sequence
+        self.assertEqual(9, count_identical(short=encode_sequence('AYIAKRQIS'), long=long))
+        # one substitution
+        self.assertEqual(9, count_identical(short=encode_sequence('AYIAKWRQIS'), long=long))
+
+    def test_without_gap_is_lower_bound(self):
+        random.seed(1)
+        for _ in range(50):
+            long = random_protein(random.randint(20, 60))
+            short = substitute(long[random.randint(0, 5):], n=random.randint(0, 5))
+            if random.random() < 0.5:  # one deletion
+                i = random.randrange(len(short))
+                short = short[:i] + short[i + 1:]
+            short, long = encode_sequence(short), encode_sequence(long)
+            self.assertLessEqual(
+                count_identical_without_gap(short=short, long=long, k=3),
+                count_identical(short=short, long=long))
+
+    def test_get_words(self):
+        seq = encode_sequence('ACDAC')
+        words = get_words(seq=seq, k=2)
+        self.assertEqual(4, len(words))
+        self.assertEqual(words[0], words[3])
+        self.assertEqual(0, len(get_words(seq=seq, k=6)))
+        self.assertTrue(np.all(words >= 0))
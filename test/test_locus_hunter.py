@@ -26,7 +26,21 @@ class TestLocusHunter(TestCase):
             label_attributes=['gene', 'locus_tag'],
             loci_per_plot=3,
             dpi=600,
-            output=f'{self.outdir}/output'
+            output=f'{self.outdir}/output',
+            pooled_search=False,
+            blast_db_cache=None,
+            parallel_extraction=False,
+            alignment_engine='numpy',
+            sort_method='linkage',
+            optimal_leaf_ordering=False,
+            newick=False,
+            clustering_engine='cd-hit',
+            ortholog_catalogue=None,
+            seed_orthologs_from_hits=False,
+            formats=['pdf', 'png'],
+            no_plot=False,
+            profile=False,
+            resume=False
         )
 
         remove_genbank_date_str(f'{self.outdir}/output.gbk')
@@ -49,5 +63,19 @@ class TestLocusHunter(TestCase):
             label_attributes=['gene', 'locus_tag'],
             loci_per_plot=3,
             dpi=600,
-            output=f'{self.outdir}/output'
+            output=f'{self.outdir}/output',
+            pooled_search=False,
+            blast_db_cache=None,
+            parallel_extraction=False,
+            alignment_engine='numpy',
+            sort_method='linkage',
+            optimal_leaf_ordering=False,
+            newick=False,
+            clustering_engine='cd-hit',
+            ortholog_catalogue=None,
+            seed_orthologs_from_hits=False,
+            formats=['pdf', 'png'],
+            no_plot=False,
+            profile=False,
+            resume=False
         )
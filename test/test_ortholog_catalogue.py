@@ -0,0 +1,55 @@
+import random
+from ngslite import FastaWriter, read_fasta
+from locus_hunter.ortholog_catalogue import OrthologCatalogue
+from .test_kmer_cluster import random_protein, substitute
+from .setup import TestCase
+
+
+class TestOrthologCatalogue(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.catalogue_dir = f'{self.outdir}/catalogue'
+
+    def tearDown(self):
+        self.tear_down()
+
+    def write_faa(self, name: str, records: list) -> str:
+        faa = f'{self.outdir}/{name}.faa'
+        with FastaWriter(faa) as writer:
+            for head, seq in records:
+                writer.write(header=head, sequence=seq)
+        return faa
+
+    def run_catalogue(self, faa: str, sequence_identity: float = 0.9) -> dict:
+        return OrthologCatalogue(self.settings).main(
+            faa=faa,
+            sequence_identity=sequence_identity,
+            catalogue_dir=self.catalogue_dir,
+            clustering_engine='native')
+
+    def test_main(self):
+        random.seed(1)
+        a, b, c = random_protein(300), random_protein(200), random_protein(250)
+
+        first = self.run_catalogue(faa=self.write_faa('first', [('b_1', b), ('a_1', a)]))
+        self.assertDictEqual({'a_1': 1, 'b_1': 2}, first)
+
+        second = self.run_catalogue(faa=self.write_faa('second', [
+            ('c_1', c),
+            ('b_2', substitute(b, n=10)),
+            ('c_2', substitute(c, n=5)),
+            ('a_2', a[:280]),
+        ]))
+        self.assertDictEqual({'a_2': 1, 'b_2': 2, 'c_1': 3, 'c_2': 3}, second)
+
+        representatives = read_fasta(f'{self.catalogue_dir}/representatives.faa')
+        self.assertListEqual(['1', '2', '3'], [head for head, _ in representatives])
+        self.assertEqual(c, representatives[2][1])
+
+    def test_different_identity(self):
+        random.seed(1)
+        faa = self.write_faa('first', [('a_1', random_protein(300))])
+        self.run_catalogue(faa=faa, sequence_identity=0.9)
+        with self.assertRaises(AssertionError):
+            self.run_catalogue(faa=faa, sequence_identity=0.8)
@@ -0,0 +1,87 @@
+import json
+import subprocess
+from threading import Thread
+from locus_hunter.template import Processor
+from locus_hunter.profiler import PROFILER, Profiler
+from .setup import TestCase
+
+
+class CallCommand(Processor):
+
+    def main(self, cmd: str) -> int:
+        self.call(cmd)
+        return len(cmd)
+
+
+class TestProfiler(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        PROFILER.reset(enabled=True)
+
+    def tearDown(self):
+        PROFILER.reset(enabled=False)
+        self.tear_down()
+
+    def test_processor_and_call(self):
+        with PROFILER.measure(kind=Profiler.STAGE, name='stage'):
+            CallCommand(self.settings).main(cmd='true')
+
+        stage, processor, call = sorted(PROFILER.records, key=lambda r: r['depth'])
+        self.assertEqual(('stage', 'stage', 0), (stage['kind'], stage['name'], stage['depth']))
+        self.assertEqual(('processor', 'CallCommand', 1), (processor['kind'], processor['name'], processor['depth']))
+        self.assertEqual(('call', 'true', 2, 0), (call['kind'], call['name'], call['depth'], call['exit_status']))
+        self.assertGreaterEqual(stage['wall_seconds'], call['wall_seconds'])
+        self.assertGreater(stage['peak_rss_mb'], 0)
+
+    def test_failed_call(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            CallCommand(self.settings).main(cmd='exit 3')
+        call = [r for r in PROFILER.records if r['kind'] == Profiler.CALL][0]
+        self.assertEqual(3, call['exit_status'])
+
+    def test_worker_records(self):
+        results = CallCommand(self.settings).imap_processor(
+            processor_class=CallCommand,
+            kwargs_list=[{'cmd': 'true'}, {'cmd': 'echo'}],
+            processes=2)
+        self.assertListEqual([4, 4], list(results))
+
+        calls = sorted(r['name'] for r in PROFILER.records if r['kind'] == Profiler.CALL)
+        self.assertListEqual(['echo', 'true'], calls)
+
+    def test_threads(self):
+        def run_job():
+            PROFILER.reset(enabled=True)
+            CallCommand(self.settings).main(cmd='echo')
+            thread_records.extend(PROFILER.records)
+            PROFILER.reset(enabled=False)
+
+        thread_records = []
+        CallCommand(self.settings).main(cmd='true')
+        thread = Thread(target=run_job)
+        thread.start()
+        thread.join()
+        CallCommand(self.settings).main(cmd='true')
+
+        # the thread neither resets nor adds to records of the main thread
+        self.assertListEqual(['true', 'true'], [r['name'] for r in PROFILER.records if r['kind'] == Profiler.CALL])
+        self.assertListEqual(['echo'], [r['name'] for r in thread_records if r['kind'] == Profiler.CALL])
+
+    def test_disabled(self):
+        PROFILER.reset(enabled=False)
+        CallCommand(self.settings).main(cmd='true')
+        self.assertListEqual([], PROFILER.records)
+
+    def test_write_report(self):
+        CallCommand(self.settings).main(cmd='true')
+        PROFILER.write_report(prefix=f'{self.outdir}/output')
+
+        with open(f'{self.outdir}/output.profile.json') as fh:
+            records = json.load(fh)['records']
+        self.assertEqual(0, records[0]['start'])
+
+        with open(f'{self.outdir}/output.profile.tsv') as fh:
+            lines = fh.read().splitlines()
+        self.assertEqual(Profiler.TSV_COLUMNS, lines[0].split('\t'))
+        self.assertEqual(3, len(lines))
@@ -0,0 +1,65 @@
+import types
+from ngslite import write_genbank, read_fasta, FastaWriter, Chromosome, FeatureArray, GenericFeature
+from locus_hunter.read_genbank import ReadGenbank, write_cds_faa
+from .setup import TestCase
+
+
+def get_chromosome(seqname: str, translations: list) -> Chromosome:
+    features = []
+    for i, translation in enumerate(translations):
+        features.append(GenericFeature(
+            seqname=seqname, type_='CDS', start=100 * i + 1, end=100 * i + 90, strand='+',
+            attributes=[('translation', translation)]))
+    return Chromosome(
+        seqname=seqname,
+        sequence='A' * 1000,
+        features=FeatureArray(seqname=seqname, chromosome_size=1000, features=features))
+
+
+class TestReadGenbank(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.gbk = f'{self.outdir}/genome.gbk'
+        write_genbank(
+            data=[get_chromosome('contig_1', ['MKKL', 'MSTN']), get_chromosome('contig_2', ['MAAAV'])],
+            file=self.gbk)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_iterate(self):
+        chromosomes = ReadGenbank(self.settings).iterate(gbk=self.gbk)
+        self.assertIsInstance(chromosomes, types.GeneratorType)
+
+        chromosome = next(chromosomes)
+        self.assertEqual('genome.gbk___contig_1', chromosome.seqname)
+        cds_ids = [f.get_attribute('cds_id') for f in chromosome.features if f.type == 'CDS']
+        self.assertListEqual(['genome.gbk___contig_1___2', 'genome.gbk___contig_1___3'], cds_ids)
+
+        self.assertEqual('genome.gbk___contig_2', next(chromosomes).seqname)
+
+    def test_main(self):
+        chromosomes = ReadGenbank(self.settings).main(gbk=self.gbk)
+        self.assertEqual(2, len(chromosomes))
+
+    def test_write_cds_faa(self):
+        faa = f'{self.outdir}/cds.faa'
+        with FastaWriter(faa) as writer:
+            seqname_to_residues = write_cds_faa(
+                chromosomes=ReadGenbank(self.settings).iterate(gbk=self.gbk),
+                writer=writer)
+
+        expected = {'genome.gbk___contig_1': 8, 'genome.gbk___contig_2': 5}
+        self.assertDictEqual(expected, seqname_to_residues)
+
+        expected = [
+            ('genome.gbk___contig_1___2', 'MKKL'),
+            ('genome.gbk___contig_1___3', 'MSTN'),
+            ('genome.gbk___contig_2___2', 'MAAAV'),
+        ]
+        self.assertListEqual(expected, read_fasta(faa))
+
+    def test_iterate_seqnames(self):
+        chromosomes = ReadGenbank(self.settings).iterate(gbk=self.gbk, seqnames={'genome.gbk___contig_2'})
+        self.assertListEqual(['genome.gbk___contig_2'], [c.seqname for c in chromosomes])
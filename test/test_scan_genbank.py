@@ -0,0 +1,80 @@
+from ngslite import write_genbank, read_fasta, FastaWriter, Chromosome, FeatureArray, GenericFeature
+from locus_hunter.read_genbank import ReadGenbank, write_cds_faa
+from locus_hunter.scan_genbank import ScanGenbank, get_translation
+from .setup import TestCase
+
+
+def get_chromosome(seqname: str) -> Chromosome:
+    features = [
+        GenericFeature(
+            seqname=seqname, type_='CDS', start=301, end=600, strand='-',
+            regions=[(301, 400, '-'), (451, 600, '-')],
+            attributes=[('note', 'joined'), ('translation', 'MKKLLPTAAAGLLLLAAQPAMAMKKLLPTAAAGLLLL'), ('product', 'p1')]),
+        GenericFeature(
+            seqname=seqname, type_='gene', start=1, end=90, strand='+',
+            attributes=[('locus_tag', 'g1')]),
+        GenericFeature(
+            seqname=seqname, type_='CDS', start=1, end=90, strand='+',
+            attributes=[('translation', 'MSTN')]),
+        GenericFeature(
+            seqname=seqname, type_='CDS', start=101, end=190, strand='+',
+            attributes=[('product', 'no translation')]),
+    ]
+    return Chromosome(
+        seqname=seqname,
+        sequence='A' * 1000,
+        features=FeatureArray(seqname=seqname, chromosome_size=1000, features=features))
+
+
+class TestScanGenbank(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.gbk = f'{self.outdir}/genome.gbk'
+        write_genbank(
+            data=[get_chromosome('contig_1'), get_chromosome('contig_2')],
+            file=self.gbk)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_same_as_read_genbank(self):
+        expected_faa = f'{self.outdir}/expected.faa'
+        with FastaWriter(expected_faa) as writer:
+            expected = write_cds_faa(
+                chromosomes=ReadGenbank(self.settings).iterate(gbk=self.gbk),
+                writer=writer)
+
+        faa = f'{self.outdir}/cds.faa'
+        seqname_to_residues = ScanGenbank(self.settings).main(gbk=self.gbk, faa=faa)
+
+        self.assertDictEqual(expected, seqname_to_residues)
+        self.assertListEqual(read_fasta(expected_faa), read_fasta(faa))
+
+    def test_coordinate_index(self):
+        faa = f'{self.outdir}/cds.faa'
+        ScanGenbank(self.settings).main(gbk=self.gbk, faa=faa)
+
+        with open(f'{faa}{ScanGenbank.COORDINATE_SUFFIX}') as fh:
+            lines = fh.read().splitlines()
+
+        expected = [  # write_genbank() adds a source feature and translates CDS without translation
+            'genome.gbk___contig_1___3\t1\t90\t+',
+            'genome.gbk___contig_1___4\t101\t190\t+',
+            'genome.gbk___contig_1___5\t301\t600\t-',
+            'genome.gbk___contig_2___3\t1\t90\t+',
+            'genome.gbk___contig_2___4\t101\t190\t+',
+            'genome.gbk___contig_2___5\t301\t600\t-',
+        ]
+        self.assertListEqual(expected, lines)
+
+    def test_get_translation(self):
+        feature_text = '''\
+     CDS             1..90
+                     /translation="MKKL
+                     LPTA"
+                     /product="a
+                     b"
+'''
+        self.assertEqual('MKKLLPTA', get_translation(feature_text=feature_text))
+        self.assertIsNone(get_translation(feature_text='     CDS             1..90\n'))
@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import urllib.request
+import urllib.error
+from threading import Thread
+from locus_hunter.service import LocusHunterService, ServiceJob, ServiceBatchJob
+from .test_batch import get_defaults
+from .setup import TestCase
+
+
+class TestLocusHunterService(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.service = LocusHunterService(settings=self.settings)
+        self.thread = Thread(
+            target=self.service.main,
+            kwargs={'port': 0, 'workers': 2, 'defaults': get_defaults(indir=self.indir, outdir=self.outdir)})
+        self.thread.start()
+        self.service.started.wait(timeout=60)
+        self.url = f'http://{self.service.HOST}:{self.service.server.server_port}'
+
+    def tearDown(self):
+        self.service.shutdown()
+        self.thread.join()
+        self.tear_down()
+
+    def request(self, path: str, data: bytes = None) -> dict:
+        with urllib.request.urlopen(urllib.request.Request(f'{self.url}{path}', data=data)) as response:
+            return json.load(response)
+
+    def submit(self, query_faa: str, parameters: str = '') -> str:
+        with open(query_faa, 'rb') as fh:
+            return self.request(path=f'/jobs{parameters}', data=fh.read())['job_id']
+
+    def wait(self, job_id: str) -> dict:
+        while True:
+            job = self.request(path=f'/jobs/{job_id}')
+            if job['status'] in [ServiceJob.FINISHED, ServiceJob.FAILED]:
+                return job
+            time.sleep(0.1)
+
+    def test_main(self):
+        job_ids = [
+            self.submit(query_faa=f'{self.indir}/query.faa'),
+            self.submit(query_faa=f'{self.indir}/query.faa', parameters='?extension=1000&sort_method=sketch&profile=true'),
+            self.submit(query_faa=f'{self.indir}/wrong_query.faa'),
+        ]
+
+        jobs = [self.wait(job_id=job_id) for job_id in job_ids]
+
+        self.assertListEqual([ServiceJob.FINISHED] * 3, [job['status'] for job in jobs])
+        self.assertIn('output.gbk', jobs[0]['files'])
+        self.assertNotIn('output.gbk', jobs[2]['files'])  # no locus found
+        self.assertIn('output.profile.json', jobs[1]['files'])  # the profiler of its own thread
+        self.assertNotIn('output.profile.json', jobs[0]['files'])
+        self.assertFalse(any(f.endswith('.checkpoint') for job in jobs for f in job['files']))
+
+        # more than one locus, i.e. process pools of sort_loci and view_loci with THREADS > 1
+        self.assertGreater(self.settings.threads, 1)
+        with urllib.request.urlopen(f'{self.url}/jobs/{job_ids[0]}/output.gbk') as response:
+            self.assertGreater(response.read().count(b'\nLOCUS'), 0)
+
+    def test_bad_request(self):
+        for parameters in ['?gbk_dir=gbk_dir', '?color=red', '?dpi=high']:
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                self.submit(query_faa=f'{self.indir}/query.faa', parameters=parameters)
+            self.assertEqual(400, context.exception.code)
+
+        with self.assertRaises(urllib.error.HTTPError) as context:
+            self.request(path='/jobs/not_a_job')
+        self.assertEqual(404, context.exception.code)
+
+
+class TestServiceJobs(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+        self.service = LocusHunterService(settings=self.settings)
+        self.service.defaults = get_defaults(indir=self.indir, outdir=self.outdir)
+        self.service.jobs_dir = f'{self.outdir}/output.jobs'
+        self.service.workers = 0  # jobs are queued but not run
+        self.service.start_workers()
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_evict_finished_jobs(self):
+        self.service.MAX_FINISHED_JOBS = 2
+        jobs = [self.service.submit(query='>query\nMKV\n', parameters={}) for _ in range(4)]
+        for job in jobs[:3]:
+            self.service.set_status(
+                job=self.service.jobs[job['job_id']], status=ServiceJob.FINISHED)
+
+        # the earliest finished job is evicted with its outputs, the queued job is kept
+        self.assertIsNone(self.service.get_job(job_id=jobs[0]['job_id']))
+        self.assertFalse(os.path.exists(f'{self.service.jobs_dir}/{jobs[0]["job_id"]}'))
+        self.assertListEqual(
+            [ServiceJob.FINISHED, ServiceJob.FINISHED, ServiceJob.QUEUED],
+            [job['status'] for job in self.service.get_jobs()])
+
+    def test_not_checkpointed(self):
+        job = ServiceBatchJob(self.settings)
+        job.resume, job.debug = True, True
+        self.assertFalse(job.is_checkpointed())
@@ -0,0 +1,62 @@
+import random
+from locus_hunter.sketch import SortLociBySketch
+from locus_hunter.feature_table import FeatureTable
+from .test_sort_loci import get_random_feature_table, get_locus
+from .setup import TestCase
+
+
+class TestSortLociBySketch(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_permutation(self):
+        random.seed(1)
+        feature_table = get_random_feature_table(n=200)
+        sorted_table = SortLociBySketch(self.settings).main(feature_table=feature_table)
+        self.assertCountEqual([l.seqname for l in feature_table.loci], [l.seqname for l in sorted_table.loci])
+
+    def test_families_are_contiguous(self):
+        random.seed(1)
+        families = [list(range(f * 10 + 1, f * 10 + 9)) for f in range(5)]
+        loci = []
+        for i in range(100):
+            f = random.randrange(len(families))
+            loci.append(get_locus(seqname=f'family_{f}_locus_{i}', ortholog_ids=families[f]))
+        random.shuffle(loci)
+
+        sorted_table = SortLociBySketch(self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=[]))
+
+        family_order = [l.seqname.split('_locus_')[0] for l in sorted_table.loci]
+        blocks = [f for i, f in enumerate(family_order) if i == 0 or f != family_order[i - 1]]
+        self.assertEqual(len(set(family_order)), len(blocks))
+
+    def test_pair_shingles_distinct_from_single_codes(self):
+        loci = [get_locus(seqname=f'locus_{i}', ortholog_ids=list(range(1, i + 3))) for i in range(5)]
+        processor = SortLociBySketch(self.settings)
+        processor.main(feature_table=FeatureTable(loci=loci, label_attributes=[]))
+
+        n = 6 + 1  # 6 ortholog ids, coded 1 to 6
+        for i, shingles in enumerate(processor.locus_shingles):
+            singles = [s for s in shingles.tolist() if s < n]
+            pairs = [s for s in shingles.tolist() if s >= n]
+            self.assertEqual(i + 2, len(singles))
+            self.assertEqual(i + 1, len(pairs))
+            self.assertTrue(all(s < SortLociBySketch.PRIME for s in pairs))
+
+    def test_loci_without_ortholog_ids(self):
+        loci = [get_locus(seqname=f'locus_{i}', ortholog_ids=[]) for i in range(3)]
+        loci.append(get_locus(seqname='locus_3', ortholog_ids=[1, 2]))
+        sorted_table = SortLociBySketch(self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=[]))
+        self.assertEqual(4, len(sorted_table))
+        self.assertListEqual([1, 2], sorted_table.get_ortholog_ids(0).tolist())
+
+    def test_no_locus(self):
+        sorted_table = SortLociBySketch(self.settings).main(
+            feature_table=FeatureTable(loci=[], label_attributes=[]))
+        self.assertEqual(0, len(sorted_table))
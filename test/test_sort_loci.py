@@ -1,5 +1,14 @@
-from ngslite import read_genbank, write_genbank
-from locus_hunter.sort_loci import SortLoci, SmithWatermanAligner
+import re
+import random
+import numpy as np
+from scipy.cluster import hierarchy
+from itertools import combinations
+from ngslite import read_genbank, write_genbank, Chromosome, GenericFeature, FeatureArray
+from locus_hunter.constant import ORTHOLOG_ID_KEY, CDS_ID_KEY, QUERY_HIT_KEY
+from locus_hunter.feature_table import FeatureTable
+from locus_hunter.sort_loci import SortLoci, AssignOrthologId, SortLociByComparison, SmithWatermanAligner, \
+    split_rows_by_pairs
+from .test_kmer_cluster import random_protein
 from .setup import TestCase, remove_genbank_date_str
 
 
@@ -15,15 +24,27 @@ class TestSortLoci(TestCase):
 
         loci = read_genbank(file=f'{self.indir}/loci.gbk')
 
-        sorted_loci = SortLoci(settings=self.settings).main(
-            loci=loci,
+        sorted_table = SortLoci(settings=self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=[]),
             ortholog_identity=0.9,
+            clustering_engine='cd-hit',
+            ortholog_catalogue=None,
+            seed_orthologs_from_hits=False,
             dereplicate_loci=True,
-            include_locus_names=['Pseudomonas_aeruginosa_UCBPP-PA14_109']
+            include_locus_names=['Pseudomonas_aeruginosa_UCBPP-PA14_109'],
+            alignment_engine='numpy',
+            sort_method='linkage',
+            optimal_leaf_ordering=False,
+            newick=None
         )
 
+        # expected attributes: those of loci.gbk (cds_id included), and the ortholog_id of each clustered CDS
+        for feature, ortholog_id in zip(sorted_table.feature.tolist(), sorted_table.ortholog_id.tolist()):
+            if ortholog_id != FeatureTable.NO_ORTHOLOG_ID:
+                feature.add_attribute(key=ORTHOLOG_ID_KEY, val=ortholog_id)
+
         write_genbank(
-            data=sorted_loci,
+            data=sorted_table.loci,
             file=f'{self.outdir}/sorted_loci.gbk',
             use_locus_text=False)
 
@@ -34,6 +55,178 @@ class TestSortLoci(TestCase):
             second=f'{self.outdir}/sorted_loci.gbk')
 
 
+class TestAssignOrthologId(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_seed_orthologs_from_hits(self):
+        random.seed(1)
+        flank = random_protein(150)
+        hit_1, hit_2 = random_protein(200), random_protein(200)
+        loci = []
+        for i in range(3):
+            locus = get_locus(seqname=f'locus_{i}', ortholog_ids=[None, None, None])
+            for feature, seq, query in zip(
+                    locus.features,
+                    [flank, hit_1, random_protein(200)],  # the last one is unrelated to query_2, but hit by it
+                    [None, 'query_1', 'query_2']):
+                feature.remove_attribute(ORTHOLOG_ID_KEY)
+                feature.add_attribute(key=CDS_ID_KEY, val=f'{locus.seqname}_{seq[:5]}')
+                feature.add_attribute(key='translation', val=seq)
+                if query is not None:
+                    feature.add_attribute(key=QUERY_HIT_KEY, val=query)
+            loci.append(locus)
+
+        feature_table = AssignOrthologId(self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=[]),
+            ortholog_identity=0.9,
+            clustering_engine='native',
+            ortholog_catalogue=None,
+            seed_orthologs_from_hits=True)
+
+        for i in range(len(loci)):
+            self.assertListEqual([1, 2, 3], feature_table.get_ortholog_ids(i).tolist())
+
+        with open(f'{self.workdir}/loci.faa') as fh:
+            self.assertEqual(3, fh.read().count('>'))  # only the flanking CDS are clustered
+
+    def test_seed_orthologs_from_hits_with_catalogue(self):
+        random.seed(1)
+        flank, hit_1, hit_2 = random_protein(150), random_protein(200), random_protein(250)
+
+        def get_feature_table(n: int) -> FeatureTable:
+            loci = []
+            for i in range(n):
+                locus = get_locus(seqname=f'locus_{i}', ortholog_ids=[None, None, None])
+                for feature, seq, query in zip(locus.features, [flank, hit_1, hit_2], [None, 'query_1', 'query_2']):
+                    feature.remove_attribute(ORTHOLOG_ID_KEY)
+                    feature.add_attribute(key=CDS_ID_KEY, val=f'{locus.seqname}_{seq[:5]}')
+                    feature.add_attribute(key='translation', val=seq)
+                    if query is not None:
+                        feature.add_attribute(key=QUERY_HIT_KEY, val=query)
+                loci.append(locus)
+            return FeatureTable(loci=loci, label_attributes=[])
+
+        ids = []
+        for n in [3, 2]:  # ortholog ids of seeds are stable across runs, and do not clash with those in the catalogue
+            feature_table = AssignOrthologId(self.settings).main(
+                feature_table=get_feature_table(n),
+                ortholog_identity=0.9,
+                clustering_engine='native',
+                ortholog_catalogue=f'{self.outdir}/catalogue',
+                seed_orthologs_from_hits=True)
+            ids.append(feature_table.get_ortholog_ids(0).tolist())
+
+        self.assertListEqual([1, 2, 3], sorted(ids[0]))
+        self.assertListEqual(ids[0], ids[1])
+
+        with open(f'{self.workdir}/loci.faa') as fh:
+            self.assertEqual(2 + 2, fh.read().count('>'))  # flanking CDS and one representative per query
+
+
+class TestSortLociByComparison(TestCase):
+
+    def setUp(self):
+        self.set_up(py_path=__file__)
+
+    def tearDown(self):
+        self.tear_down()
+
+    def test_distance_matrix_same_as_serial(self):
+        random.seed(1)
+        loci = [get_random_locus(seqname=f'locus_{i}') for i in range(23)]
+
+        aligner = SmithWatermanAligner(engine='python')
+        expected = np.exp(-np.array([
+            aligner.run(list1=orthologs_of(locus1), list2=orthologs_of(locus2))
+            for locus1, locus2 in combinations(loci, 2)
+        ]))
+
+        feature_table = FeatureTable(loci=loci, label_attributes=[])
+        for threads in [1, 6]:
+            self.settings.threads = threads
+            for engine in ['python', 'numpy']:
+                processor = SortLociByComparison(settings=self.settings)
+                processor.main(
+                    feature_table=feature_table, alignment_engine=engine, optimal_leaf_ordering=False, newick=None)
+                self.assertTrue(np.array_equal(expected, processor.distance_matrix))
+
+    def test_idx_order_same_as_dendrogram(self):
+        random.seed(1)
+        feature_table = get_random_feature_table(n=30)
+        processor = SortLociByComparison(settings=self.settings)
+        processor.main(feature_table=feature_table, alignment_engine='numpy', optimal_leaf_ordering=False, newick=None)
+        ivl = hierarchy.dendrogram(Z=processor.linkage_matrix, no_plot=True)['ivl']
+        self.assertListEqual(list(map(int, ivl)), processor.idx_order)
+
+    def test_optimal_leaf_ordering(self):
+        random.seed(1)
+        feature_table = get_random_feature_table(n=30)
+        sorted_table = SortLociByComparison(settings=self.settings).main(
+            feature_table=feature_table, alignment_engine='numpy', optimal_leaf_ordering=True, newick=None)
+        self.assertCountEqual([l.seqname for l in feature_table.loci], [l.seqname for l in sorted_table.loci])
+
+    def test_newick(self):
+        random.seed(1)
+        loci = [get_random_locus(seqname=f"locus_{i}'s") for i in range(30)]
+        newick = f'{self.outdir}/loci.nwk'
+        sorted_table = SortLociByComparison(settings=self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=[]),
+            alignment_engine='numpy', optimal_leaf_ordering=False, newick=newick)
+
+        with open(newick) as fh:
+            text = fh.read()
+
+        self.assertTrue(text.endswith(');\n'))
+        self.assertEqual(text.count('('), text.count(')'))
+        self.assertEqual(len(loci) - 1, text.count('('))
+        labels = [l.replace("''", "'") for l in re.findall(r"'((?:[^']|'')*)'", text)]
+        self.assertListEqual([l.seqname for l in sorted_table.loci], labels)
+
+    def test_split_rows_by_pairs(self):
+        for n in [2, 3, 10, 101]:
+            for n_chunks in [1, 4, 24, 500]:
+                chunks = split_rows_by_pairs(n=n, n_chunks=n_chunks)
+                rows = [i for first, last in chunks for i in range(first, last)]
+                self.assertListEqual(list(range(n - 1)), rows)
+
+
+def get_random_locus(seqname: str) -> Chromosome:
+    ortholog_ids = [random.randint(1, 8) for _ in range(random.randint(1, 12))]
+    return get_locus(seqname=seqname, ortholog_ids=ortholog_ids)
+
+
+def get_random_feature_table(n: int) -> FeatureTable:
+    loci = [get_random_locus(seqname=f'locus_{i}') for i in range(n)]
+    return FeatureTable(loci=loci, label_attributes=[])
+
+
+def get_locus(seqname: str, ortholog_ids: list) -> Chromosome:
+    features = []
+    for i, ortholog_id in enumerate(ortholog_ids):
+        f = GenericFeature(
+            seqname=seqname,
+            type_='CDS',
+            start=i * 100 + 1,
+            end=i * 100 + 90,
+            strand='+',
+            attributes=[(ORTHOLOG_ID_KEY, ortholog_id)])
+        features.append(f)
+    size = max(len(ortholog_ids), 1) * 100
+    return Chromosome(
+        seqname=seqname,
+        sequence='A' * size,
+        features=FeatureArray(seqname=seqname, chromosome_size=size, features=features))
+
+
+def orthologs_of(locus: Chromosome):
+    return [f.get_attribute(ORTHOLOG_ID_KEY) for f in locus.features]
+
+
 class TestSmithWatermanAligner(TestCase):
 
     def test_main(self):
@@ -45,3 +238,21 @@ class TestSmithWatermanAligner(TestCase):
 
         score = SmithWatermanAligner().run(list1=list1, list2=list2)
         self.assertEqual(198, score)
+
+    def test_engines_same_as_python(self):
+        random.seed(1)
+        reference = SmithWatermanAligner(engine='python')
+        aligners = [SmithWatermanAligner(engine=e) for e in ['numpy', 'numba']]
+        for _ in range(200):
+            list1 = [random.randint(0, 5) for _ in range(random.randint(0, 15))]
+            list2 = [random.randint(0, 5) for _ in range(random.randint(0, 15))]
+            expected = reference.run(list1=list1, list2=list2)
+            for aligner in aligners:
+                self.assertEqual(expected, aligner.run(list1=list1, list2=list2))
+
+    def test_non_integer_items(self):
+        list1 = ['a', None, 'c']
+        list2 = ['a', 'c']
+        expected = SmithWatermanAligner(engine='python').run(list1=list1, list2=list2)
+        actual = SmithWatermanAligner(engine='numpy').run(list1=list1, list2=list2)
+        self.assertEqual(expected, actual)
@@ -1,8 +1,28 @@
-from ngslite import read_genbank, GenericFeature
-from locus_hunter.view_loci import GenericToGraphicFeature, ChromosomeToGraphicRecord, ViewLoci, split_list
+import os
+import random
+from ngslite import read_genbank, GenericFeature, Chromosome, FeatureArray
+from locus_hunter.view_loci import FeatureTableToGraphicRecords, ViewLoci, split_list
+from locus_hunter.feature_table import FeatureTable
 from .setup import TestCase
 
 
+def get_colored_loci(n: int) -> list:
+    loci = []
+    for i in range(n):
+        features = [
+            GenericFeature(
+                seqname=f'locus_{i}', type_='CDS', start=j * 1000 + 1, end=j * 1000 + 900,
+                strand=random.choice(['+', '-']),
+                attributes=[('locus_tag', f'tag_{i}_{j}'), ('Color', random.choice(['#1F77B4', '#FF7F0E']))])
+            for j in range(random.randint(2, 6))
+        ]
+        loci.append(Chromosome(
+            seqname=f'locus_{i}',
+            sequence='A' * 6000,
+            features=FeatureArray(seqname=f'locus_{i}', chromosome_size=6000, features=features)))
+    return loci
+
+
 class TestViewLoci(TestCase):
 
     def setUp(self):
@@ -16,11 +36,11 @@ class TestViewLoci(TestCase):
         output = f'{self.outdir}/output'
 
         ViewLoci(self.settings).main(
-            loci=loci,
+            feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag']),
             output=output,
-            label_attributes=['gene', 'locus_tag'],
             loci_per_plot=19,
-            dpi=300
+            dpi=300,
+            formats=['pdf', 'png']
         )
 
     def test_very_long_name(self):
@@ -30,27 +50,64 @@ class TestViewLoci(TestCase):
         output = f'{self.outdir}/output'
 
         ViewLoci(self.settings).main(
-            loci=loci,
+            feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag']),
             output=output,
-            label_attributes=['gene', 'locus_tag'],
             loci_per_plot=10,
-            dpi=300
+            dpi=300,
+            formats=['pdf', 'png']
+        )
+
+    def test_parallel_same_as_serial(self):
+        random.seed(1)
+        loci = get_colored_loci(n=7)
+
+        for threads in [1, 3]:
+            self.settings.threads = threads
+            ViewLoci(self.settings).main(
+                feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag']),
+                output=f'{self.outdir}/output_{threads}_threads',
+                loci_per_plot=2,
+                dpi=100,
+                formats=['pdf', 'png']
+            )
+
+        for i in range(1, 5):
+            with open(f'{self.outdir}/output_1_threads_{i}.png', 'rb') as fh1:
+                with open(f'{self.outdir}/output_3_threads_{i}.png', 'rb') as fh2:
+                    self.assertEqual(fh1.read(), fh2.read())
+            self.assertTrue(os.path.exists(f'{self.outdir}/output_3_threads_{i}.pdf'))
+
+    def test_formats(self):
+        random.seed(1)
+        loci = get_colored_loci(n=3)
+
+        ViewLoci(self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag']),
+            output=f'{self.outdir}/output',
+            loci_per_plot=2,
+            dpi=100,
+            formats=['svg']
         )
 
+        for i in [1, 2]:
+            self.assertTrue(os.path.exists(f'{self.outdir}/output_{i}.svg'))
+            self.assertFalse(os.path.exists(f'{self.outdir}/output_{i}.png'))
+            self.assertFalse(os.path.exists(f'{self.outdir}/output_{i}.pdf'))
+
     def test_duplicate_color_fields(self):
         loci = read_genbank(file=f'{self.indir}/diplicate_color.gbk')
         output = f'{self.outdir}/output'
 
         ViewLoci(self.settings).main(
-            loci=loci,
+            feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag']),
             output=output,
-            label_attributes=['gene', 'locus_tag'],
             loci_per_plot=10,
-            dpi=300
+            dpi=300,
+            formats=['pdf', 'png']
         )
 
 
-class TestChromosomeToGraphicRecord(TestCase):
+class TestFeatureTableToGraphicRecords(TestCase):
 
     def setUp(self):
         self.set_up(py_path=__file__)
@@ -59,11 +116,10 @@ class TestChromosomeToGraphicRecord(TestCase):
         self.tear_down()
 
     def test_main(self):
-        chromosome = read_genbank(file=f'{self.indir}/colored_loci.gbk')[0]
-        record = ChromosomeToGraphicRecord(self.settings).main(
-            chromosome=chromosome,
-            label_attributes=['gene', 'locus_tag']
-        )
+        loci = read_genbank(file=f'{self.indir}/colored_loci.gbk')
+        record = FeatureTableToGraphicRecords(self.settings).main(
+            feature_table=FeatureTable(loci=loci, label_attributes=['gene', 'locus_tag'])
+        )[0]
 
         self.assertEqual(11143, record.sequence_length)
 
@@ -71,32 +127,36 @@ class TestChromosomeToGraphicRecord(TestCase):
         expected = '[GF(AK972_RS05835, 2936-4651 (-1)), GF(AK972_RS05840, 5001-6143 (-1)), GF(AK972_RS05845, 6252-7160 (1))]'
         self.assertEqual(expected, first_three)
 
-
-class TestGenericToGraphicFeature(TestCase):
-
-    def setUp(self):
-        self.set_up(py_path=__file__)
-
-    def tearDown(self):
-        self.tear_down()
-
-    def test_main(self):
-
-        generic_feature = GenericFeature(
+    def test_label_and_color(self):
+        features = [
+            GenericFeature(seqname='.', type_='CDS', start=1, end=99, strand='+'),
+            GenericFeature(
+                seqname='.', type_='CDS', start=101, end=199, strand='-',
+                attributes=[('locus_tag', 'tag'), ('gene', 'abc'), ('Color', '#1F77B4')]),
+            GenericFeature(
+                seqname='.', type_='CDS', start=201, end=299, strand='.',
+                attributes=[('locus_tag', 'tag'), ('Color', '#1F77B4'), ('Color', '#FF7F0E')]),
+            GenericFeature(seqname='.', type_='gene', start=201, end=299, strand='+'),
+        ]
+        chromosome = Chromosome(
             seqname='.',
-            type_='CDS',
-            start=1,
-            end=99,
-            strand='+')
-
-        graphic_feature = GenericToGraphicFeature(self.settings).main(
-            generic_feature=generic_feature,
-            label_attributes=['gene', 'locus_tag']
-        )
-
-        expected = 'GF(None, 1-99 (1))'
-
-        self.assertTrue(expected, str(graphic_feature))
+            sequence='A' * 300,
+            features=FeatureArray(seqname='.', chromosome_size=300, features=features))
+
+        feature_table = FeatureTable(loci=[chromosome], label_attributes=['gene', 'locus_tag'])
+        feature_table.color[1] = '#2CA02C'  # assigned, but after the color in the input
+
+        record = FeatureTableToGraphicRecords(self.settings).main(
+            feature_table=feature_table
+        )[0]
+
+        actual = [(f.start, f.end, f.strand, f.label, f.color) for f in record.features]
+        expected = [
+            (1, 99, 1, None, '#FFFFFF'),
+            (101, 199, -1, 'abc', '#1F77B4'),
+            (201, 299, 0, 'tag', '#1F77B4'),
+        ]
+        self.assertListEqual(expected, actual)
 
 
 class TestFunctions(TestCase):